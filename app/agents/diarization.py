@@ -0,0 +1,358 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+import queue
+import threading
+import logging
+import numpy as np
+from app.core.transcript_columns import TranscriptColumns
+from app.utils.audio import SAMPLE_RATE, decode_pcm_blocks, window_samples
+from app.utils.config import (
+    DIARIZATION_WORKERS, DIARIZATION_WINDOW_SECONDS, DIARIZATION_THRESHOLD, DIARIZATION_MAX_SPEAKERS, DIARIZATION_MAX_WINDOWS,
+    DIARIZATION_MIN_SEPARATION, DIARIZATION_MIN_SPEAKER_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Short-time analysis: 25 ms frames every 10 ms, 40 mel bands, 20 cepstral coefficients
+_FRAME = 400
+_HOP = 160
+_N_FFT = 512
+_N_MELS = 40
+_N_MFCC = 20
+# Speech is detected per chunk of this many seconds
+_CHUNK_SECONDS = 30
+
+
+class SpeakerTurn(NamedTuple):
+    start: float
+    end: float
+    speaker: str
+
+
+def speech_spans(samples: np.ndarray) -> list[tuple[int, int]]:
+    """(start, end) sample ranges of speech found by faster-whisper's Silero VAD."""
+    from faster_whisper.vad import get_speech_timestamps
+
+    return [(span["start"], span["end"]) for span in get_speech_timestamps(samples)]
+
+
+def _mel_filterbank(sampling_rate: int = SAMPLE_RATE) -> np.ndarray:
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    edges = 700 * (10 ** (np.linspace(to_mel(0), to_mel(sampling_rate / 2), _N_MELS + 2) / 2595) - 1)
+    bins = np.fft.rfftfreq(_N_FFT, 1 / sampling_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.clip(np.minimum(rising, falling), 0, None).astype(np.float32)
+
+
+def _dct_matrix() -> np.ndarray:
+    # DCT-II over the mel bands; c0 (loudness) is dropped
+    n = np.arange(_N_MELS)
+    return np.cos(np.pi / _N_MELS * (n[None, :] + 0.5) * np.arange(1, _N_MFCC + 1)[:, None]).astype(np.float32)
+
+
+_MEL = _mel_filterbank()
+_DCT = _dct_matrix()
+_WINDOW = np.hanning(_FRAME).astype(np.float32)
+
+
+def cepstra(samples: np.ndarray) -> np.ndarray:
+    """MFCCs (without c0) of every 10 ms frame, shape (frames, 20)."""
+    if not len(samples):
+        return np.zeros((0, _N_MFCC), dtype=np.float32)
+    # One frame per hop, the last ones zero-padded
+    count = -(-len(samples) // _HOP)
+    samples = np.pad(samples, (0, count * _HOP + _FRAME - _HOP - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, _FRAME)[::_HOP][:count] * _WINDOW
+    power = np.abs(np.fft.rfft(frames, n=_N_FFT)) ** 2
+    return np.log(power.astype(np.float32) @ _MEL.T + 1e-6) @ _DCT.T
+
+
+def cluster(embeddings: np.ndarray, threshold: float = DIARIZATION_THRESHOLD, max_speakers: int = DIARIZATION_MAX_SPEAKERS) -> np.ndarray:
+    """
+    Average-linkage agglomerative clustering on cosine similarity. Clusters merge while their
+    mean similarity is above `threshold`, and beyond it until at most `max_speakers` remain.
+    Returns a cluster index per row.
+    """
+    n = len(embeddings)
+    if n < 2:
+        return np.zeros(n, dtype=int)
+    unit = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-9)
+    similarity = unit @ unit.T
+    np.fill_diagonal(similarity, -np.inf)
+    sizes = np.ones(n)
+    labels = np.arange(n)
+    active = np.ones(n, dtype=bool)
+    rows = np.arange(n)
+    # Best partner of each cluster, so each merge only rescans the rows it changed
+    best = similarity.argmax(axis=1)
+
+    for remaining in range(n, 1, -1):
+        scores = np.where(active, similarity[rows, best], -np.inf)
+        i = int(scores.argmax())
+        j = int(best[i])
+        if scores[i] < threshold and remaining <= max_speakers:
+            break
+        # Lance-Williams update for average linkage: row i becomes the size-weighted mean of i and j
+        merged = (sizes[i] * similarity[i] + sizes[j] * similarity[j]) / (sizes[i] + sizes[j])
+        merged[i] = -np.inf
+        similarity[i], similarity[:, i] = merged, merged
+        similarity[j], similarity[:, j] = -np.inf, -np.inf
+        sizes[i] += sizes[j]
+        active[j] = False
+        labels[labels == j] = i
+
+        stale = active & ((best == i) | (best == j))
+        stale[i] = True
+        best[stale] = similarity[stale].argmax(axis=1)
+        better = active & (merged > similarity[rows, best])
+        best[better] = i
+    return labels
+
+
+def merge_close_clusters(embeddings: np.ndarray, labels: np.ndarray, min_separation: float = DIARIZATION_MIN_SEPARATION) -> np.ndarray:
+    """
+    Merge clusters that are not distinct voices. Embeddings are in time order, and neighbouring
+    windows are mostly the same speaker, so their typical squared distance measures how much one
+    voice varies. Clusters whose centroids are apart by less than `min_separation` times that,
+    beyond what sampling explains for their sizes, are merged, closest first.
+    """
+    labels = labels.copy()
+    if len(embeddings) < 2:
+        return labels
+    spread = np.median(np.sum(np.diff(embeddings, axis=0) ** 2, axis=1))
+    while True:
+        clusters, labels = np.unique(labels, return_inverse=True)
+        if len(clusters) < 2:
+            return labels
+        sizes = np.bincount(labels)
+        centroids = np.stack([embeddings[labels == k].mean(axis=0) for k in range(len(clusters))])
+        distance = np.sum((centroids[:, None] - centroids[None, :]) ** 2, axis=2)
+        excess = (distance - spread / 2 * (1 / sizes[:, None] + 1 / sizes[None, :])) / spread
+        np.fill_diagonal(excess, np.inf)
+        i, j = np.unravel_index(excess.argmin(), excess.shape)
+        if excess[i, j] >= min_separation:
+            return labels
+        labels[labels == j] = i
+
+
+def absorb_spurious_clusters(embeddings: np.ndarray, labels: np.ndarray, min_size: int) -> np.ndarray:
+    """
+    Give the windows of spurious clusters to the nearest remaining one. A cluster is spurious
+    when it has fewer than `min_size` windows, or never two in a row: those are windows
+    straddling a change of speaker, or noise.
+    """
+    clusters, labels = np.unique(labels, return_inverse=True)
+    sizes = np.bincount(labels)
+    # Longest run of consecutive windows per cluster
+    boundaries = np.flatnonzero(np.diff(labels)) + 1
+    run_starts = np.concatenate([[0], boundaries])
+    run_lengths = np.diff(np.concatenate([run_starts, [len(labels)]]))
+    longest = np.zeros(len(clusters), dtype=int)
+    np.maximum.at(longest, labels[run_starts], run_lengths)
+
+    kept = np.flatnonzero((sizes >= min_size) & (longest > 1))
+    if not len(kept) or len(kept) == len(clusters):
+        return labels
+    centroids = np.stack([embeddings[labels == k].mean(axis=0) for k in kept])
+    spurious = ~np.isin(labels, kept)
+    distance = np.sum((embeddings[spurious, None] - centroids[None]) ** 2, axis=2)
+    labels[spurious] = kept[distance.argmin(axis=1)]
+    return labels
+
+
+def speaker_turns(starts: np.ndarray, ends: np.ndarray, labels: np.ndarray) -> list[SpeakerTurn]:
+    """Merge consecutive windows of one speaker into turns, named SPEAKER_00... by first appearance."""
+    if not len(labels):
+        return []
+    labels = labels.copy()
+    # A single window between two of another speaker is more likely noise than a turn
+    islands = np.flatnonzero((labels[1:-1] != labels[:-2]) & (labels[:-2] == labels[2:])) + 1
+    labels[islands] = labels[islands - 1]
+    _, first_seen = np.unique(labels, return_index=True)
+    names = {label: f"SPEAKER_{rank:02d}" for rank, label in enumerate(labels[np.sort(first_seen)])}
+
+    turns = []
+    for start, end, label in zip(starts.tolist(), ends.tolist(), labels.tolist()):
+        speaker = names[label]
+        # Short pauses stay inside the turn
+        if turns and turns[-1].speaker == speaker and start - turns[-1].end < DIARIZATION_WINDOW_SECONDS:
+            turns[-1] = turns[-1]._replace(end=end)
+        else:
+            turns.append(SpeakerTurn(start, end, speaker))
+    return turns
+
+
+class SpeakerIndex:
+    """Sorted, non-overlapping speaker turns, queried by time interval."""
+
+    def __init__(self, turns: list[SpeakerTurn]):
+        self.starts = np.array([turn.start for turn in turns])
+        self.ends = np.array([turn.end for turn in turns])
+        self.speakers = [turn.speaker for turn in turns]
+
+    def lookup(self, starts: np.ndarray, ends: np.ndarray) -> list[Optional[str]]:
+        """Speaker overlapping each [start, end) interval the most; the nearest turn when none overlaps."""
+        if not len(self.speakers):
+            return [None] * len(starts)
+        starts, ends = np.asarray(starts, dtype=float), np.asarray(ends, dtype=float)
+        # Turns overlapping an interval are the contiguous range [first, last)
+        first = np.searchsorted(self.ends, starts, side="right")
+        last = np.searchsorted(self.starts, ends, side="left")
+        best = np.full(len(starts), -1)
+        best_overlap = np.zeros(len(starts))
+        for k in range(int((last - first).max(initial=0))):
+            index = first + k
+            valid = index < last
+            index = np.minimum(index, len(self.speakers) - 1)
+            overlap = np.where(valid, np.minimum(ends, self.ends[index]) - np.maximum(starts, self.starts[index]), 0)
+            better = overlap > best_overlap
+            best[better], best_overlap[better] = index[better], overlap[better]
+
+        # Intervals in a pause between turns: the turn whose edge is closest
+        missing = best < 0
+        if missing.any():
+            before = np.clip(first[missing] - 1, 0, len(self.speakers) - 1)
+            after = np.clip(first[missing], 0, len(self.speakers) - 1)
+            gap_before = starts[missing] - self.ends[before]
+            gap_after = self.starts[after] - ends[missing]
+            best[missing] = np.where(gap_before <= gap_after, before, after)
+        return [self.speakers[i] for i in best]
+
+
+def assign_speakers(segments, turns: list[SpeakerTurn]):
+    """Set each segment's speaker to the turn it overlaps most. Works on TranscriptColumns and Segment lists."""
+    if not turns or not len(segments):
+        return
+    if isinstance(segments, TranscriptColumns):
+        starts, ends = segments.segment_starts(), segments.segment_ends()
+    else:
+        starts = np.array([segment.start_time for segment in segments])
+        ends = np.array([segment.end_time for segment in segments])
+    speakers = SpeakerIndex(turns).lookup(starts, ends)
+    if isinstance(segments, TranscriptColumns):
+        segments.set_speakers(speakers)
+    else:
+        for segment, speaker in zip(segments, speakers):
+            segment.speaker = speaker
+
+
+class StreamTee:
+    """
+    Passes audio blocks on to the decoder while queueing them for diarization. The diarized
+    stream ends when the blocks run out, fail, or close() is called, which the consumer must
+    do when it stops early, including when it fails before reading the first block.
+    """
+
+    def __init__(self, blocks: Iterable[np.ndarray], pending: queue.SimpleQueue):
+        self._blocks = iter(blocks)
+        self._pending = pending
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> np.ndarray:
+        if self._closed:
+            raise StopIteration
+        try:
+            block = next(self._blocks)
+        except BaseException:
+            self.close()
+            raise
+        self._pending.put(block)
+        return block
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._pending.put(None)
+        if hasattr(self._blocks, "close"):
+            self._blocks.close() # e.g. stops ffmpeg
+
+
+class DiarizationAgent:
+    """
+    CPU speaker diarization: speech windows of DIARIZATION_WINDOW_SECONDS are embedded as the
+    mean and spread of their MFCCs, standardized over the recording, and clustered by cosine
+    similarity; clusters too close to be different voices are merged back. Runs on its own
+    worker threads, alongside decoding.
+    """
+
+    def __init__(self, workers: int = DIARIZATION_WORKERS, speech_detector: Callable = speech_spans):
+        self._speech_detector = speech_detector
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="diarization")
+
+    def diarize_file(self, audio_path) -> Future:
+        """Start diarizing a file; the Future resolves to its speaker turns."""
+        return self._executor.submit(lambda: self.diarize(decode_pcm_blocks(audio_path)))
+
+    def diarize_stream(self, blocks: Iterable[np.ndarray]) -> tuple[StreamTee, Future]:
+        """
+        Diarize a block stream as it is consumed. Returns the blocks to pass on to the decoder
+        and a Future of the speaker turns, resolved once the stream is exhausted or closed.
+        """
+        pending = queue.SimpleQueue()
+
+        def drain():
+            while (block := pending.get()) is not None:
+                yield block
+
+        future = self._executor.submit(lambda: self.diarize(drain()))
+        return StreamTee(blocks, pending), future
+
+    def diarize(self, blocks: Iterable[np.ndarray]) -> list[SpeakerTurn]:
+        window = int(DIARIZATION_WINDOW_SECONDS * SAMPLE_RATE / _HOP)
+        starts, features = [], []
+        for offset, chunk in window_samples(blocks, _CHUNK_SECONDS):
+            spans = self._speech_detector(chunk)
+            frames = cepstra(chunk)
+            if not spans or len(frames) < window:
+                continue
+            # Keep the windows that are mostly speech
+            speech = np.zeros(len(chunk) + 1)
+            for start, end in spans:
+                speech[start] += 1
+                speech[min(end, len(chunk))] -= 1
+            is_speech = np.cumsum(speech)[:len(frames) * _HOP:_HOP][:len(frames)] > 0
+            count = len(frames) // window
+            frames = frames[:count * window].reshape(count, window, _N_MFCC)
+            kept = is_speech[:count * window].reshape(count, window).mean(axis=1) >= 0.5
+            if kept.any():
+                frames = frames[kept]
+                features.append(np.concatenate([frames.mean(axis=1), frames.std(axis=1)], axis=1))
+                starts.append(offset + np.flatnonzero(kept) * DIARIZATION_WINDOW_SECONDS)
+
+        if not features:
+            return []
+        embeddings = np.concatenate(features)
+        starts = np.concatenate(starts)
+        # Per-recording scaling, so every coefficient weighs the same in distances
+        embeddings = (embeddings - embeddings.mean(axis=0)) / (embeddings.std(axis=0) + 1e-6)
+
+        labels = merge_close_clusters(embeddings, self._cluster(embeddings))
+        labels = absorb_spurious_clusters(embeddings, labels, int(DIARIZATION_MIN_SPEAKER_SECONDS / DIARIZATION_WINDOW_SECONDS))
+        turns = speaker_turns(starts, starts + DIARIZATION_WINDOW_SECONDS, labels)
+        logger.info(f"Diarization found {len({turn.speaker for turn in turns})} speakers in {len(embeddings)} speech windows")
+        return turns
+
+    @staticmethod
+    def _cluster(embeddings: np.ndarray) -> np.ndarray:
+        # Long recordings: cluster an even subsample, then give every window its nearest centroid
+        if len(embeddings) <= DIARIZATION_MAX_WINDOWS:
+            return cluster(embeddings)
+        sample = np.linspace(0, len(embeddings) - 1, DIARIZATION_MAX_WINDOWS).astype(int)
+        sample_labels = cluster(embeddings[sample])
+        clusters = np.unique(sample_labels)
+        centroids = np.stack([embeddings[sample][sample_labels == label].mean(axis=0) for label in clusters])
+        unit = centroids / (np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-9)
+        return clusters[(embeddings @ unit.T).argmax(axis=1)]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,65 +1,93 @@
 from pathlib import Path
-from docx import Document
-from app.core.schemas import Transcript, Segment
-from app.utils.config import OUTPUT_DIR
+from typing import Iterable
+from app.core.schemas import Transcript
+from app.utils.config import OUTPUT_DIR, OUTPUT_FORMATS
+from app.utils.writers import WRITERS, TranscriptWriter, output_stem
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def line_prefix(segment, include_timestamps: bool = True, include_speakers: bool = True) -> str:
+    # e.g. "[10.0s] SPEAKER_00: "
+    prefix = ""
+    if include_timestamps:
+        prefix += f"[{segment.start_time:.1f}s] "
+    if include_speakers:
+        prefix += f"{segment.speaker}: "
+    return prefix
+
+
 class FormattingAgent:
-    def format_docx(self, transcript: Transcript, include_timestamps: bool = True, include_speakers: bool = True) -> Path:
-        doc = Document()
-        doc.add_heading(transcript.metadata.title, 0)
+    def __init__(self, output_dir: Path = OUTPUT_DIR):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def format_transcript(self, transcript: Transcript, formats: Iterable[str] = OUTPUT_FORMATS, include_timestamps: bool = True,
+                          include_speakers: bool = True) -> dict[str, Path]:
+        """
+        Write `transcript` in every requested format in one pass over its segments. File names
+        carry the job id, so jobs for videos with the same title never overwrite each other.
+        """
+        stem = output_stem(f"{transcript.metadata.title[:50]}_{transcript.job_id}_transcript")
+        writers = self._open_writers(stem, formats)
+        try:
+            for writer in writers:
+                writer.write_header(transcript.metadata)
+            self._write_segments(writers, transcript.segments, include_timestamps, include_speakers)
+        finally:
+            for writer in writers:
+                writer.close()
 
-        doc.add_paragraph(f"Source: {transcript.metadata.url}")
-        doc.add_paragraph(f"Duration: {transcript.metadata.duration} seconds")
-        doc.add_paragraph(f"Date: {transcript.metadata.upload_date or 'N/A'}")
-        
-        doc.add_heading('Transcript', level=1)
-        
-        for segment in transcript.segments:
-            p = doc.add_paragraph()
-            
-            # Construct prefix: [10s] Speaker: 
-            prefix = ""
-            if include_timestamps:
-                prefix += f"[{segment.start_time:.1f}s] "
-            
-            if include_speakers:
-                prefix += f"{segment.speaker}: "
-            
-            if prefix:
-                runner = p.add_run(prefix)
-                runner.bold = True
-            
-            p.add_run(segment.text)
-            
-        filename = f"{transcript.metadata.title[:50]}_transcript.docx"
-        # Sanitize filename
-        filename = "".join([c for c in filename if c.isalpha() or c.isdigit() or c==' ' or c=='_']).rstrip() + ".docx"
-        output_path = OUTPUT_DIR / filename
-        
-        doc.save(str(output_path))
-        logger.info(f"DOCX saved to {output_path}")
-        return output_path
+        paths = {writer.extension: writer.path for writer in writers}
+        logger.info(f"Transcript saved as {', '.join(str(path) for path in paths.values())}")
+        return paths
+
+    def format_docx(self, transcript: Transcript, include_timestamps: bool = True, include_speakers: bool = True) -> Path:
+        return self.format_transcript(transcript, ["docx"], include_timestamps, include_speakers)["docx"]
 
     def format_txt(self, transcript: Transcript, include_timestamps: bool = True, include_speakers: bool = True) -> Path:
-        filename = f"{transcript.metadata.title[:50]}_transcript.txt"
-        filename = "".join([c for c in filename if c.isalpha() or c.isdigit() or c==' ' or c=='_']).rstrip() + ".txt"
-        output_path = OUTPUT_DIR / filename
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"Title: {transcript.metadata.title}\n")
-            f.write(f"URL: {transcript.metadata.url}\n\n")
-            for segment in transcript.segments:
-                line = ""
-                if include_timestamps:
-                    line += f"[{segment.start_time:.1f}s] "
-                if include_speakers:
-                    line += f"{segment.speaker}: "
-                
-                line += segment.text
-                f.write(f"{line}\n")
-                
-        logger.info(f"TXT saved to {output_path}")
-        return output_path
+        return self.format_transcript(transcript, ["txt"], include_timestamps, include_speakers)["txt"]
+
+    def format_batch(self, title: str, transcripts: list[Transcript], include_timestamps: bool = True, include_speakers: bool = True,
+                     formats: Iterable[str] = OUTPUT_FORMATS, batch_id: str = "") -> dict:
+        """
+        Write one combined document per format for all transcripts of a batch, one section per video.
+        Subtitle formats are skipped since their cue times restart with every video.
+        """
+        formats = [extension for extension in formats if WRITERS[extension].supports_batch]
+        writers = self._open_writers(output_stem("_".join(filter(None, [title[:50], batch_id, "batch_transcript"]))), formats)
+        try:
+            for writer in writers:
+                writer.write_batch_header(title)
+            for transcript in transcripts:
+                for writer in writers:
+                    writer.write_section(transcript.metadata)
+                self._write_segments(writers, transcript.segments, include_timestamps, include_speakers)
+                for writer in writers:
+                    writer.end_section()
+        finally:
+            for writer in writers:
+                writer.close()
+
+        logger.info(f"Batch transcript saved as {', '.join(str(writer.path) for writer in writers)}")
+        return {writer.extension: str(writer.path) for writer in writers}
+
+    def _open_writers(self, stem: str, formats: Iterable[str]) -> list[TranscriptWriter]:
+        writers = []
+        try:
+            for extension in formats:
+                writers.append(WRITERS[extension](self.output_dir / f"{stem}.{extension}"))
+        except Exception:
+            for writer in writers:
+                writer.close()
+            raise
+        return writers
+
+    @staticmethod
+    def _write_segments(writers: list[TranscriptWriter], segments, include_timestamps: bool, include_speakers: bool):
+        # Each segment's prefix is rendered once and shared by all writers
+        for segment in segments:
+            prefix = line_prefix(segment, include_timestamps, include_speakers)
+            for writer in writers:
+                writer.write_segment(segment, prefix)
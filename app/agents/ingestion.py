@@ -1,91 +1,334 @@
-import yt_dlp
 import os
+import copy
+import hashlib
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from app.utils.config import TEMP_DIR, MAX_VIDEO_DURATION_SECONDS
+from typing import Iterator, Optional
+from urllib.parse import unquote, urlparse
+from app.utils.config import ALLOWED_HOSTS, TEMP_DIR, MAX_VIDEO_DURATION_SECONDS, METADATA_CACHE_TTL_SECONDS, AUDIO_DOWNLOAD_MODE, MAX_RETRIES, RETRY_DELAY
 from app.core.schemas import VideoMetadata
+from app.core.metrics import StageTimer
+from app.utils.audio import ffmpeg_pcm_blocks, probe_duration
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _youtube_dl(opts: dict):
+    # yt_dlp takes a few hundred ms to import, so it is deferred until the first request
+    import yt_dlp
+    return yt_dlp.YoutubeDL(opts)
+
+
+def _count_download(progress: dict, stats: dict):
+    if progress['status'] == 'finished':
+        stats['downloaded_bytes'] += progress.get('total_bytes') or progress.get('downloaded_bytes') or 0
+
+
+def _time_postprocessor(progress: dict, stats: dict):
+    if progress['status'] == 'started':
+        stats['transcode'].start()
+    elif progress['status'] == 'finished':
+        stats['transcode'].stop()
+
+
+def local_path(source: str) -> Optional[Path]:
+    """The local audio file `source` names, as a path or file:// URL; None for remote URLs."""
+    if source.startswith("file://"):
+        return Path(unquote(urlparse(source).path))
+    if "://" in source:
+        return None
+    path = Path(source).expanduser()
+    return path if path.is_file() else None
+
+
+def is_allowed_url(url: str) -> bool:
+    """True for http(s) URLs on ALLOWED_HOSTS or their subdomains."""
+    parts = urlparse(url)
+    host = (parts.hostname or "").lower()
+    return parts.scheme in ("http", "https") and any(host == allowed or host.endswith(f".{allowed}") for allowed in ALLOWED_HOSTS)
+
+
+def local_info(path: Path) -> dict:
+    # Shaped like a yt-dlp info dict. The id changes with the file, so cached transcripts of an
+    # edited or replaced file are not reused.
+    stat = path.stat()
+    digest = hashlib.sha1(f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return {
+        'id': f"local-{digest}",
+        'title': path.stem,
+        'duration': probe_duration(path),
+        'timestamp': stat.st_mtime,
+        'ext': path.suffix.lstrip('.'),
+    }
+
+
+def build_download_opts(mode: str = AUDIO_DOWNLOAD_MODE) -> dict:
+    opts = {
+        'outtmpl': str(TEMP_DIR / '%(id)s.%(ext)s'),
+        'quiet': True,
+        'no_warnings': True,
+        # Retries resume the .part file left by the failed attempt
+        'continuedl': True,
+        # 'Web' client is blocked (only images), so we use 'android' to see video streams
+        'extractor_args': {'youtube': {'player_client': ['android']}},
+    }
+
+    if mode == 'mp3':
+        opts['format'] = 'best'
+        opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '192',
+        }]
+        return opts
+    if mode not in ('native', 'pcm'):
+        raise ValueError(f"Unknown audio download mode: {mode}")
+
+    # Smallest audio-only stream; speech recognition at 16 kHz gains nothing from higher bitrates.
+    # Falls back to a muxed stream, which faster-whisper can still decode directly.
+    opts['format'] = 'bestaudio/best'
+    opts['format_sort'] = ['+size', '+br']
+    if mode == 'pcm':
+        opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'flac',
+        }]
+        opts['postprocessor_args'] = {'extractaudio': ['-ar', '16000', '-ac', '1']}
+    return opts
+
+
 class IngestionAgent:
-    def __init__(self):
-        self.ydl_opts = {
-            'format': 'best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'outtmpl': str(TEMP_DIR / '%(id)s.%(ext)s'),
-            'quiet': True,
-            'no_warnings': True,
-            # 'Web' client is blocked (only images), so we use 'android' to see video streams
-            'extractor_args': {'youtube': {'player_client': ['android']}},
-        }
+    def __init__(self, mode: str = AUDIO_DOWNLOAD_MODE):
+        self.mode = mode
+        self.ydl_opts = build_download_opts(mode)
+        # Extracted info dicts by video id, so metadata lookup and download share one extraction
+        self._info_cache = {}  # video id -> (expires_at, info)
+        self._url_ids = {}  # url -> video id
+        self._cache_lock = threading.Lock()
+
+    def _build_opts(self, cookie_file: Path = None) -> dict:
+        # Create a localized copy of options to add cookiefile
+        opts = self.ydl_opts.copy()
+
+        if cookie_file and cookie_file.exists():
+            logger.info(f"Using cookie file at: {cookie_file}")
+            # Basic validation: check if it looks like a Netscape cookie file
+            try:
+                with open(cookie_file, 'r') as f:
+                    header = f.readline()
+                    if not header.startswith("# Netscape") and not header.startswith("# HTTP Cookie"):
+                        logger.warning(f"Cookie file {cookie_file} does not look like a Netscape format file. Header: {header.strip()}")
+            except Exception as ex:
+                logger.warning(f"Could not read cookie file to validate header: {ex}")
+
+            opts['cookiefile'] = str(cookie_file)
+        return opts
+
+    def _cached_info(self, url: str):
+        with self._cache_lock:
+            video_id = self._url_ids.get(url)
+            entry = self._info_cache.get(video_id) if video_id else None
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+        return None
+
+    def _cache_info(self, url: str, info: dict):
+        now = time.monotonic()
+        with self._cache_lock:
+            # Drop expired entries so the cache doesn't grow without bound
+            for video_id in [k for k, (expires_at, _) in self._info_cache.items() if expires_at <= now]:
+                del self._info_cache[video_id]
+            self._info_cache[info['id']] = (now + METADATA_CACHE_TTL_SECONDS, info)
+            self._url_ids[url] = info['id']
+
+    def extract_info(self, url: str, cookie_file: Path = None, refresh: bool = False) -> dict:
+        """
+        Extract the video info dict without processing formats or downloading.
+        Results are cached by video id for METADATA_CACHE_TTL_SECONDS; `refresh` extracts again,
+        e.g. when the signed stream URLs of the cached info have expired.
+        Local files are probed directly each time.
+        """
+        local = local_path(url)
+        if local is not None:
+            return local_info(local)
+
+        info = None if refresh else self._cached_info(url)
+        if info is not None:
+            return info
+
+        with _youtube_dl(self._build_opts(cookie_file)) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+        self._cache_info(url, info)
+        return info
+
+    def expand_playlist(self, url: str, cookie_file: Path = None, limit: int = None) -> tuple[str, list[dict]]:
+        """
+        List the videos of a playlist or channel with flat extractions (no per-video requests).
+        Returns the playlist title and [{'id', 'url', 'title'}] de-duplicated by video id;
+        a plain video URL or a local file yields one entry.
+        """
+        local = local_path(url)
+        if local is not None:
+            return local.stem, [{'id': local_info(local)['id'], 'url': url, 'title': local.stem}]
+
+        opts = self._build_opts(cookie_file)
+        opts['extract_flat'] = 'in_playlist'
+        with _youtube_dl(opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            if info.get('_type') not in ('playlist', 'multi_video'):
+                return info.get('title', 'Unknown'), [{'id': info['id'], 'url': url, 'title': info.get('title')}]
+
+            videos = []
+            seen = set()
+            for entry in self._flat_videos(ydl, info):
+                if entry.get('id') in seen:
+                    continue
+                seen.add(entry['id'])
+                videos.append({
+                    'id': entry['id'],
+                    'url': entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}",
+                    'title': entry.get('title'),
+                })
+                if limit and len(videos) >= limit:
+                    break
+
+        logger.info(f"Expanded {url} to {len(videos)} videos")
+        return info.get('title', 'Unknown'), videos
+
+    @staticmethod
+    def _flat_videos(ydl, info: dict, depth: int = 1) -> Iterator[dict]:
+        # A bare channel URL lists its tabs (Videos, Shorts, Live) rather than videos; each tab is
+        # listed in turn, lazily, so tabs past the limit are never fetched
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            if entry.get('ie_key') in (None, 'Youtube'):
+                yield entry
+            elif entry.get('ie_key') == 'YoutubeTab' and entry.get('url') and depth > 0:
+                yield from IngestionAgent._flat_videos(ydl, ydl.extract_info(entry['url'], download=False), depth - 1)
+
+    @staticmethod
+    def metadata_from_info(url: str, info: dict) -> VideoMetadata:
+        # Unprocessed info may lack the derived 'upload_date' and 'thumbnail' fields
+        upload_date = info.get('upload_date')
+        if not upload_date and info.get('timestamp'):
+            upload_date = datetime.fromtimestamp(info['timestamp'], tz=timezone.utc).strftime('%Y%m%d')
+        thumbnail = info.get('thumbnail')
+        if not thumbnail and info.get('thumbnails'):
+            thumbnail = info['thumbnails'][-1].get('url')
+
+        return VideoMetadata(
+            video_id=info.get('id'),
+            title=info.get('title', 'Unknown'),
+            duration=info.get('duration') or 0,
+            upload_date=upload_date,
+            url=url,
+            thumbnail_url=thumbnail
+        )
 
     def get_metadata(self, url: str, cookie_file: Path = None) -> VideoMetadata:
         try:
-            opts = {'quiet': True}
-            
-            if cookie_file and cookie_file.exists():
-                logger.info(f"Using cookie file at: {cookie_file}")
-                # Basic validation: check if it looks like a Netscape cookie file
-                try:
-                    with open(cookie_file, 'r') as f:
-                        header = f.readline()
-                        if not header.startswith("# Netscape") and not header.startswith("# HTTP Cookie"):
-                            logger.warning(f"Cookie file {cookie_file} does not look like a Netscape format file. Header: {header.strip()}")
-                except Exception as ex:
-                    logger.warning(f"Could not read cookie file to validate header: {ex}")
-                    
-                opts['cookiefile'] = str(cookie_file)
-                
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return VideoMetadata(
-                    title=info.get('title', 'Unknown'),
-                    duration=info.get('duration', 0),
-                    upload_date=info.get('upload_date'),
-                    url=url,
-                    thumbnail_url=info.get('thumbnail')
-                )
+            return self.metadata_from_info(url, self.extract_info(url, cookie_file=cookie_file))
         except Exception as e:
             logger.error(f"Error fetching metadata: {e}")
             raise
 
-    def download_audio(self, url: str, cookie_file: Path = None) -> Path:
-        # We pass cookie_file to get_metadata if needed, though usually metadata doesn't require it as strictly as download
-        # But for 403s, even metadata might fail, so let's pass it.
-        metadata = self.get_metadata(url, cookie_file=cookie_file)
-        
-        if metadata.duration > MAX_VIDEO_DURATION_SECONDS:
-            raise ValueError(f"Video duration ({metadata.duration}s) exceeds limit ({MAX_VIDEO_DURATION_SECONDS}s)")
+    def download_audio(self, url: str, cookie_file: Path = None, dest_dir: Path = TEMP_DIR, stats: dict = None, partial_dir: Path = None) -> Path:
+        """
+        Download the audio of `url` into `dest_dir` (jobs pass their own scratch directory).
+        Failed attempts are retried up to MAX_RETRIES times with exponential backoff, resuming
+        the partial file. With `partial_dir` the download runs there and only the finished file
+        is moved to `dest_dir`, so a partial file outlives this call for a later one to resume.
+        `stats` receives 'downloaded_bytes' and a 'transcode' StageTimer for the ffmpeg
+        postprocessing. Local files are returned in place.
+        """
+        # Reuses the info dict from get_metadata when available instead of extracting again.
+        # We pass cookie_file along since for 403s even metadata might fail.
+        info = self.extract_info(url, cookie_file=cookie_file)
+
+        duration = info.get('duration') or 0
+        if duration > MAX_VIDEO_DURATION_SECONDS:
+            raise ValueError(f"Video duration ({duration}s) exceeds limit ({MAX_VIDEO_DURATION_SECONDS}s)")
+        local = local_path(url)
+        if local is not None:
+            return local
+
+        # Partial files of each download mode are kept apart, their formats differ
+        work_dir = partial_dir / self.mode if partial_dir else dest_dir
+        work_dir.mkdir(parents=True, exist_ok=True)
+        opts = self._build_opts(cookie_file)
+        opts['outtmpl'] = str(work_dir / '%(id)s.%(ext)s')
+        if stats is not None:
+            stats.update(downloaded_bytes=0, transcode=StageTimer(children=True))
+            opts['progress_hooks'] = [lambda d: _count_download(d, stats)]
+            opts['postprocessor_hooks'] = [lambda d: _time_postprocessor(d, stats)]
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                path = self._download(opts, info, work_dir)
+                break
+            except FileNotFoundError as e:
+                logger.error(f"Error downloading audio: {e}")
+                raise
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    logger.error(f"Error downloading audio: {e}")
+                    raise
+                delay = RETRY_DELAY * 2 ** attempt
+                logger.warning(f"Download of {info['id']} failed ({e}), resuming in {delay}s (retry {attempt + 1} of {MAX_RETRIES})")
+                time.sleep(delay)
+                try:
+                    # Stream URLs are signed and expire; the partial file is kept either way
+                    info = self.extract_info(url, cookie_file=cookie_file, refresh=True)
+                except Exception as refresh_error:
+                    logger.warning(f"Could not refresh video info, retrying with the cached one: {refresh_error}")
+        if work_dir == dest_dir:
+            return path
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        return Path(shutil.move(path, dest_dir / path.name))
+
+    @staticmethod
+    def _download(opts: dict, info: dict, dest_dir: Path) -> Path:
+        with _youtube_dl(opts) as ydl:
+            # Process the already extracted info (format selection + download) without re-extracting.
+            # Deep copy since processing mutates the dict and the original stays cached.
+            info = ydl.process_ie_result(copy.deepcopy(info), download=True)
+        # yt-dlp reports the final path, after any postprocessor changed the extension
+        for download in info.get('requested_downloads') or []:
+            if download.get('filepath') and Path(download['filepath']).exists():
+                return Path(download['filepath'])
+
+        expected_path = dest_dir / f"{info['id']}.{info.get('ext', 'mp3')}"
+        if expected_path.exists():
+            return expected_path
+        raise FileNotFoundError(f"Downloaded file not found at {expected_path}")
+
+    def stream_audio(self, url: str, cookie_file: Path = None):
+        """
+        Stream the selected audio format straight from its URL (or a local file) through ffmpeg.
+        Returns an iterator of 16 kHz mono float32 sample blocks.
+        """
+        info = self.extract_info(url, cookie_file=cookie_file)
+
+        duration = info.get('duration') or 0
+        if duration > MAX_VIDEO_DURATION_SECONDS:
+            raise ValueError(f"Video duration ({duration}s) exceeds limit ({MAX_VIDEO_DURATION_SECONDS}s)")
+        local = local_path(url)
+        if local is not None:
+            return ffmpeg_pcm_blocks(str(local))
 
         try:
-            # Create a localized copy of options to add cookiefile
-            opts = self.ydl_opts.copy()
-            if cookie_file and cookie_file.exists():
-                opts['cookiefile'] = str(cookie_file)
-
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                video_id = info['id']
-                # yt-dlp might save as .mp3 directly depending on postprocessor
-                # We need to find the file. outtmpl was %(id)s.%(ext)s
-                expected_path = TEMP_DIR / f"{video_id}.mp3"
-                
-                if expected_path.exists():
-                    return expected_path
-                else:
-                     # Check if it was saved as webm or m4a before conversion (unlikely with just extract audio but possible)
-                     # For now, strict check on mp3 as per config
-                     if not expected_path.exists():
-                         # Try finding any file with that ID in temp
-                         potential_files = list(TEMP_DIR.glob(f"{video_id}.*"))
-                         if potential_files:
-                             return potential_files[0]
-                     
-                     raise FileNotFoundError(f"Downloaded file not found at {expected_path}")
+            with _youtube_dl(self._build_opts(cookie_file)) as ydl:
+                # Format selection only, nothing is written to disk
+                info = ydl.process_ie_result(copy.deepcopy(info), download=False)
         except Exception as e:
-            logger.error(f"Error downloading audio: {e}")
+            logger.error(f"Error selecting audio format: {e}")
             raise
+
+        formats = info.get('requested_formats') or [info]
+        audio_format = next((f for f in formats if f.get('acodec') != 'none'), formats[0])
+        logger.info(f"Streaming audio format {audio_format.get('format_id')} for {info['id']}")
+        return ffmpeg_pcm_blocks(audio_format['url'], headers=audio_format.get('http_headers'))
@@ -1,79 +1,372 @@
-from faster_whisper import WhisperModel
 from pathlib import Path
-from app.utils.config import WHISPER_MODEL_SIZE, COMPUTE_TYPE
-from app.core.schemas import Segment, Word
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+import numpy as np
+import multiprocessing
+import os
+import threading
+from app.utils.config import (
+    WHISPER_MODEL_SIZE, CHUNK_SIZE_SECONDS, CHUNK_OVERLAP_SECONDS, CHUNK_WORKERS,
+    STREAM_WINDOW_SECONDS, STREAM_OVERLAP_SECONDS, BATCH_WINDOW_SECONDS, DECODE_PROFILE, LANGUAGE_PROBE_SECONDS, LANGUAGE_PROBE_MODEL_SIZE,
+)
+from app.utils.audio import decode_pcm_blocks, split_head, window_samples
+from app.core.schemas import Segment
+from app.core.model_pool import ModelPool
+from app.core.transcript_columns import SegmentView, TranscriptColumns
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Decoding parameters per profile; part of the transcript cache key.
+# The VAD filter drops silence and music before decoding; 'accurate' decodes everything.
+DECODE_PROFILES = {
+    "fast": {
+        "beam_size": 1, # Greedy
+        "word_timestamps": False, # Captions fall back to whole-segment cues
+        "vad_filter": True,
+        "condition_on_previous_text": False,
+    },
+    "balanced": {
+        "beam_size": 5,
+        "word_timestamps": True,
+        "vad_filter": True,
+    },
+    "accurate": {
+        "beam_size": 5,
+        "word_timestamps": True, # We need word timestamps for better granularity
+    },
+}
+
+
+def decode_options(profile: str) -> dict:
+    if profile not in DECODE_PROFILES:
+        raise ValueError(f"Unknown decode profile '{profile}', expected one of {', '.join(DECODE_PROFILES)}")
+    return DECODE_PROFILES[profile]
+
+
+def vad_skipped_seconds(info) -> float:
+    # Audio the VAD filter removed before decoding
+    return max(0.0, info.duration - info.duration_after_vad)
+
+# Model held by each chunk worker process (see _init_chunk_worker)
+_worker_model = None
+
+
+def _init_chunk_worker(model_size: str, cpu_threads: int):
+    from faster_whisper import WhisperModel
+
+    global _worker_model
+    _worker_model = WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=cpu_threads)
+
+
+def _transcribe_chunk(audio, offset: float, language: str, options: dict) -> TranscriptColumns:
+    # Runs in a chunk worker process; columns pickle far smaller than Segment models
+    segments, info = _worker_model.transcribe(audio, language=language, **options)
+    columns = TranscriptColumns()
+    for _ in iter_columns(segments, columns, offset=offset):
+        pass
+    columns.vad_skipped_seconds = vad_skipped_seconds(info)
+    return columns
+
+
+def _add_vad_skipped(chunks: Iterable[tuple[float, TranscriptColumns]], columns: TranscriptColumns) -> Iterator[tuple[float, TranscriptColumns]]:
+    # Totals the silence skipped in each chunk into the merged transcript as the chunks pass through
+    for offset, chunk in chunks:
+        columns.vad_skipped_seconds += chunk.vad_skipped_seconds
+        yield offset, chunk
+
+
+def _ordered_results(windows, submit: Callable, ahead: int) -> Iterator[tuple[float, TranscriptColumns]]:
+    # Windows are decoded and submitted as they come so only `ahead` are held in memory at once;
+    # `submit(offset, samples)` returns a Future and results are yielded in order
+    pending = deque()
+    for offset, samples in windows:
+        pending.append((offset, submit(offset, samples)))
+        if len(pending) >= ahead:
+            offset, future = pending.popleft()
+            yield offset, future.result()
+    while pending:
+        offset, future = pending.popleft()
+        yield offset, future.result()
+
+
+def iter_columns(segments, columns: TranscriptColumns, offset: float = 0.0) -> Iterator[SegmentView]:
+    """
+    Append faster_whisper segments to `columns` as they are decoded, shifting timestamps by
+    `offset`, and yield a view of each. No per-word models are built.
+    """
+    for segment in segments:
+        words = ((w.word, w.start + offset, w.end + offset, w.probability) for w in segment.words or ())
+        yield columns.append(
+            segment.start + offset,
+            segment.end + offset,
+            segment.text.strip(),
+            segment.avg_logprob, # Approximation or use another metric
+            words,
+        )
+
+
+def append_trimmed(columns: TranscriptColumns, segment: SegmentView, lower: float, upper: float) -> Optional[SegmentView]:
+    """
+    Append the part of a segment whose words start in [lower, upper) to `columns`, numbered
+    after its last segment. Returns None if nothing is left.
+    """
+    starts = segment.word_starts
+    if not len(starts):
+        midpoint = (segment.start_time + segment.end_time) / 2
+        if not lower <= midpoint < upper:
+            return None
+        return columns.append_view(segment, segment_id=len(columns) + 1)
+
+    kept = np.flatnonzero((starts >= lower) & (starts < upper))
+    if not len(kept):
+        return None
+    return columns.append_view(segment, word_indices=kept.tolist(), segment_id=len(columns) + 1)
+
+
+def _with_next(items):
+    # Pair each item with the one after it (None for the last), pulling one item ahead
+    items = iter(items)
+    current = next(items, None)
+    while current is not None:
+        following = next(items, None)
+        yield current, following
+        current = following
+
+
+def iter_merged_columns(chunks: Iterable[tuple[float, Iterable[SegmentView]]], overlap: float = CHUNK_OVERLAP_SECONDS,
+                        columns: TranscriptColumns = None) -> Iterator[SegmentView]:
+    """
+    Merge per-chunk transcriptions (start offset, segments in absolute time) in order into
+    `columns`, yielding each chunk's merged segments once the next chunk's start is known.
+
+    Neighbouring chunks share `overlap` seconds of audio; words heard twice are resolved by
+    cutting in the middle of each overlap region. Segment ids are renumbered.
+    """
+    columns = TranscriptColumns() if columns is None else columns
+    lower = float("-inf")
+    for (start, segments), following in _with_next(chunks):
+        upper = following[0] + overlap / 2 if following else float("inf")
+        for segment in segments:
+            trimmed = append_trimmed(columns, segment, lower, upper)
+            if trimmed is not None:
+                yield trimmed
+        lower = upper
+
+
+def merge_chunk_segments(chunks: list[tuple[float, list[Segment]]], overlap: float = CHUNK_OVERLAP_SECONDS) -> list[Segment]:
+    merged = TranscriptColumns()
+    chunk_columns = [(start, TranscriptColumns.from_segments(segments)) for start, segments in chunks]
+    for _ in iter_merged_columns(chunk_columns, overlap, columns=merged):
+        pass
+    return merged.to_segments()
+
+
+def _decode_window(model, samples: np.ndarray, offset: float, state: dict) -> Iterator[SegmentView]:
+    # Generator, so the decode only runs once the merge starts consuming this window
+    segments, info = model.transcribe(samples, language=state["language"], **state["options"])
+    # Later windows reuse the language detected on the first one
+    state["language"] = state["language"] or info.language
+    state["vad_skipped_seconds"] += vad_skipped_seconds(info)
+    yield from iter_columns(segments, TranscriptColumns(), offset=offset)
+
+
 class TranscriptionAgent:
-    def __init__(self):
-        self.current_model_size = None
-        self.model = None
+    def __init__(self, pool: ModelPool = None, batcher=None):
+        self.pool = pool or ModelPool()
+        # An InferenceBatcher, when set, decodes all windows so they batch with other jobs'
+        self.batcher = batcher
+        self._chunk_pools = {} # model size -> {"pool", "users"}; worker processes hold that size's model
+        self._chunk_lock = threading.Lock()
 
     def load_model(self, model_size: str):
-        if self.model and self.current_model_size == model_size:
-            return  # Already loaded
+        # Warms the pool; transcribe() checks models out per call
+        with self.pool.acquire(model_size):
+            pass
+
+    def detect_language(self, samples: np.ndarray, model_size: str = None) -> Optional[str]:
+        """
+        Detect the spoken language from the first 30s of speech the VAD finds in `samples`, using
+        the smallest model already loaded. Returns None when the probe holds no speech.
+        """
+        model_size = model_size or self.pool.smallest_loaded() or LANGUAGE_PROBE_MODEL_SIZE
+        with self.pool.acquire(model_size) as model:
+            try:
+                language, probability, _ = model.detect_language(samples, vad_filter=True)
+            except ValueError:
+                # The VAD found no speech chunks to concatenate
+                logger.info("No speech found in the language probe")
+                return None
+        logger.info(f"Detected language '{language}' ({probability:.0%}) with the {model_size} model")
+        return language
+
+    @staticmethod
+    def language_probe(audio_path: Path, seconds: float = LANGUAGE_PROBE_SECONDS) -> np.ndarray:
+        # Only the start of the file is decoded
+        blocks = decode_pcm_blocks(audio_path)
+        try:
+            samples, _ = split_head(blocks, seconds)
+        finally:
+            blocks.close()
+        return samples
+
+    def transcribe(self, audio_path: Path, language: str = None, model_size: str = WHISPER_MODEL_SIZE, chunked: bool = False,
+                   on_segment: Callable[[SegmentView], None] = None, profile: str = DECODE_PROFILE) -> TranscriptColumns:
+        """
+        Transcribe a file with the given decode profile. `on_segment` is called with each segment
+        as soon as it is decoded.
+        """
+        options = decode_options(profile)
+        if self.batcher:
+            return self.transcribe_batched(audio_path, language=language, model_size=model_size, on_segment=on_segment, profile=profile)
+        if chunked:
+            return self.transcribe_chunked(audio_path, language=language, model_size=model_size, on_segment=on_segment, profile=profile)
+
+        if not audio_path.exists():
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
         try:
-            import torch
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            logger.info(f"Loading Whisper model '{model_size}' on {device} with {COMPUTE_TYPE}...")
-            
-            # Unload previous model to free memory if needed (Python GC handles it mostly, but explicit delete helps)
-            if self.model:
-                del self.model
-            
-            self.model = WhisperModel(model_size, device=device, compute_type=COMPUTE_TYPE)
-            self.current_model_size = model_size
-            logger.info(f"Model '{model_size}' loaded successfully.")
+            # The model stays checked out until the lazy segment generator is consumed
+            with self.pool.acquire(model_size) as model:
+                logger.info(f"Starting transcription for {audio_path.name}...")
+                segments, info = model.transcribe(str(audio_path), language=language, **options)
+
+                columns = TranscriptColumns()
+                for segment in iter_columns(segments, columns):
+                    if on_segment:
+                        on_segment(segment)
+                columns.vad_skipped_seconds = vad_skipped_seconds(info)
+
+            logger.info(f"Transcription complete. Detected language: {info.language}, VAD skipped {columns.vad_skipped_seconds:.0f}s")
+            return columns
+
         except Exception as e:
-            logger.error(f"Failed to load Whisper model: {e}")
+            logger.error(f"Transcription failed: {e}")
             raise
 
-    def transcribe(self, audio_path: Path, language: str = None, model_size: str = WHISPER_MODEL_SIZE) -> list[Segment]:
-        self.load_model(model_size)
-        
+    def transcribe_batched(self, audio_path: Path, language: str = None, model_size: str = WHISPER_MODEL_SIZE,
+                           on_segment: Callable[[SegmentView], None] = None, profile: str = DECODE_PROFILE) -> TranscriptColumns:
+        """
+        Split the audio into BATCH_WINDOW_SECONDS windows and decode them through the batcher,
+        batched with each other and with the windows of any other job transcribing at the same time.
+        """
+        decode_options(profile)
+        if not audio_path.exists():
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+        # Windows are only batched together when their language is known
+        language = language or self.detect_language(self.language_probe(audio_path))
+        logger.info(f"Starting batched transcription for {audio_path.name}...")
+        windows = window_samples(decode_pcm_blocks(audio_path), BATCH_WINDOW_SECONDS, STREAM_OVERLAP_SECONDS)
+        submit = lambda offset, samples: self.batcher.submit(samples, offset, model_size, language, profile)
+        columns = TranscriptColumns()
+        results = _ordered_results(windows, submit, ahead=self.batcher.batch_size * 2)
+        for segment in iter_merged_columns(_add_vad_skipped(results, columns), STREAM_OVERLAP_SECONDS, columns=columns):
+            if on_segment:
+                on_segment(segment)
+
+        logger.info(f"Batched transcription complete: {len(columns)} segments, VAD skipped {columns.vad_skipped_seconds:.0f}s.")
+        return columns
+
+    def transcribe_chunked(self, audio_path: Path, language: str = None, model_size: str = WHISPER_MODEL_SIZE,
+                           workers: int = CHUNK_WORKERS, on_segment: Callable[[SegmentView], None] = None,
+                           profile: str = DECODE_PROFILE) -> TranscriptColumns:
+        """Split the audio into CHUNK_SIZE_SECONDS chunks and transcribe them in parallel worker processes."""
+        options = decode_options(profile)
         if not audio_path.exists():
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
-        
+
         try:
-            logger.info(f"Starting transcription for {audio_path.name}...")
-            segments, info = self.model.transcribe(
-                str(audio_path), 
-                language=language,
-                beam_size=5,
-                word_timestamps=True # We need word timestamps for better granularity
-            )
+            with self._chunk_pool(model_size, workers) as executor:
+                logger.info(f"Starting chunked transcription for {audio_path.name} on {workers} workers...")
+
+                windows = window_samples(decode_pcm_blocks(audio_path), CHUNK_SIZE_SECONDS, CHUNK_OVERLAP_SECONDS)
+                columns = TranscriptColumns()
+                submit = lambda offset, samples: executor.submit(_transcribe_chunk, samples, offset, language, options)
+                results = _ordered_results(windows, submit, ahead=workers * 2)
+                for segment in iter_merged_columns(_add_vad_skipped(results, columns), CHUNK_OVERLAP_SECONDS, columns=columns):
+                    if on_segment:
+                        on_segment(segment)
+
+            logger.info(f"Chunked transcription complete: {len(columns)} segments.")
+            return columns
 
-            result_segments = []
-            segment_id_counter = 1
-            
-            for segment in segments:
-                # Convert faster_whisper segment to our Schema
-                words = []
-                if segment.words:
-                    for w in segment.words:
-                        words.append(Word(
-                            word=w.word,
-                            start=w.start,
-                            end=w.end,
-                            confidence=w.probability
-                        ))
-
-                result_segments.append(Segment(
-                    segment_id=segment_id_counter,
-                    start_time=segment.start,
-                    end_time=segment.end,
-                    text=segment.text.strip(),
-                    confidence=segment.avg_logprob, # Approximation or use another metric
-                    words=words
-                ))
-                segment_id_counter += 1
-            
-            logger.info(f"Transcription complete. Detected language: {info.language}")
-            return result_segments
-            
         except Exception as e:
-            logger.error(f"Transcription failed: {e}")
+            logger.error(f"Chunked transcription failed: {e}")
             raise
+
+    def transcribe_stream(self, blocks: Iterable[np.ndarray], language: str = None, model_size: str = WHISPER_MODEL_SIZE,
+                          window_seconds: float = STREAM_WINDOW_SECONDS, overlap_seconds: float = STREAM_OVERLAP_SECONDS,
+                          columns: TranscriptColumns = None, profile: str = DECODE_PROFILE) -> Iterator[SegmentView]:
+        """
+        Transcribe a live stream of 16 kHz sample blocks, yielding segments as each window is decoded.
+        The merged transcript, and the seconds of silence the VAD skipped, accumulate in `columns`.
+
+        Windows overlap by `overlap_seconds` and are merged like chunks (see iter_merged_columns).
+        """
+        columns = TranscriptColumns() if columns is None else columns
+        if self.batcher:
+            yield from self._stream_batched(blocks, language, model_size, min(window_seconds, BATCH_WINDOW_SECONDS), overlap_seconds, columns, profile)
+            return
+
+        state = {"language": language, "options": decode_options(profile), "vad_skipped_seconds": 0.0}
+        segment_count = 0
+        with self.pool.acquire(model_size) as model:
+            logger.info(f"Starting streaming transcription ({window_seconds}s windows, '{profile}' profile)...")
+            decoded = (
+                (offset, _decode_window(model, samples, offset, state))
+                for offset, samples in window_samples(blocks, window_seconds, overlap_seconds)
+            )
+            for segment in iter_merged_columns(decoded, overlap_seconds, columns=columns):
+                segment_count += 1
+                yield segment
+        columns.vad_skipped_seconds = state["vad_skipped_seconds"]
+
+        logger.info(f"Streaming transcription complete: {segment_count} segments, VAD skipped {columns.vad_skipped_seconds:.0f}s.")
+
+    def _stream_batched(self, blocks: Iterable[np.ndarray], language: Optional[str], model_size: str, window_seconds: float,
+                        overlap_seconds: float, columns: TranscriptColumns, profile: str) -> Iterator[SegmentView]:
+        # Only a couple of windows ahead, so segments still appear as the audio arrives
+        decode_options(profile)
+        logger.info(f"Starting batched streaming transcription ({window_seconds}s windows, '{profile}' profile)...")
+        windows = window_samples(blocks, window_seconds, overlap_seconds)
+        submit = lambda offset, samples: self.batcher.submit(samples, offset, model_size, language, profile)
+        results = _add_vad_skipped(_ordered_results(windows, submit, ahead=2), columns)
+        yield from iter_merged_columns(results, overlap_seconds, columns=columns)
+        logger.info(f"Streaming transcription complete: {len(columns)} segments, VAD skipped {columns.vad_skipped_seconds:.0f}s.")
+
+    @contextmanager
+    def _chunk_pool(self, model_size: str, workers: int) -> Iterator[ProcessPoolExecutor]:
+        # Checks out the worker pool for `model_size`, shared by the jobs using that size.
+        # Idle pools of other sizes are stopped to free their models; busy ones are left to finish.
+        with self._chunk_lock:
+            for size, entry in list(self._chunk_pools.items()):
+                if size != model_size and entry["users"] == 0:
+                    entry["pool"].shutdown(wait=False, cancel_futures=True)
+                    del self._chunk_pools[size]
+            entry = self._chunk_pools.get(model_size)
+            if entry is None:
+                cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+                # 'spawn' keeps worker processes clear of the orchestrator's background threads
+                pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_chunk_worker,
+                    initargs=(model_size, cpu_threads),
+                )
+                entry = self._chunk_pools[model_size] = {"pool": pool, "users": 0}
+            entry["users"] += 1
+        try:
+            yield entry["pool"]
+        finally:
+            with self._chunk_lock:
+                entry["users"] -= 1
+
+    def shutdown_chunk_pool(self):
+        """Stop every chunk worker process, cancelling chunks not started yet."""
+        with self._chunk_lock:
+            pools, self._chunk_pools = self._chunk_pools, {}
+        for entry in pools.values():
+            entry["pool"].shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import json
+import logging
+import mimetypes
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+from pydantic import ValidationError
+from app.agents.ingestion import is_allowed_url, local_path
+from app.core.orchestrator import Orchestrator, get_orchestrator
+from app.core.scheduler import SchedulerFullError
+from app.core.schemas import JobRequest
+from app.utils.config import API_HOST, API_PORT, API_LOCAL_FILES, API_MAX_BODY_BYTES, JOB_WATCH_TIMEOUT_SECONDS, LOG_FORMAT
+from app.utils.logger import setup_logger
+
+logger = logging.getLogger(__name__)
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+# Fields a client may set when submitting; cookies_path and batch_id are server-side only
+_SUBMIT_FIELDS = {"url", "language", "model_size", "decode_profile", "include_timestamps", "include_speakers", "formats"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiServer:
+    """
+    Minimal asyncio HTTP/1.1 API over the Orchestrator, for non-interactive clients.
+
+        POST /jobs                             {"url": ..., "model_size": ..., "formats": [...], ...} -> 202 {"job_id"}
+        POST /batches                          same fields, for a playlist or channel -> 202 {"batch_id"}
+        GET  /jobs/{id}, /batches/{id}         current status
+        GET  /jobs/{id}/events                 status as server-sent events after every change, until it finishes
+        GET  /jobs/{id}/artifacts/{format}     a written transcript file (also under /batches)
+        GET  /metrics, /stats, /healthz
+
+    One request per connection. Event streams are driven by JobEvents callbacks, so idle
+    watchers hold no threads; blocking orchestrator calls run on the default executor.
+    """
+
+    def __init__(self, orchestrator: Orchestrator, allow_local_files: bool = API_LOCAL_FILES):
+        self.orchestrator = orchestrator
+        self.allow_local_files = allow_local_files
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self._handle, host, port)
+        logger.info(f"API listening on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+        return server
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+                await self._route(writer, method, path, body)
+            except HttpError as e:
+                await self._send_json(writer, e.status, {"error": str(e)})
+            except Exception as e:
+                logger.exception(f"API request failed: {e}")
+                await self._send_json(writer, 500, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise HttpError(400, "Malformed request line")
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > API_MAX_BODY_BYTES:
+            raise HttpError(413, f"Request body exceeds {API_MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return request_line[0].upper(), unquote(urlsplit(request_line[1]).path), body
+
+    async def _route(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes):
+        parts = [part for part in path.split("/") if part]
+        if method == "POST" and parts in (["jobs"], ["batches"]):
+            return await self._submit(writer, parts[0], body)
+        if method != "GET":
+            raise HttpError(405, f"{method} is not supported on {path}")
+
+        if parts == ["healthz"]:
+            return await self._send_json(writer, 200, {"status": "ok"})
+        if parts == ["stats"]:
+            return await self._send_json(writer, 200, self.orchestrator.get_stats())
+        if parts == ["metrics"]:
+            return await self._send(writer, 200, self.orchestrator.metrics_text().encode(), "text/plain; version=0.0.4")
+        if len(parts) >= 2 and parts[0] in ("jobs", "batches"):
+            get_status = self.orchestrator.get_job_status if parts[0] == "jobs" else self.orchestrator.get_batch_status
+            if len(parts) == 2:
+                return await self._send_status(writer, await self._status(get_status, parts[1]))
+            if parts[2:] == ["events"]:
+                return await self._stream_events(writer, get_status, parts[1])
+            if len(parts) == 4 and parts[2] == "artifacts":
+                return await self._send_artifact(writer, await self._status(get_status, parts[1]), parts[3])
+        raise HttpError(404, f"No route for {path}")
+
+    async def _submit(self, writer: asyncio.StreamWriter, kind: str, body: bytes):
+        try:
+            fields = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HttpError(400, f"Invalid JSON: {e}")
+        if not isinstance(fields, dict):
+            raise HttpError(400, "Expected a JSON object")
+        cookies = fields.pop("cookies", None) # cookies.txt contents, kept in the job's scratch directory
+        unknown = set(fields) - _SUBMIT_FIELDS
+        if unknown:
+            raise HttpError(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+        try:
+            # Fields left out keep the orchestrator's defaults
+            options = JobRequest.model_validate(fields).model_dump(include=_SUBMIT_FIELDS, exclude_unset=True)
+        except ValidationError as e:
+            raise HttpError(400, str(e))
+        # Anything else would have the server fetch arbitrary, possibly internal, hosts
+        if not is_allowed_url(options["url"]) and not (self.allow_local_files and local_path(options["url"]) is not None):
+            raise HttpError(400, "Only YouTube URLs are accepted")
+        if cookies is not None and not isinstance(cookies, str):
+            raise HttpError(400, "cookies must be the text of a cookies.txt file")
+
+        start = self.orchestrator.start_job if kind == "jobs" else self.orchestrator.start_batch
+        url = options.pop("url")
+        try:
+            # Batches list the playlist before returning, which takes a network round trip
+            key = await asyncio.to_thread(start, url, cookies=cookies.encode() if cookies else None, **options)
+        except SchedulerFullError as e:
+            raise HttpError(503, str(e))
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        id_field = "job_id" if kind == "jobs" else "batch_id"
+        await self._send_json(writer, 202, {id_field: key, "status_url": f"/{kind}/{key}", "events_url": f"/{kind}/{key}/events"})
+
+    @staticmethod
+    async def _status(get_status, key: str):
+        status = await asyncio.to_thread(get_status, key)
+        if status is None:
+            raise HttpError(404, f"Unknown id {key}")
+        return status
+
+    async def _send_status(self, writer: asyncio.StreamWriter, status):
+        await self._send(writer, 200, status.model_dump_json().encode(), "application/json")
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, get_status, key: str):
+        status = await self._status(get_status, key)
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        unsubscribe = self.orchestrator.events.subscribe(key, lambda: loop.call_soon_threadsafe(changed.set))
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            sent = 0
+            while True:
+                # Only segments not sent before are included; the full transcript is in the artifacts
+                segments = getattr(status, "partial_segments", None)
+                if segments is not None and len(segments) < sent:
+                    sent = 0 # Restarted, e.g. requeued after a worker died
+                event = status.model_dump(mode="json", exclude={"partial_segments"})
+                if segments is not None:
+                    event["new_segments"] = [segment.model_dump(mode="json") for segment in segments[sent:]]
+                    sent = len(segments)
+                writer.write(f"event: status\ndata: {json.dumps(event)}\n\n".encode())
+                await writer.drain()
+                if status.status in ("completed", "failed"):
+                    return
+
+                # Events arriving during the read below set the flag again, so none are missed.
+                # Jobs running in another process publish nothing here; the timeout re-reads them.
+                try:
+                    await asyncio.wait_for(changed.wait(), JOB_WATCH_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                changed.clear()
+                status = await self._status(get_status, key)
+        finally:
+            unsubscribe()
+
+    async def _send_artifact(self, writer: asyncio.StreamWriter, status, extension: str):
+        path = status.artifacts.get(extension)
+        if path is None:
+            raise HttpError(404, f"No {extension} transcript for {getattr(status, 'job_id', None) or status.batch_id} ({status.status})")
+        path = Path(path)
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            raise HttpError(404, f"{path.name} was removed from the output directory")
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        await self._send(writer, 200, data, content_type, {"Content-Disposition": f'attachment; filename="{path.name}"'})
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict):
+        await self._send(writer, status, json.dumps(payload, default=str).encode(), "application/json")
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+        head = f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+
+async def serve(host: str = API_HOST, port: int = API_PORT, allow_local_files: bool = API_LOCAL_FILES, model_size: str = None):
+    orchestrator = get_orchestrator()
+    if model_size:
+        # The first job finds the model loaded
+        orchestrator.transcription.pool.prewarm(model_size)
+    server = await ApiServer(orchestrator, allow_local_files).start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.api.server", description="Headless HTTP API for transcription jobs.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--model", help="Model size to load at startup, e.g. 'medium'")
+    parser.add_argument("--allow-local-files", action="store_true", default=API_LOCAL_FILES, help="Accept file paths on this server as job URLs")
+    args = parser.parse_args(argv)
+    setup_logger("app", json_format=LOG_FORMAT == "json")
+    try:
+        asyncio.run(serve(args.host, args.port, args.allow_local_files, args.model))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
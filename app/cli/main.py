@@ -0,0 +1,153 @@
+import argparse
+import json
+import logging
+import queue
+import sys
+import threading
+from pathlib import Path
+from app.agents.transcription import DECODE_PROFILES
+from app.core.job_store import InMemoryJobStore
+from app.core.orchestrator import Orchestrator
+from app.core.scheduler import JobScheduler
+from app.utils.config import DECODE_PROFILE, INGESTION_WORKERS, LOG_FORMAT, MODEL_SIZES, OUTPUT_FORMATS, TRANSCRIPTION_WORKERS, WHISPER_MODEL_SIZE
+from app.utils.logger import setup_logger
+
+logger = logging.getLogger(__name__)
+
+
+def _formats(value: str) -> list[str]:
+    formats = [extension.strip().lower() for extension in value.split(",") if extension.strip()]
+    unknown = [extension for extension in formats if extension not in OUTPUT_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"unknown format '{', '.join(unknown)}', expected some of {', '.join(OUTPUT_FORMATS)}")
+    return formats
+
+
+def _positive(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="transcribe",
+        description="Transcribe YouTube videos, playlists or local audio files without the web UI. "
+                    "Progress goes to stderr; the written transcript files are printed to stdout.",
+    )
+    parser.add_argument("urls", nargs="+", metavar="URL", help="YouTube video or playlist URL, or a local audio file")
+    parser.add_argument("--model", choices=MODEL_SIZES, default=WHISPER_MODEL_SIZE, help=f"Whisper model size (default: {WHISPER_MODEL_SIZE})")
+    parser.add_argument("--format", dest="formats", type=_formats, action="extend",
+                        help=f"Output formats, comma separated or repeated (default: {','.join(OUTPUT_FORMATS)})")
+    parser.add_argument("--workers", type=_positive, default=TRANSCRIPTION_WORKERS, help=f"Videos decoded at the same time (default: {TRANSCRIPTION_WORKERS})")
+    parser.add_argument("--language", help="Spoken language, e.g. 'en' (default: detected)")
+    parser.add_argument("--profile", choices=list(DECODE_PROFILES), default=DECODE_PROFILE, help=f"Decode profile (default: {DECODE_PROFILE})")
+    parser.add_argument("--playlist", action="store_true", help="Treat each URL as a playlist or channel and write one combined transcript for it")
+    parser.add_argument("--no-timestamps", action="store_true", help="Leave timestamps out of the transcript text")
+    parser.add_argument("--no-speakers", action="store_true", help="Skip speaker identification")
+    parser.add_argument("--cookies", type=Path, help="cookies.txt in Netscape format, for age-restricted or private videos")
+    parser.add_argument("--json", action="store_true", help="Print each final job status as one line of JSON instead of file paths")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log pipeline details to stderr")
+    return parser
+
+
+def _run(orchestrator: Orchestrator, url: str, args: argparse.Namespace, progress) -> dict:
+    # Submits one URL and follows it to the end; returns its final status
+    options = dict(
+        language=args.language,
+        model_size=args.model,
+        decode_profile=args.profile,
+        include_timestamps=not args.no_timestamps,
+        include_speakers=not args.no_speakers,
+        cookies_path=str(args.cookies) if args.cookies else None,
+        formats=args.formats,
+    )
+    try:
+        if args.playlist:
+            watch = orchestrator.watch_batch(orchestrator.start_batch(url, **options))
+        else:
+            watch = orchestrator.watch_job(orchestrator.start_job(url, **options))
+    except Exception as e:
+        # Rejected before queueing, e.g. a playlist that could not be listed
+        return {"url": url, "status": "failed", "error": str(e), "artifacts": {}}
+
+    status, shown = None, None
+    for status in watch:
+        if status is None:
+            return {"url": url, "status": "failed", "error": "Job status was lost", "artifacts": {}}
+        # Partial segments also wake the watcher; only progress changes are reported
+        step = getattr(status, "current_step", None) or f"{status.completed + status.failed}/{len(status.job_ids)} videos"
+        if (step, status.progress_percent) != shown:
+            shown = (step, status.progress_percent)
+            progress(f"{url}: {step} {status.progress_percent}%")
+    return dict(status.model_dump(mode="json", exclude={"partial_segments"}), url=url)
+
+
+def main(argv: list[str] = None, orchestrator: Orchestrator = None, stdout=None, stderr=None) -> int:
+    """
+    Entry point of the `transcribe` command. Returns the exit status: 0 when every URL was
+    transcribed, 1 when any failed. Tests pass their own `orchestrator`; otherwise one is built
+    with an in-memory job store, so the command neither runs nor leaves behind jobs queued by
+    the web UI, and with `--workers` transcription workers sharing one model pool.
+    """
+    stdout, stderr = stdout or sys.stdout, stderr or sys.stderr
+    args = build_parser().parse_args(argv)
+    setup_logger("app", level=logging.INFO if args.verbose else logging.WARNING, json_format=LOG_FORMAT == "json", stream=stderr)
+
+    owned = orchestrator is None
+    if owned:
+        orchestrator = Orchestrator(scheduler=JobScheduler(transcription_workers=args.workers), store=InMemoryJobStore())
+        # Loads while the first videos download
+        orchestrator.transcription.pool.prewarm(args.model)
+
+    output_lock = threading.Lock()
+    def progress(line: str):
+        with output_lock:
+            print(line, file=stderr, flush=True)
+
+    # URLs are submitted as workers free up rather than all at once, so long URL lists are never
+    # rejected by the job queue limit; downloads for the next videos overlap decoding
+    slots = threading.BoundedSemaphore(args.workers + INGESTION_WORKERS)
+    results = queue.SimpleQueue()
+
+    def run(url: str):
+        try:
+            results.put(_run(orchestrator, url, args, progress))
+        except Exception as e:
+            results.put({"url": url, "status": "failed", "error": str(e), "artifacts": {}})
+        finally:
+            slots.release()
+
+    def feed():
+        for url in args.urls:
+            slots.acquire()
+            threading.Thread(target=run, args=(url,), name="cli-job", daemon=True).start()
+
+    failed = 0
+    try:
+        threading.Thread(target=feed, name="cli-feed", daemon=True).start()
+        for _ in args.urls:
+            result = results.get()
+            with output_lock:
+                if result["status"] != "completed":
+                    failed += 1
+                    print(f"{result['url']}: failed: {result.get('error')}", file=stderr, flush=True)
+                if args.json:
+                    print(json.dumps(result), file=stdout, flush=True)
+                else:
+                    for path in result["artifacts"].values():
+                        print(path, file=stdout, flush=True)
+    except KeyboardInterrupt:
+        print("Interrupted", file=stderr)
+        if owned:
+            orchestrator.shutdown(wait=False)
+        return 130
+
+    if owned:
+        orchestrator.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
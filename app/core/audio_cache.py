@@ -0,0 +1,208 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+import fcntl
+import glob
+import os
+import shutil
+import threading
+import time
+import logging
+from app.utils.config import CACHE_DIR, AUDIO_CACHE_MAX_MB, PARTIAL_DOWNLOAD_MAX_AGE_HOURS
+
+logger = logging.getLogger(__name__)
+
+
+def _link_or_copy(source: Path, target: Path):
+    # Hard links share the data, so entries evicted or jobs cleaned up never pull the file from under the other
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class AudioCache:
+    """
+    On-disk cache of downloaded audio, one file per video id and download mode.
+
+    The audio Whisper decodes does not depend on the model size, language or decode profile,
+    so any later job for the same video skips the download. fetch() is single-flight:
+    concurrent jobs for one video wait on a single download instead of each starting their own,
+    also across processes sharing `cache_dir`, which take an flock per key around the download.
+    File mtimes track recency; the least recently used entries are evicted beyond `max_bytes`.
+    Downloads run in `partial_dir`, so one that fails is resumed by the next job for the video.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR / "audio", max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_flight = {} # key -> Future of the cached path
+        for tmp_path in self.cache_dir.glob("*.tmp"):
+            tmp_path.unlink(missing_ok=True) # Left by a crash while adding an entry
+        self.partial_dir = self.cache_dir / "partial"
+        self.partial_dir.mkdir(exist_ok=True)
+        self.lock_dir = self.cache_dir / "locks"
+        self.lock_dir.mkdir(exist_ok=True)
+        cutoff = time.time() - PARTIAL_DOWNLOAD_MAX_AGE_HOURS * 3600
+        for path in self.partial_dir.rglob("*"):
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True) # Never resumed
+        # key -> cached file; entries keep the downloaded file's extension
+        self._entries = {path.stem: path for path in self.cache_dir.iterdir() if path.is_file()}
+        self._size = sum(path.stat().st_size for path in self._entries.values())
+        self.metrics = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(video_id: str, mode: str) -> str:
+        return f"{video_id}.{mode}"
+
+    def get(self, key: str) -> Optional[Path]:
+        with self._lock:
+            path = self._entries.get(key)
+        if path is None:
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        return path
+
+    def fetch(self, key: str, dest_dir: Path, download: Callable[[], Path]) -> Path:
+        """
+        Return the audio for `key` as a file in `dest_dir`, linked from the cache when present.
+        Otherwise the first caller runs `download()` (which writes into its own `dest_dir`) and
+        caches the result, while concurrent callers for the same key wait for it. If it fails,
+        waiting callers run their own `download()` instead of taking on the error, which may be
+        the first caller's own (its cookies, its disk quota).
+        """
+        while True:
+            cached = self.get(key)
+            with self._lock:
+                if cached is not None:
+                    self.metrics["hits"] += 1
+                    future, leader = None, False
+                elif key in self._in_flight:
+                    self.metrics["coalesced"] += 1
+                    future, leader = self._in_flight[key], False
+                else:
+                    self.metrics["misses"] += 1
+                    future, leader = Future(), True
+                    self._in_flight[key] = future
+
+            if not leader and future is not None:
+                logger.info(f"Waiting for the download of {key} already in progress")
+                try:
+                    cached = future.result()
+                except Exception as e:
+                    logger.info(f"Download of {key} by another job failed ({e}), downloading it for this one")
+                    continue
+            break
+
+        if cached is not None:
+            path = dest_dir / cached.name
+            _link_or_copy(cached, path)
+            return path
+
+        # Leaves the in-flight map before waiters wake up, so a retrying one doesn't find the same future
+        try:
+            with self._download_lock(key):
+                entry = self._find(key)
+                if entry is not None:
+                    logger.info(f"Audio for {key} was downloaded by another process")
+                    path = dest_dir / entry.name
+                    _link_or_copy(entry, path)
+                else:
+                    path = download()
+                    entry = self.put(key, path)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._in_flight.pop(key, None)
+        future.set_result(entry)
+        return path
+
+    @contextmanager
+    def _download_lock(self, key: str):
+        # Released when the file is closed, also if the process dies mid-download
+        with open(self.lock_dir / f"{key}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _find(self, key: str) -> Optional[Path]:
+        # Picks up an entry another process added since this one listed the directory
+        for path in self.cache_dir.glob(f"{glob.escape(key)}.*"):
+            if path.stem != key or path.suffix == ".tmp":
+                continue
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                if self._entries.get(key) != path:
+                    self._entries[key] = path
+                    self._size += size
+            return path
+        return None
+
+    def put(self, key: str, path: Path) -> Path:
+        """Add a downloaded file to the cache, leaving `path` in place. Returns the cache entry."""
+        target = self.cache_dir / f"{key}{path.suffix}"
+        tmp_path = target.with_name(f"{target.name}.{threading.get_ident()}.tmp")
+        try:
+            _link_or_copy(path, tmp_path)
+            size = tmp_path.stat().st_size
+            old_size = target.stat().st_size if target.exists() else 0
+            os.replace(tmp_path, target)  # Atomic, readers never see a partial file
+        except OSError as e:
+            logger.warning(f"Could not write audio cache entry: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return path
+
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None and old != target:
+                # Downloaded with another extension before
+                try:
+                    old_size += old.stat().st_size
+                    old.unlink()
+                except FileNotFoundError:
+                    pass
+            self._entries[key] = target
+            self._size += size - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+        return target
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.metrics, entries=len(self._entries), size_bytes=self._size, max_bytes=self.max_bytes)
+
+    def _evict(self):
+        # Called with the lock held
+        entries = []
+        for key, path in self._entries.items():
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, key, path))
+            except FileNotFoundError:
+                continue
+
+        self._entries = {key: path for _, _, key, path in entries}
+        self._size = sum(size for _, size, _, _ in entries)
+        for _, size, key, path in sorted(entries):
+            if self._size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            del self._entries[key]
+            self._size -= size
+            self.metrics["evictions"] += 1
+            logger.info(f"Evicted cached audio {path.name}")
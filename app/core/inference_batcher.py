@@ -0,0 +1,185 @@
+from concurrent.futures import Future
+from typing import Callable, Optional
+import threading
+import time
+import logging
+import numpy as np
+from app.agents.transcription import decode_options, iter_columns
+from app.core.model_pool import ModelPool
+from app.core.transcript_columns import TranscriptColumns
+from app.utils.audio import SAMPLE_RATE
+from app.utils.config import DECODE_PROFILE, INFERENCE_BATCH_SIZE, INFERENCE_BATCH_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Whisper's receptive field; longer windows would be cut
+MAX_WINDOW_SECONDS = 30
+
+
+def batched_pipeline(model):
+    from faster_whisper import BatchedInferencePipeline
+    return BatchedInferencePipeline(model=model)
+
+
+def speech_span(samples: np.ndarray) -> Optional[tuple[int, int]]:
+    """First and last speech sample found by faster-whisper's Silero VAD, or None if there is no speech."""
+    from faster_whisper.vad import get_speech_timestamps
+
+    speech = get_speech_timestamps(samples)
+    if not speech:
+        return None
+    return speech[0]["start"], speech[-1]["end"]
+
+
+class _Window:
+    __slots__ = ("samples", "offset", "future", "submitted_at")
+
+    def __init__(self, samples: np.ndarray, offset: float):
+        self.samples = samples
+        self.offset = offset
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+
+
+class InferenceBatcher:
+    """
+    Collects windows of up to 30 seconds from any number of concurrent transcriptions and
+    decodes them together through faster-whisper's BatchedInferencePipeline.
+
+    Windows are grouped by (model size, language, decode profile), since one call shares the
+    model, tokenizer and options. A group runs once it holds `batch_size` windows or its oldest
+    window has waited `max_wait_seconds`. Each window's segments come back on its own Future,
+    already shifted to the window's offset.
+    """
+
+    def __init__(self, pool: ModelPool, batch_size: int = INFERENCE_BATCH_SIZE, max_wait_seconds: float = INFERENCE_BATCH_WAIT_SECONDS,
+                 pipeline_factory: Callable = batched_pipeline, speech_detector: Callable = speech_span):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pipeline_factory = pipeline_factory
+        self._speech_detector = speech_detector
+        self._groups = {} # key -> windows waiting, oldest first
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.metrics = {"batches": 0, "windows": 0, "audio_seconds": 0.0, "decode_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, samples: np.ndarray, offset: float, model_size: str, language: str = None,
+               profile: str = DECODE_PROFILE) -> Future:
+        """
+        Queue a window for decoding. The Future resolves to its TranscriptColumns, with
+        vad_skipped_seconds set. Without a language the window is decoded on its own, since
+        detection on a batch would mix the audio of unrelated jobs.
+        """
+        if len(samples) > MAX_WINDOW_SECONDS * SAMPLE_RATE:
+            raise ValueError(f"Windows are limited to {MAX_WINDOW_SECONDS}s, got {len(samples) / SAMPLE_RATE:.1f}s")
+        decode_options(profile)
+        window = _Window(samples, offset)
+        key = (model_size, language, profile) if language else (model_size, None, profile, id(window))
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Inference batcher is shut down")
+            self._groups.setdefault(key, []).append(window)
+            self._cond.notify()
+        return window.future
+
+    def stats(self) -> dict:
+        with self._cond:
+            return dict(self.metrics, waiting=sum(len(windows) for windows in self._groups.values()))
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            for windows in self._groups.values():
+                for window in windows:
+                    window.future.cancel()
+            self._groups.clear()
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def _next_batch(self) -> Optional[tuple[tuple, list[_Window]]]:
+        # Called with the lock held; waits until a group is full or its oldest window has waited long enough
+        while not self._stopped:
+            now = time.monotonic()
+            deadline = None
+            for key, windows in self._groups.items():
+                due = windows[0].submitted_at + self.max_wait_seconds
+                if len(windows) >= self.batch_size or due <= now:
+                    batch, self._groups[key] = windows[:self.batch_size], windows[self.batch_size:]
+                    if not self._groups[key]:
+                        del self._groups[key]
+                    return key, batch
+                deadline = due if deadline is None else min(deadline, due)
+            self._cond.wait(timeout=None if deadline is None else deadline - now)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._next_batch()
+            if batch is None:
+                return
+            key, windows = batch
+            windows = [window for window in windows if window.future.set_running_or_notify_cancel()]
+            if windows:
+                self._decode(key[0], key[1], key[2], windows)
+
+    def _decode(self, model_size: str, language: Optional[str], profile: str, windows: list[_Window]):
+        try:
+            start = time.monotonic()
+            results = self._decode_batch(model_size, language, profile, windows)
+            elapsed = time.monotonic() - start
+        except Exception as e:
+            logger.error(f"Batched decode of {len(windows)} windows failed: {e}")
+            for window in windows:
+                window.future.set_exception(e)
+            return
+
+        audio_seconds = sum(len(window.samples) for window in windows) / SAMPLE_RATE
+        with self._cond:
+            self.metrics["batches"] += 1
+            self.metrics["windows"] += len(windows)
+            self.metrics["audio_seconds"] += audio_seconds
+            self.metrics["decode_seconds"] += elapsed
+        logger.debug(f"Decoded a batch of {len(windows)} windows ({audio_seconds:.0f}s of audio) in {elapsed:.1f}s")
+        for window, columns in zip(windows, results):
+            window.future.set_result(columns)
+
+    def _decode_batch(self, model_size: str, language: Optional[str], profile: str, windows: list[_Window]) -> list[TranscriptColumns]:
+        options = dict(decode_options(profile))
+        use_vad = options.pop("vad_filter", False)
+        results = [TranscriptColumns() for _ in windows]
+
+        # Windows are laid end to end in one buffer and each is passed as a clip, so the pipeline
+        # encodes all of them in one batch. With the VAD, leading and trailing silence is cut and
+        # silent windows are dropped.
+        clips, clip_windows, parts, base = [], [], [], 0
+        for index, window in enumerate(windows):
+            span = self._speech_detector(window.samples) if use_vad else (0, len(window.samples))
+            kept = 0 if span is None else span[1] - span[0]
+            results[index].vad_skipped_seconds = (len(window.samples) - kept) / SAMPLE_RATE
+            if not kept:
+                continue
+            parts.append(window.samples[span[0]:span[1]])
+            clips.append({"start": base / SAMPLE_RATE, "end": (base + kept) / SAMPLE_RATE})
+            clip_windows.append((index, window.offset + span[0] / SAMPLE_RATE - base / SAMPLE_RATE))
+            base += kept
+        if not clips:
+            return results
+
+        with self.pool.acquire(model_size) as model:
+            pipeline = self._pipeline_factory(model)
+            segments, _ = pipeline.transcribe(
+                np.concatenate(parts), language=language, clip_timestamps=clips, vad_filter=False, batch_size=len(clips),
+                without_timestamps=False, **options
+            )
+            # Route each segment back to the clip it starts in, and shift it to that window's time
+            clip_starts = np.array([clip["start"] for clip in clips])
+            for segment in segments:
+                clip = max(0, int(np.searchsorted(clip_starts, segment.start + 1e-3, side="right")) - 1)
+                index, shift = clip_windows[clip]
+                for _ in iter_columns([segment], results[index], offset=shift):
+                    pass
+        return results
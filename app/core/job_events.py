@@ -0,0 +1,104 @@
+from typing import Callable, Optional
+import threading
+
+
+class _Topic:
+    def __init__(self, lock: threading.Lock):
+        self.version = 0
+        self.closed = False
+        self.waiters = 0
+        self.callbacks = []
+        self.cond = threading.Condition(lock)
+
+
+class JobEvents:
+    """
+    Change notifications for jobs and batches, keyed by their id.
+
+    Every publish() bumps the key's version and wakes the threads waiting on that key only.
+    Watchers remember the last version they saw and call wait() with it, then read the
+    status; an event published in between is never missed, because wait() returns at once
+    when the version has already moved on. Callers that cannot block a thread (the async API)
+    subscribe() a callback instead. close() marks the last event of a key and drops it once
+    no one is waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics = {} # key -> _Topic, while it has events or waiters
+
+    def version(self, key: str) -> int:
+        with self._lock:
+            topic = self._topics.get(key)
+            return topic.version if topic else 0
+
+    def publish(self, key: str):
+        with self._lock:
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = _Topic(self._lock)
+            topic.version += 1
+            topic.cond.notify_all()
+            callbacks = list(topic.callbacks)
+        for callback in callbacks:
+            callback()
+
+    def close(self, key: str):
+        with self._lock:
+            topic = self._topics.get(key)
+            if topic is None:
+                return
+            topic.version += 1
+            topic.closed = True
+            topic.cond.notify_all()
+            callbacks = list(topic.callbacks)
+            if not topic.waiters and not topic.callbacks:
+                del self._topics[key]
+        for callback in callbacks:
+            callback()
+
+    def subscribe(self, key: str, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call `callback()` after every event of `key`, on the publishing thread, so it must not block
+        (e.g. loop.call_soon_threadsafe). Returns the function that unsubscribes it.
+        """
+        with self._lock:
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = _Topic(self._lock)
+            topic.callbacks.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in topic.callbacks:
+                    topic.callbacks.remove(callback)
+                self._discard(key, topic)
+        return unsubscribe
+
+    def wait(self, key: str, seen: int, timeout: Optional[float] = None) -> int:
+        """Block until `key` has an event newer than version `seen`, or `timeout`. Returns the current version."""
+        with self._lock:
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = _Topic(self._lock)
+            topic.waiters += 1
+            try:
+                topic.cond.wait_for(lambda: topic.version != seen or topic.closed, timeout)
+                return topic.version
+            finally:
+                topic.waiters -= 1
+                self._discard(key, topic)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "topics": len(self._topics),
+                "waiters": sum(topic.waiters for topic in self._topics.values()),
+                "subscribers": sum(len(topic.callbacks) for topic in self._topics.values()),
+            }
+
+    def _discard(self, key: str, topic: _Topic):
+        # Called with the lock held. Topics created only to wait on (e.g. jobs running in another
+        # process) are not kept
+        if not topic.waiters and not topic.callbacks and (topic.closed or not topic.version) and self._topics.get(key) is topic:
+            del self._topics[key]
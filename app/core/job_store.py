@@ -0,0 +1,305 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+import sqlite3
+import threading
+import time
+import logging
+from app.core.schemas import JobRequest, JobStatus
+from app.utils.config import JOB_STORE_BACKEND, JOB_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class JobStore(ABC):
+    """
+    Persistence for job status and the queue of jobs waiting to run.
+
+    A job is added as 'queued'; workers take it with claim_next(), which must be atomic
+    so several processes sharing a store never run the same job. Partial segments are
+    live progress only and are not persisted.
+    """
+
+    @abstractmethod
+    def add(self, job: JobStatus, request: JobRequest, worker_id: str = None):
+        """Store a new job. With `worker_id` the job is reserved for that worker and never handed out by claim_next."""
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        ...
+
+    @abstractmethod
+    def update(self, job: JobStatus):
+        ...
+
+    @abstractmethod
+    def claim_next(self, worker_id: str) -> Optional[tuple[JobStatus, JobRequest]]:
+        """
+        Atomically take the oldest unreserved queued job, marking it as processing by `worker_id`.
+        Uploaded cookies are handed to the claiming worker and dropped from the store.
+        """
+        ...
+
+    @abstractmethod
+    def count_queued(self) -> int:
+        """Jobs waiting to be claimed (reserved jobs excluded)."""
+        ...
+
+    @abstractmethod
+    def list_jobs(self, status: str = None, limit: int = 100) -> list[JobStatus]:
+        """Most recently created jobs first."""
+        ...
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str):
+        """Mark every unfinished job held by `worker_id` as recently updated, so it is not considered stale."""
+        ...
+
+    @abstractmethod
+    def requeue_stale(self, stale_seconds: float) -> int:
+        """Put unfinished jobs whose worker stopped updating them back in the queue (e.g. after a crash)."""
+        ...
+
+    @abstractmethod
+    def purge(self, ttl_seconds: float) -> int:
+        """Delete finished jobs not updated for `ttl_seconds`."""
+        ...
+
+
+def _serialize(job: JobStatus) -> str:
+    return job.model_dump_json(exclude={"partial_segments"})
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Process-local store, for tests and single-process deployments that don't need persistence.
+    Like the SQLite columns, each row keeps the status and creation time next to the JSON payload,
+    so polling the queue never parses jobs.
+    """
+
+    def __init__(self):
+        self._rows = {}  # job_id -> dict(job, status, created_at, request, worker_id, updated)
+        self._lock = threading.Lock()
+
+    def add(self, job: JobStatus, request: JobRequest, worker_id: str = None):
+        with self._lock:
+            self._rows[job.job_id] = {"job": _serialize(job), "status": job.status, "created_at": job.created_at,
+                                      "request": request, "worker_id": worker_id, "updated": time.time()}
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            row = self._rows.get(job_id)
+            return JobStatus.model_validate_json(row["job"]) if row else None
+
+    def update(self, job: JobStatus):
+        with self._lock:
+            row = self._rows.get(job.job_id)
+            if row:
+                row.update(job=_serialize(job), status=job.status, updated=time.time())
+
+    def claim_next(self, worker_id: str) -> Optional[tuple[JobStatus, JobRequest]]:
+        with self._lock:
+            queued = [row for row in self._rows.values() if row["worker_id"] is None and row["status"] == "queued"]
+            if not queued:
+                return None
+            row = min(queued, key=lambda row: row["created_at"])
+            job = JobStatus.model_validate_json(row["job"])
+            job.status = "processing"
+            request = row["request"]
+            row.update(job=_serialize(job), status=job.status, request=request.model_copy(update={"cookies": None}),
+                       worker_id=worker_id, updated=time.time())
+            return job, request
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return sum(1 for row in self._rows.values() if row["worker_id"] is None and row["status"] == "queued")
+
+    def list_jobs(self, status: str = None, limit: int = 100) -> list[JobStatus]:
+        with self._lock:
+            rows = sorted((row for row in self._rows.values() if status is None or row["status"] == status),
+                          key=lambda row: row["created_at"], reverse=True)
+            rows = rows[:limit] if limit else rows
+            return [JobStatus.model_validate_json(row["job"]) for row in rows]
+
+    def heartbeat(self, worker_id: str):
+        now = time.time()
+        with self._lock:
+            for row in self._rows.values():
+                if row["worker_id"] == worker_id and row["status"] not in FINISHED_STATUSES:
+                    row["updated"] = now
+
+    def requeue_stale(self, stale_seconds: float) -> int:
+        cutoff = time.time() - stale_seconds
+        requeued = 0
+        with self._lock:
+            for row in self._rows.values():
+                if row["status"] not in FINISHED_STATUSES and row["worker_id"] and row["updated"] < cutoff:
+                    job = JobStatus.model_validate_json(row["job"])
+                    job.status, job.current_step, job.progress_percent = "queued", "queued", 0
+                    row.update(job=_serialize(job), status=job.status, worker_id=None)
+                    requeued += 1
+        return requeued
+
+    def purge(self, ttl_seconds: float) -> int:
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, row in self._rows.items()
+                if row["updated"] < cutoff and row["status"] in FINISHED_STATUSES
+            ]
+            for job_id in expired:
+                del self._rows[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    SQLite-backed store. Status and timestamps are indexed columns next to the JSON payload,
+    so lookups by id, status counts and queue claims never scan the whole table.
+    Safe to share between processes on one host (WAL mode, immediate transactions for claims).
+    """
+
+    def __init__(self, path: Path = JOB_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; multi-statement operations use explicit transactions
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                worker_id TEXT,
+                request TEXT NOT NULL,
+                job TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs (status, updated_at);
+        """)
+
+    def add(self, job: JobStatus, request: JobRequest, worker_id: str = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, created_at, updated_at, worker_id, request, job) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.status, job.created_at.timestamp(), time.time(), worker_id, request.model_dump_json(), _serialize(job)),
+            )
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            row = self._conn.execute("SELECT status, job FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def update(self, job: JobStatus):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, job = ? WHERE job_id = ?",
+                (job.status, time.time(), _serialize(job), job.job_id),
+            )
+
+    def claim_next(self, worker_id: str) -> Optional[tuple[JobStatus, JobRequest]]:
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two processes can't claim the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id, job, request FROM jobs WHERE status = 'queued' AND worker_id IS NULL ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job = JobStatus.model_validate_json(row["job"])
+                job.status = "processing"
+                request = JobRequest.model_validate_json(row["request"])
+                # Credentials stay on disk no longer than the job is queued
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = ?, updated_at = ?, job = ?, request = ? WHERE job_id = ?",
+                    (job.status, worker_id, time.time(), _serialize(job), request.model_dump_json(exclude={"cookies"}), job.job_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job, request
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND worker_id IS NULL").fetchone()[0]
+
+    def list_jobs(self, status: str = None, limit: int = 100) -> list[JobStatus]:
+        query = "SELECT status, job FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def heartbeat(self, worker_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE worker_id = ? AND status IN ('queued', 'processing')",
+                (time.time(), worker_id),
+            )
+
+    def requeue_stale(self, stale_seconds: float) -> int:
+        cutoff = time.time() - stale_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT job_id, job FROM jobs WHERE status IN ('queued', 'processing') AND worker_id IS NOT NULL AND updated_at < ?",
+                    (cutoff,),
+                ).fetchall()
+                for row in rows:
+                    job = JobStatus.model_validate_json(row["job"])
+                    job.status, job.current_step, job.progress_percent = "queued", "queued", 0
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker_id = NULL, updated_at = ?, job = ? WHERE job_id = ?",
+                        (time.time(), _serialize(job), row["job_id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if rows:
+            logger.info(f"Requeued {len(rows)} interrupted jobs")
+        return len(rows)
+
+    def purge(self, ttl_seconds: float) -> int:
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_job(row) -> JobStatus:
+        job = JobStatus.model_validate_json(row["job"])
+        job.status = row["status"]  # The column is authoritative
+        return job
+
+
+def create_job_store(backend: str = JOB_STORE_BACKEND) -> JobStore:
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"Unknown job store backend: {backend}")
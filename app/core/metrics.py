@@ -0,0 +1,141 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+import bisect
+import os
+import threading
+import time
+
+# Upper bounds, in seconds, for stage durations
+TIME_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+# Decode wall time per second of audio
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class StageTimer:
+    """
+    Wall and CPU time of one stage, accumulated over start()/stop() pairs. CPU time is the
+    calling thread's, so concurrent jobs don't count towards each other's stages; work the
+    stage hands to other threads (CTranslate2's intra-op threads, diarization workers) is not
+    included. With `children`, the CPU of child processes waited for meanwhile (ffmpeg) is added
+    as well, as `children_seconds`; those are counted process-wide.
+    """
+
+    def __init__(self, children: bool = False):
+        self.children = children
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.children_seconds = 0.0
+
+    def start(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        self._children = _children_cpu_time() if self.children else 0.0
+
+    def stop(self):
+        self.wall_seconds += time.perf_counter() - self._wall
+        self.cpu_seconds += time.thread_time() - self._cpu
+        if self.children:
+            children = _children_cpu_time() - self._children
+            self.children_seconds += children
+            self.cpu_seconds += children
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _children_cpu_time() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class PipelineMetrics:
+    """
+    Process-wide aggregates of the job pipeline: per-stage wall and CPU time histograms,
+    a real-time factor histogram, and counters. render() produces the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {} # (name, stage or None) -> Histogram
+        self._counters = {} # (name, ((label, value), ...)) -> value
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[StageTimer]:
+        """Time a stage and add it to the histograms. The timer holds the result after the block."""
+        timer = StageTimer()
+        with timer:
+            yield timer
+        self.observe_stage(stage, timer.wall_seconds, timer.cpu_seconds)
+
+    def observe_stage(self, stage: str, wall_seconds: float, cpu_seconds: float):
+        with self._lock:
+            self._histogram("stage_wall_seconds", stage, TIME_BUCKETS).observe(wall_seconds)
+            self._histogram("stage_cpu_seconds", stage, TIME_BUCKETS).observe(cpu_seconds)
+
+    def observe_realtime_factor(self, value: float):
+        with self._lock:
+            self._histogram("realtime_factor", None, RTF_BUCKETS).observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                full_name = f"transcriber_{name}"
+                lines.append(f"# TYPE {full_name} histogram")
+                for (hist_name, stage), hist in sorted(self._histograms.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+                    if hist_name != name:
+                        continue
+                    labels = f'stage="{stage}",' if stage else ""
+                    cumulative = 0
+                    for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        cumulative += count
+                        lines.append(f'{full_name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+                    suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+                    lines.append(f"{full_name}_sum{suffix} {hist.sum:.6f}")
+                    lines.append(f"{full_name}_count{suffix} {hist.count}")
+            for name in sorted({name for name, _ in self._counters}):
+                full_name = f"transcriber_{name}"
+                lines.append(f"# TYPE {full_name} counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        suffix = "{" + ",".join(f'{key}="{label}"' for key, label in labels) + "}" if labels else ""
+                        lines.append(f"{full_name}{suffix} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path):
+        """Write render() atomically, for node_exporter's textfile collector or a sidecar to serve."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _histogram(self, name: str, stage: str, buckets: tuple) -> Histogram:
+        # Called with the lock held
+        key = (name, stage)
+        if key not in self._histograms:
+            self._histograms[key] = Histogram(buckets)
+        return self._histograms[key]
@@ -0,0 +1,168 @@
+from contextlib import contextmanager
+from typing import Callable, Optional
+import threading
+import time
+import logging
+from app.utils.config import COMPUTE_TYPE, MODEL_POOL_MEMORY_MB, MODEL_INSTANCES_PER_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Approximate resident size of a loaded model, used to keep the pool within its memory budget
+MODEL_MEMORY_MB = {
+    "tiny": 150,
+    "base": 250,
+    "small": 700,
+    "medium": 1800,
+    "large-v2": 3500,
+    "large-v3": 3500,
+}
+DEFAULT_MODEL_MEMORY_MB = 2000
+
+
+def detect_device() -> str:
+    # Ask CTranslate2 (faster-whisper's backend) rather than importing torch just for this
+    try:
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except Exception:
+        return "cpu"
+
+
+def load_whisper_model(model_size: str, compute_type: str, device: str):
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_size, device=device, compute_type=compute_type)
+
+
+class _PooledModel:
+    def __init__(self, key: tuple, memory_mb: int):
+        self.key = key
+        self.memory_mb = memory_mb
+        self.model = None
+        self.refcount = 0
+        self.last_used = time.monotonic()
+
+
+class ModelPool:
+    """
+    Registry of loaded Whisper models keyed by (model_size, compute_type, device).
+
+    Models are reference counted while in use and the least recently used idle ones
+    are evicted when loading another would exceed `memory_budget_mb`. Up to
+    `instances_per_key` copies of a model may be loaded for concurrent inference.
+    """
+
+    def __init__(self, memory_budget_mb: int = MODEL_POOL_MEMORY_MB, instances_per_key: int = MODEL_INSTANCES_PER_SIZE,
+                 loader: Callable = load_whisper_model):
+        self.memory_budget_mb = memory_budget_mb
+        self.instances_per_key = instances_per_key
+        self._loader = loader
+        self._entries = []
+        self._cond = threading.Condition()
+        self._device = None
+        self.metrics = {"hits": 0, "misses": 0, "loads": 0, "load_seconds": 0.0, "evictions": 0}
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            self._device = detect_device()
+        return self._device
+
+    @contextmanager
+    def acquire(self, model_size: str, compute_type: str = COMPUTE_TYPE, device: str = None):
+        """Check out a model for exclusive use; it cannot be evicted until the block exits."""
+        entry = self._checkout((model_size, compute_type, device or self.device))
+        try:
+            yield entry.model
+        finally:
+            self._release(entry)
+
+    def prewarm(self, model_size: str, compute_type: str = COMPUTE_TYPE) -> threading.Thread:
+        """Load a model on a background thread so the first job doesn't wait for it."""
+        def load():
+            try:
+                with self.acquire(model_size, compute_type):
+                    pass
+            except Exception as e:
+                logger.warning(f"Prewarming model '{model_size}' failed: {e}")
+
+        thread = threading.Thread(target=load, name=f"prewarm-{model_size}", daemon=True)
+        thread.start()
+        return thread
+
+    def smallest_loaded(self) -> Optional[str]:
+        """Size of the smallest multilingual model currently loaded, if any."""
+        with self._cond:
+            sizes = [e.key[0] for e in self._entries if e.model is not None and not e.key[0].endswith(".en")]
+        return min(sizes, key=lambda size: MODEL_MEMORY_MB.get(size, DEFAULT_MODEL_MEMORY_MB), default=None)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return dict(
+                self.metrics,
+                memory_used_mb=self._memory_used_mb(),
+                memory_budget_mb=self.memory_budget_mb,
+                loaded=[{"model": "/".join(e.key), "in_use": e.refcount > 0} for e in self._entries if e.model is not None],
+            )
+
+    def _checkout(self, key: tuple) -> _PooledModel:
+        with self._cond:
+            while True:
+                instances = [e for e in self._entries if e.key == key]
+                idle = [e for e in instances if e.refcount == 0 and e.model is not None]
+                if idle:
+                    entry = idle[0]
+                    entry.refcount += 1
+                    self.metrics["hits"] += 1
+                    return entry
+                if len(instances) < self.instances_per_key:
+                    break
+                # Every instance of this model is busy; wait for one to be released
+                self._cond.wait()
+
+            self.metrics["misses"] += 1
+            entry = _PooledModel(key, MODEL_MEMORY_MB.get(key[0], DEFAULT_MODEL_MEMORY_MB))
+            entry.refcount = 1
+            self._evict_for(entry.memory_mb)
+            # Reserve the slot before loading so concurrent requests don't load the same instance
+            self._entries.append(entry)
+
+        try:
+            logger.info(f"Loading Whisper model '{key[0]}' on {key[2]} with {key[1]}...")
+            start = time.monotonic()
+            entry.model = self._loader(*key)
+            elapsed = time.monotonic() - start
+            logger.info(f"Model '{key[0]}' loaded successfully in {elapsed:.1f}s.")
+        except Exception as e:
+            logger.error(f"Failed to load Whisper model: {e}")
+            with self._cond:
+                self._entries.remove(entry)
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self.metrics["loads"] += 1
+            self.metrics["load_seconds"] += elapsed
+        return entry
+
+    def _release(self, entry: _PooledModel):
+        with self._cond:
+            entry.refcount -= 1
+            entry.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    def _memory_used_mb(self) -> int:
+        return sum(e.memory_mb for e in self._entries)
+
+    def _evict_for(self, memory_mb: int):
+        # Called with the lock held. Models in use are never evicted, so the pool may
+        # temporarily exceed its budget when everything loaded is busy.
+        while self._memory_used_mb() + memory_mb > self.memory_budget_mb:
+            idle = [e for e in self._entries if e.refcount == 0 and e.model is not None]
+            if not idle:
+                logger.warning(f"Model pool over budget ({self._memory_used_mb() + memory_mb}MB > {self.memory_budget_mb}MB), all models in use")
+                return
+            victim = min(idle, key=lambda e: e.last_used)
+            self._entries.remove(victim)
+            victim.model = None
+            self.metrics["evictions"] += 1
+            logger.info(f"Evicted Whisper model '{victim.key[0]}' ({victim.key[1]}, {victim.key[2]}) from pool")
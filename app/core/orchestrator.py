@@ -1,86 +1,633 @@
 import uuid
 import logging
-from app.agents.ingestion import IngestionAgent
-from app.agents.transcription import TranscriptionAgent
+import atexit
+import os
+import socket
+import time
+from app.agents.ingestion import IngestionAgent, is_allowed_url, local_path
+from app.agents.transcription import TranscriptionAgent, DECODE_PROFILES, decode_options
 from app.agents.formatting import FormattingAgent
-from app.core.schemas import JobStatus, Transcript, VideoMetadata
+from app.agents.diarization import DiarizationAgent, StreamTee, assign_speakers
+from app.core.schemas import BatchStatus, JobRequest, JobStatus, Transcript, VideoMetadata
+from app.core.transcript_columns import SegmentView, TranscriptColumns
+from app.core.scheduler import JobScheduler, SchedulerFullError
+from app.core.transcript_cache import TranscriptCache
+from app.core.audio_cache import AudioCache
+from app.core.job_store import InMemoryJobStore, JobStore, create_job_store
+from app.core.inference_batcher import InferenceBatcher
+from app.core.scratch import ScratchManager
+from app.core.metrics import PipelineMetrics, StageTimer
+from app.core.job_events import JobEvents
+from app.utils.logger import job_context
+from app.utils.config import (
+    CHUNK_SIZE_SECONDS, CHUNK_OVERLAP_SECONDS, CHUNK_WORKERS, STREAMING_TRANSCRIPTION, MAX_BATCH_ITEMS, MAX_QUEUED_JOBS,
+    JOB_STORE_POLL_SECONDS, JOB_TTL_SECONDS, JOB_STALE_SECONDS, PREWARM_MODEL_SIZE, DECODE_PROFILE, LANGUAGE_PROBE_SECONDS,
+    BATCHED_INFERENCE, SCRATCH_BYTES_PER_SECOND, SCRATCH_DIR, METRICS_PATH, JOB_WATCH_TIMEOUT_SECONDS, MODEL_SIZES, OUTPUT_DIR, OUTPUT_FORMATS,
+)
+from app.utils.audio import split_head
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
 import threading
 
 logger = logging.getLogger(__name__)
 
+_LANGUAGE_CACHE_ENTRIES = 10000
+
+_shared_orchestrator = None
+_shared_lock = threading.Lock()
+
+
+def get_orchestrator() -> "Orchestrator":
+    """
+    The process-wide Orchestrator. Every caller (e.g. each UI session) shares its model pool,
+    scheduler and job queue, so memory stays flat as sessions are added. Its jobs are kept in the
+    configured JOB_STORE_BACKEND, shared with other processes using the same store.
+    """
+    global _shared_orchestrator
+    with _shared_lock:
+        if _shared_orchestrator is None:
+            _shared_orchestrator = Orchestrator(store=create_job_store())
+            atexit.register(_shared_orchestrator.shutdown, wait=False)
+        return _shared_orchestrator
+
+
+def check_job_options(model_size: str, decode_profile: str, formats: Optional[Iterable[str]] = None) -> Optional[list[str]]:
+    """Reject unknown options before a job is queued. Returns the formats de-duplicated, or None for all of them."""
+    decode_options(decode_profile)
+    if model_size not in MODEL_SIZES:
+        raise ValueError(f"Unknown model size '{model_size}', expected one of {', '.join(MODEL_SIZES)}")
+    if formats is None:
+        return None
+    formats = list(dict.fromkeys(formats))
+    unknown = [extension for extension in formats if extension not in OUTPUT_FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"Unknown output format '{', '.join(unknown)}', expected some of {', '.join(OUTPUT_FORMATS)}")
+    return formats
+
+
+def _in_job_context(job_id: str, func, *args):
+    # Runs a pipeline stage with the job id attached to its log records
+    with job_context(job_id):
+        return func(*args)
+
+
 class Orchestrator:
-    def __init__(self):
-        self.jobs = {} # In-memory job store
+    def __init__(self, scheduler: JobScheduler = None, cache: TranscriptCache = None, streaming: bool = STREAMING_TRANSCRIPTION,
+                 store: JobStore = None, batched: bool = BATCHED_INFERENCE, audio_cache: AudioCache = None,
+                 scratch_root: Path = SCRATCH_DIR, metrics_path: Optional[Path] = METRICS_PATH, output_dir: Path = OUTPUT_DIR):
+        self.jobs = {} # Live status of jobs running in this process; everything else is read from the store
+        self.batches = {}
+        self._batch_state = {} # Per-batch title, request and finished transcripts until the batch completes
+        self._languages = {} # Auto-detected language per video id, so each video is probed once
+        self._job_batches = {} # Batch id of each running batch item, so item changes also notify the batch's watchers
+        self._jobs_lock = threading.Lock() # Guards job updates from worker threads against readers
         self.ingestion = IngestionAgent()
-        self.transcription = TranscriptionAgent() # Model loads here
-        self.formatting = FormattingAgent()
+        self.transcription = TranscriptionAgent() # Models load on first use, or in the background with PREWARM_MODEL_SIZE
+        if batched:
+            # Windows from all transcribing jobs are decoded together
+            self.transcription.batcher = InferenceBatcher(self.transcription.pool)
+        self.formatting = FormattingAgent(output_dir)
+        self.diarization = DiarizationAgent()
+        self.scheduler = scheduler or JobScheduler()
+        self.cache = cache or TranscriptCache()
+        self.audio_cache = audio_cache or AudioCache()
+        self.streaming = streaming
+        if PREWARM_MODEL_SIZE:
+            self.transcription.pool.prewarm(PREWARM_MODEL_SIZE)
+        self.store = store or InMemoryJobStore() # Persistent, shared stores are opted into by the app entry points
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Removes what crashed processes left behind; downloads wait here when the disk quota is taken
+        self.scratch = ScratchManager(self.worker_id, root=scratch_root)
+        self.metrics = PipelineMetrics()
+        self.metrics_path = metrics_path # None keeps metrics in memory only
+        self.events = JobEvents()
 
-    def start_job(self, url: str, language: str = None, model_size: str = "medium", include_timestamps: bool = True, include_speakers: bool = True, cookies_path: str = None) -> str:
+        # Jobs are queued in the store and claimed by a poller whenever a local worker is free,
+        # so jobs left queued by a restart, or queued by other processes sharing the store, run here too
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self.store.requeue_stale(JOB_STALE_SECONDS)
+        self._poller = threading.Thread(target=self._poll_store, name="job-store-poller", daemon=True)
+        self._poller.start()
+
+    def start_job(self, url: str, language: str = None, model_size: str = "medium", include_timestamps: bool = True, include_speakers: bool = True, cookies_path: str = None,
+                  decode_profile: str = DECODE_PROFILE, cookies: bytes = None, formats: Iterable[str] = None) -> str:
+        """
+        `cookies` (a cookies.txt upload) is queued with the job, since any worker sharing the store may
+        claim it, and written to the job's scratch directory on that worker, which removes it with the job.
+        `formats` limits the transcript files written, e.g. ["srt"]; by default all OUTPUT_FORMATS are.
+        """
+        formats = check_job_options(model_size, decode_profile, formats)
         job_id = str(uuid.uuid4())
-        self.jobs[job_id] = JobStatus(job_id=job_id, status="initialized")
-        
-        # Start processing in a background thread
-        thread = threading.Thread(target=self._process_job, args=(job_id, url, language, model_size, include_timestamps, include_speakers, cookies_path))
-        thread.start()
-        
+        queued = self.store.count_queued()
+        if queued >= MAX_QUEUED_JOBS:
+            raise SchedulerFullError(f"Server is busy ({queued} jobs queued), please retry later")
+
+        request = JobRequest(
+            url=url,
+            language=language,
+            model_size=model_size,
+            decode_profile=decode_profile,
+            include_timestamps=include_timestamps,
+            include_speakers=include_speakers,
+            cookies_path=cookies_path,
+            cookies=cookies.decode("utf-8", errors="replace") if cookies else None,
+            formats=formats,
+        )
+        self.store.add(JobStatus(job_id=job_id, status="queued", current_step="queued"), request)
+        self._wakeup.set()
         return job_id
 
-    def get_job_status(self, job_id: str) -> JobStatus:
-        return self.jobs.get(job_id)
+    def start_batch(self, url: str, language: str = None, model_size: str = "medium", include_timestamps: bool = True, include_speakers: bool = True, cookies_path: str = None,
+                    decode_profile: str = DECODE_PROFILE, cookies: bytes = None, formats: Iterable[str] = None) -> str:
+        """
+        Transcribe every video of a playlist or channel. Each video runs as a regular job;
+        a combined transcript is written once all of them have finished.
+        Uploaded `cookies` are shared by the batch's jobs and removed when the batch ends.
+        """
+        formats = check_job_options(model_size, decode_profile, formats)
+        if not is_allowed_url(url) and local_path(url) is None:
+            raise ValueError(f"Not a YouTube playlist or channel URL: {url}")
+        batch_id = str(uuid.uuid4())
+        if cookies:
+            cookies_path = str(self.scratch.write_file(batch_id, "cookies.txt", cookies))
+        cookie_file = Path(cookies_path) if cookies_path else None
+        try:
+            title, videos = self.ingestion.expand_playlist(url, cookie_file=cookie_file, limit=MAX_BATCH_ITEMS)
+            if not videos:
+                raise ValueError(f"No videos found at {url}")
+        except Exception:
+            self.scratch.release(batch_id)
+            raise
+
+        base_request = JobRequest(
+            url=url,
+            language=language,
+            model_size=model_size,
+            decode_profile=decode_profile,
+            include_timestamps=include_timestamps,
+            include_speakers=include_speakers,
+            cookies_path=cookies_path,
+            batch_id=batch_id,
+            formats=formats,
+        )
+        items = [(str(uuid.uuid4()), base_request.model_copy(update={"url": video['url']})) for video in videos]
+
+        # Batch items are reserved for this process, which holds the batch state
+        for job_id, request in items:
+            job = JobStatus(job_id=job_id, status="queued", current_step="queued")
+            self.store.add(job, request, worker_id=self.worker_id)
+            with self._jobs_lock:
+                self.jobs[job_id] = job
+                self._job_batches[job_id] = batch_id
+        with self._jobs_lock:
+            self.batches[batch_id] = BatchStatus(batch_id=batch_id, url=url, job_ids=[job_id for job_id, _ in items])
+            self._batch_state[batch_id] = {"title": title, "request": base_request, "transcripts": {}}
+
+        # Items are admitted as scheduler capacity frees up, so large playlists queue instead of being rejected.
+        # All items share the transcription queue and model size, so the model stays loaded across them.
+        threading.Thread(target=self._feed_batch, args=(items,), name=f"batch-{batch_id[:8]}", daemon=True).start()
+        return batch_id
+
+    def _submit(self, job_id: str, request: JobRequest, block: bool = False):
+        # Hand the job to the bounded worker pools
+        self.scheduler.submit(
+            ingest=lambda: _in_job_context(job_id, self._ingest, job_id, request),
+            transcribe=lambda ingested: _in_job_context(job_id, self._transcribe, job_id, request, *ingested),
+            on_error=lambda e: _in_job_context(job_id, self._fail_job, job_id, e, request),
+            block=block,
+        )
+
+    def _poll_store(self):
+        next_housekeeping = 0
+        while not self._stopped.is_set():
+            try:
+                while self.scheduler.can_start():
+                    claimed = self.store.claim_next(self.worker_id)
+                    if claimed is None:
+                        break
+                    job, request = claimed
+                    with self._jobs_lock:
+                        self.jobs[job.job_id] = job
+                    self.events.publish(job.job_id)
+                    self._submit(job.job_id, request, block=True)
 
-    def _process_job(self, job_id: str, url: str, language: str, model_size: str, include_timestamps: bool, include_speakers: bool, cookies_path: str = None):
-        job = self.jobs[job_id]
+                if time.monotonic() >= next_housekeeping:
+                    self.store.heartbeat(self.worker_id)
+                    self.store.requeue_stale(JOB_STALE_SECONDS)
+                    purged = self.store.purge(JOB_TTL_SECONDS)
+                    if purged:
+                        logger.info(f"Purged {purged} finished jobs from the job store")
+                    next_housekeeping = time.monotonic() + JOB_STALE_SECONDS / 3
+            except Exception as e:
+                logger.error(f"Job store poll failed: {e}")
+
+            self._wakeup.wait(JOB_STORE_POLL_SECONDS)
+            self._wakeup.clear()
+
+    def shutdown(self, wait: bool = True):
+        self._stopped.set()
+        self._wakeup.set()
+        self.scheduler.shutdown(wait=wait)
+        if self.transcription.batcher:
+            self.transcription.batcher.shutdown()
+        self.diarization.shutdown()
+        self.transcription.shutdown_chunk_pool()
+
+    def _feed_batch(self, items: list[tuple[str, JobRequest]]):
+        for job_id, request in items:
+            try:
+                self._submit(job_id, request, block=True)
+            except Exception as e:
+                self._fail_job(job_id, e, request)
+
+    def get_batch_status(self, batch_id: str) -> BatchStatus:
+        with self._jobs_lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            live = {job_id: self.jobs[job_id] for job_id in batch.job_ids if job_id in self.jobs}
+            batch = batch.model_copy()
+
+        # Finished items are no longer live; purged ones count as done
+        jobs = [live.get(job_id) or self.store.get(job_id) for job_id in batch.job_ids]
+        progress = [job.progress_percent if job and job.status != "failed" else 100 for job in jobs]
+        percent = sum(progress) // len(progress)
+        if batch.status == "processing":
+            percent = min(percent, 99) # The combined transcript is still being written
+        return batch.model_copy(update={"progress_percent": percent})
+
+    def _batch_item_done(self, batch_id: str, job_id: str, transcript: Transcript = None):
+        with self._jobs_lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return # Batch state was lost in a restart; the item ran as a standalone job
+            if transcript:
+                batch.completed += 1
+                self._batch_state[batch_id]["transcripts"][job_id] = transcript
+            else:
+                batch.failed += 1
+            finished = batch.completed + batch.failed == len(batch.job_ids)
+            if finished:
+                state = self._batch_state.pop(batch_id)
+        if not finished:
+            self.events.publish(batch_id)
+            return
+        self.scratch.release(batch_id)
+
+        # Last item finished: write the combined transcript in playlist order
+        transcripts = [state["transcripts"][job_id] for job_id in batch.job_ids if job_id in state["transcripts"]]
         try:
-            # 1. Ingestion
-            job.status = "processing"
-            job.current_step = "fetching_audio"
-            job.progress_percent = 10
-            logger.info(f"Job {job_id}: Fetching audio from {url}")
-            
-            # Convert cookies_path to Path object if it exists
-            cookie_file = Path(cookies_path) if cookies_path else None
-            
-            # Get metadata first
-            metadata: VideoMetadata = self.ingestion.get_metadata(url, cookie_file=cookie_file)
-            
-            # Download audio
-            audio_path = self.ingestion.download_audio(url, cookie_file=cookie_file)
-            job.progress_percent = 30
-            
-            # 2. Transcription
-            job.current_step = "transcribing"
-            logger.info(f"Job {job_id}: Transcribing with {model_size} model...")
-            segments = self.transcription.transcribe(audio_path, language=language, model_size=model_size)
-            job.progress_percent = 80
-            
-            transcript = Transcript(
-                job_id=job_id,
-                segments=segments,
-                metadata=metadata
-            )
-            
-            # 3. Formatting
-            job.current_step = "formatting"
-            logger.info(f"Job {job_id}: Formatting...")
-            docx_path = self.formatting.format_docx(transcript, include_timestamps=include_timestamps, include_speakers=include_speakers)
-            txt_path = self.formatting.format_txt(transcript, include_timestamps=include_timestamps, include_speakers=include_speakers)
-            
-            job.artifacts = {
-                "docx": str(docx_path),
-                "txt": str(txt_path)
-            }
-            
-            # Cleanup
-            if audio_path.exists():
-                audio_path.unlink()
-            
-            job.status = "completed"
-            job.progress_percent = 100
-            job.current_step = "done"
-            logger.info(f"Job {job_id}: Completed successfully.")
+            if not transcripts:
+                raise RuntimeError("All videos in the batch failed")
+            request = state["request"]
+            artifacts = self.formatting.format_batch(state["title"], transcripts, include_timestamps=request.include_timestamps, include_speakers=request.include_speakers,
+                                                     formats=request.formats or OUTPUT_FORMATS, batch_id=batch_id)
+            with self._jobs_lock:
+                batch.artifacts = artifacts
+                batch.status = "completed"
+            logger.info(f"Batch {batch_id}: Completed ({batch.completed} videos, {batch.failed} failed).")
+        except Exception as e:
+            logger.error(f"Batch {batch_id} failed: {e}")
+            with self._jobs_lock:
+                batch.status = "failed"
+                batch.error = str(e)
+        self.events.close(batch_id)
+
+    def get_job_status(self, job_id: str) -> JobStatus:
+        # Returns a snapshot; the live job keeps changing on the worker threads
+        with self._jobs_lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return job.model_copy(update={"partial_segments": list(job.partial_segments)})
+        # Queued, finished, or running in another process: a primary key lookup
+        return self.store.get(job_id)
+
+    def watch_job(self, job_id: str, timeout: float = JOB_WATCH_TIMEOUT_SECONDS) -> Iterator[JobStatus]:
+        """
+        Yield the job's status now and again after every change, until it completes or fails.
+        Jobs queued or running in another process publish no events here; their status is
+        re-read from the store every `timeout` seconds instead.
+        """
+        return self._watch(job_id, self.get_job_status, timeout)
+
+    def watch_batch(self, batch_id: str, timeout: float = JOB_WATCH_TIMEOUT_SECONDS) -> Iterator[BatchStatus]:
+        """Like watch_job(), for a batch; changes to any of its videos count as batch changes."""
+        return self._watch(batch_id, self.get_batch_status, timeout)
+
+    def _watch(self, key: str, get_status, timeout: float):
+        version = self.events.version(key)
+        while True:
+            # Read after taking the version, so a change in between wakes the wait below at once
+            status = get_status(key)
+            yield status
+            if status is None or status.status in ("completed", "failed"):
+                return
+            version = self.events.wait(key, version, timeout)
+
+    def _notify(self, job_id: str):
+        with self._jobs_lock:
+            batch_id = self._job_batches.get(job_id)
+        self.events.publish(job_id)
+        if batch_id:
+            self.events.publish(batch_id)
+
+    def _update_job(self, job_id: str, **fields):
+        with self._jobs_lock:
+            job = self.jobs[job_id]
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.updated_at = datetime.now()
+            snapshot = job.model_copy()
+        self.store.update(snapshot)
+        self._notify(job_id)
+
+    @contextmanager
+    def _stage(self, job_id: str, stage: str):
+        # Times a pipeline stage into the job's timings and the process-wide histograms
+        with self.metrics.stage(stage) as timer:
+            yield timer
+        self._record_stage(job_id, stage, timer)
+
+    def _record_stage(self, job_id: str, stage: str, timer: StageTimer):
+        with self._jobs_lock:
+            timings = dict(self.jobs[job_id].timings)
+        timings[stage] = {"wall_seconds": round(timer.wall_seconds, 3), "cpu_seconds": round(timer.cpu_seconds, 3)}
+        self._update_job(job_id, timings=timings)
+        logger.info(f"Job {job_id}: {stage} took {timer.wall_seconds:.2f}s ({timer.cpu_seconds:.2f}s CPU)",
+                    extra={"stage": stage, "wall_seconds": timer.wall_seconds, "cpu_seconds": timer.cpu_seconds})
 
+    def _publish_segment(self, job_id: str, segment: SegmentView, duration: float):
+        # Transcription covers 30-80% of the progress bar, in proportion to the audio decoded so far.
+        # Partial segments are only displayed, so their words are not converted.
+        partial = segment.to_segment(include_words=False)
+        with self._jobs_lock:
+            job = self.jobs[job_id]
+            job.partial_segments.append(partial)
+            previous = job.progress_percent
+            if duration > 0:
+                job.progress_percent = max(job.progress_percent, 30 + int(50 * min(1.0, segment.end_time / duration)))
+            # Partial segments stay in memory; only progress changes are persisted
+            snapshot = job.model_copy() if job.progress_percent != previous else None
+        if snapshot:
+            self.store.update(snapshot)
+        self._notify(job_id)
+
+    def _release_job(self, job_id: str):
+        # Finished jobs are served from the store from now on
+        with self._jobs_lock:
+            self.jobs.pop(job_id, None)
+            self._job_batches.pop(job_id, None)
+        self.events.close(job_id)
+        self.scratch.release(job_id)
+        self._wakeup.set()
+
+    def get_stats(self) -> dict:
+        return {
+            "scheduler": self.scheduler.stats(),
+            "model_pool": self.transcription.pool.stats(),
+            "transcript_cache": self.cache.stats(),
+            "audio_cache": self.audio_cache.stats(),
+            "scratch": self.scratch.usage(),
+            "events": self.events.stats(),
+        }
+
+    def metrics_text(self) -> str:
+        """Pipeline metrics in the Prometheus text format."""
+        return self.metrics.render()
+
+    def _write_metrics(self):
+        if self.metrics_path:
+            try:
+                self.metrics.write(self.metrics_path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {self.metrics_path}: {e}")
+
+    def _process_job(self, job_id: str, request: JobRequest):
+        # Runs both stages synchronously on the calling thread
+        with job_context(job_id):
+            self._run_job(job_id, request)
+
+    def _run_job(self, job_id: str, request: JobRequest):
+        try:
+            ingested = self._ingest(job_id, request)
+            if ingested:
+                self._transcribe(job_id, request, *ingested)
         except Exception as e:
-            logger.error(f"Job {job_id} failed: {e}")
-            job.status = "failed"
-            job.error = str(e)
+            self._fail_job(job_id, e, request)
+
+    def _cache_key(self, request: JobRequest, metadata: VideoMetadata, detected: bool = True) -> Optional[str]:
+        # With `detected`, 'auto' jobs use the language detected in this process for the video, if any
+        if not metadata.video_id:
+            return None
+        language = request.language or (self._languages.get(metadata.video_id) if detected else None)
+        params = DECODE_PROFILES[request.decode_profile]
+        if request.include_speakers:
+            params = dict(params, diarization=True)
+        return TranscriptCache.make_key(metadata.video_id, request.model_size, language, params)
+
+    def _remember_language(self, video_id: str, language: str):
+        with self._jobs_lock:
+            self._languages[video_id] = language
+            if len(self._languages) > _LANGUAGE_CACHE_ENTRIES:
+                del self._languages[next(iter(self._languages))]
+
+    def _cookie_file(self, job_id: str, request: JobRequest) -> Optional[Path]:
+        if request.cookies:
+            path = self.scratch.job_dir(job_id) / "cookies.txt"
+            if not path.exists():
+                self.scratch.write_file(job_id, "cookies.txt", request.cookies.encode())
+            return path
+        return Path(request.cookies_path) if request.cookies_path else None
+
+    def _ingest(self, job_id: str, request: JobRequest) -> Optional[tuple[VideoMetadata, Optional[Path]]]:
+        # Returns None when the job was served from the transcript cache.
+        # In streaming mode nothing is downloaded here and the audio path is None.
+        # 1. Ingestion
+        self._update_job(job_id, status="processing", current_step="fetching_audio", progress_percent=10)
+        logger.info(f"Job {job_id}: Fetching audio from {request.url}")
+
+        cookie_file = self._cookie_file(job_id, request)
+
+        # Get metadata first
+        with self._stage(job_id, "metadata"):
+            metadata: VideoMetadata = self.ingestion.get_metadata(request.url, cookie_file=cookie_file)
+
+        # Same video, model and language transcribed before: skip download and transcription
+        cache_key = self._cache_key(request, metadata)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached:
+            logger.info(f"Job {job_id}: Transcript cache hit for video {metadata.video_id}")
+            transcript = cached.model_copy(update={"job_id": job_id, "metadata": metadata})
+            self._finish_job(job_id, request, transcript)
+            return None
+
+        if self.streaming:
+            self._update_job(job_id, current_step="waiting_for_transcription")
+            return metadata, None
+
+        if local_path(request.url) is not None:
+            # Local files are decoded in place, nothing to download or cache
+            audio_path = self.ingestion.download_audio(request.url)
+        else:
+            # Audio downloaded before, by any job, is linked in from the audio cache; a download
+            # of the same video already in progress is waited for instead of starting another
+            audio_key = AudioCache.make_key(metadata.video_id, self.ingestion.mode)
+            audio_path = self.audio_cache.fetch(audio_key, self.scratch.job_dir(job_id), lambda: self._download(job_id, request, cookie_file, metadata.duration))
+        self._update_job(job_id, current_step="waiting_for_transcription", progress_percent=30)
+        return metadata, audio_path
+
+    def _download(self, job_id: str, request: JobRequest, cookie_file: Optional[Path], duration: float) -> Path:
+        # Download audio into the job's scratch directory, once the quota has room for it
+        self._update_job(job_id, current_step="waiting_for_disk_space")
+        job_dir = self.scratch.reserve(job_id, int(duration * SCRATCH_BYTES_PER_SECOND))
+        self._update_job(job_id, current_step="fetching_audio")
+        stats = {}
+        download = StageTimer()
+        with download:
+            audio_path = self.ingestion.download_audio(request.url, cookie_file=cookie_file, dest_dir=job_dir, stats=stats,
+                                                       partial_dir=self.audio_cache.partial_dir)
+        # The ffmpeg postprocessing ran inside the download call; it is reported as its own stage
+        transcode = stats.get("transcode") or StageTimer()
+        download.wall_seconds -= transcode.wall_seconds
+        download.cpu_seconds -= transcode.cpu_seconds - transcode.children_seconds
+        for stage, timer in (("download", download), ("transcode", transcode)):
+            if timer is download or timer.wall_seconds:
+                self.metrics.observe_stage(stage, timer.wall_seconds, timer.cpu_seconds)
+                self._record_stage(job_id, stage, timer)
+        downloaded_bytes = stats.get("downloaded_bytes") or audio_path.stat().st_size
+        self.metrics.increment("downloaded_bytes_total", downloaded_bytes)
+        self._update_job(job_id, downloaded_bytes=downloaded_bytes)
+        return audio_path
+
+    def _transcribe(self, job_id: str, request: JobRequest, metadata: VideoMetadata, audio_path: Optional[Path]):
+        # 2. Transcription
+        self._update_job(job_id, current_step="transcribing", progress_percent=30, partial_segments=[])
+        on_segment = lambda segment: self._publish_segment(job_id, segment, metadata.duration)
+        blocks = None
+        if audio_path is None:
+            blocks = self.ingestion.stream_audio(request.url, cookie_file=self._cookie_file(job_id, request))
+
+        language = request.language or self._languages.get(metadata.video_id)
+        if language is None:
+            # Detect once on a short probe with a small model, rather than letting the decoding model do it
+            self._update_job(job_id, current_step="detecting_language")
+            try:
+                with self._stage(job_id, "language_detection"):
+                    if blocks is None:
+                        probe = self.transcription.language_probe(audio_path)
+                    else:
+                        probe, blocks = split_head(blocks, LANGUAGE_PROBE_SECONDS)
+                    language = self.transcription.detect_language(probe)
+            except Exception as e:
+                # The decoding model falls back to detecting the language itself
+                logger.warning(f"Job {job_id}: Language probe failed: {e}")
+            if language and metadata.video_id:
+                self._remember_language(metadata.video_id, language)
+            self._update_job(job_id, current_step="transcribing")
+
+        # Long videos are split into chunks and spread over worker processes, which load their own models
+        chunked = (blocks is None and not self.transcription.batcher and CHUNK_WORKERS > 1
+                   and metadata.duration > CHUNK_SIZE_SECONDS + CHUNK_OVERLAP_SECONDS)
+        if not chunked:
+            with self._stage(job_id, "model_load"):
+                self.transcription.load_model(request.model_size)
+
+        # Speakers are found on separate worker threads while the audio is decoded
+        diarized = None
+        diarization_failed = False
+        if request.include_speakers:
+            if blocks is not None:
+                blocks, diarized = self.diarization.diarize_stream(blocks)
+            else:
+                diarized = self.diarization.diarize_file(audio_path)
+
+        try:
+            with self._stage(job_id, "decode") as decode:
+                if blocks is not None:
+                    # Streaming: decode windows while the audio is still downloading
+                    logger.info(f"Job {job_id}: Streaming transcription with {request.model_size} model...")
+                    segments = TranscriptColumns()
+                    for segment in self.transcription.transcribe_stream(blocks, language=language, model_size=request.model_size, columns=segments,
+                                                                        profile=request.decode_profile):
+                        on_segment(segment)
+                else:
+                    logger.info(f"Job {job_id}: Transcribing with {request.model_size} model, '{request.decode_profile}' profile{' (chunked)' if chunked else ''}...")
+                    segments = self.transcription.transcribe(audio_path, language=language, model_size=request.model_size, chunked=chunked, on_segment=on_segment,
+                                                             profile=request.decode_profile)
+        finally:
+            if isinstance(blocks, StreamTee):
+                # Ends the diarized stream even when decoding failed before reading any audio
+                blocks.close()
+        if diarized is not None:
+            # Only the time diarization runs past the end of decoding is added to the job
+            self._update_job(job_id, current_step="identifying_speakers")
+            try:
+                with self._stage(job_id, "diarization"):
+                    assign_speakers(segments, diarized.result())
+            except Exception as e:
+                logger.warning(f"Job {job_id}: Diarization failed, keeping a single speaker: {e}")
+                diarization_failed = True
+
+        vad_skipped = getattr(segments, "vad_skipped_seconds", 0.0)
+        logger.info(f"Job {job_id}: VAD skipped {vad_skipped:.0f}s of {metadata.duration}s")
+
+        audio_seconds = float(metadata.duration)
+        realtime_factor = decode.wall_seconds / audio_seconds if audio_seconds else None
+        self.metrics.increment("audio_seconds_total", audio_seconds)
+        if realtime_factor is not None:
+            self.metrics.observe_realtime_factor(realtime_factor)
+        self._update_job(job_id, progress_percent=80, vad_skipped_seconds=vad_skipped, audio_seconds=audio_seconds, realtime_factor=realtime_factor)
+
+        transcript = Transcript(
+            job_id=job_id,
+            segments=segments,
+            metadata=metadata
+        )
+
+        # Single-speaker fallbacks are not cached under a key promising speaker labels.
+        # 'auto' jobs are also cached under the undetected key, which is all a fresh process or
+        # another worker knows when it looks the video up
+        cache_keys = set() if diarization_failed else {self._cache_key(request, metadata), self._cache_key(request, metadata, detected=False)}
+        for cache_key in cache_keys - {None}:
+            self.cache.put(cache_key, transcript)
+
+        # The audio and cookies are no longer needed; free the scratch space before formatting
+        self.scratch.release(job_id)
+
+        self._finish_job(job_id, request, transcript)
+
+    def _finish_job(self, job_id: str, request: JobRequest, transcript: Transcript):
+        # 3. Formatting
+        self._update_job(job_id, current_step="formatting")
+        logger.info(f"Job {job_id}: Formatting...")
+        with self._stage(job_id, "formatting"):
+            paths = self.formatting.format_transcript(transcript, formats=request.formats or OUTPUT_FORMATS, include_timestamps=request.include_timestamps,
+                                                      include_speakers=request.include_speakers)
+
+        self._update_job(
+            job_id,
+            artifacts={name: str(path) for name, path in paths.items()},
+            status="completed",
+            progress_percent=100,
+            current_step="done",
+        )
+        logger.info(f"Job {job_id}: Completed successfully.")
+        self._release_job(job_id)
+        self.metrics.increment("jobs_total", status="completed")
+        self._write_metrics()
+
+        if request.batch_id:
+            self._batch_item_done(request.batch_id, job_id, transcript)
+
+    def _fail_job(self, job_id: str, e: Exception, request: JobRequest = None):
+        logger.error(f"Job {job_id} failed: {e}")
+        self._update_job(job_id, status="failed", error=str(e))
+        self._release_job(job_id)
+        self.metrics.increment("jobs_total", status="failed")
+        self._write_metrics()
+
+        if request and request.batch_id:
+            self._batch_item_done(request.batch_id, job_id)
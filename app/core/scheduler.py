@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import threading
+import logging
+from app.utils.config import INGESTION_WORKERS, TRANSCRIPTION_WORKERS, MAX_QUEUED_JOBS
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFullError(RuntimeError):
+    """Raised when a job is submitted while the scheduler is at capacity."""
+
+
+class JobScheduler:
+    """
+    Two-stage job scheduler with bounded worker pools.
+
+    Ingestion (network bound) and transcription (CPU bound) run on separate pools so
+    downloads for queued jobs overlap with decoding of the current one. At most
+    `max_queued_jobs` jobs may wait beyond the running workers; further submissions
+    are rejected with SchedulerFullError.
+    """
+
+    def __init__(self, ingestion_workers: int = INGESTION_WORKERS, transcription_workers: int = TRANSCRIPTION_WORKERS,
+                 max_queued_jobs: int = MAX_QUEUED_JOBS):
+        self.ingestion_workers = ingestion_workers
+        self.transcription_workers = transcription_workers
+        self.capacity = ingestion_workers + transcription_workers + max_queued_jobs
+
+        self._ingestion_pool = ThreadPoolExecutor(max_workers=ingestion_workers, thread_name_prefix="ingestion")
+        self._transcription_pool = ThreadPoolExecutor(max_workers=transcription_workers, thread_name_prefix="transcription")
+        self._lock = threading.Condition()
+        self._counts = {
+            "ingestion_waiting": 0,
+            "ingestion_running": 0,
+            "transcription_waiting": 0,
+            "transcription_running": 0,
+        }
+
+    def submit(self, ingest: Callable[[], Any], transcribe: Callable[[Any], None], on_error: Callable[[Exception], None] = None,
+               block: bool = False, timeout: float = None):
+        """
+        Admit a job. `ingest()` runs on the ingestion pool and its result is handed to
+        `transcribe(result)` on the transcription pool, unless it is None, meaning ingestion
+        already finished the job. `on_error` is called if either stage raises.
+
+        At capacity, raises SchedulerFullError, or with `block=True` waits up to `timeout`
+        seconds for a slot first.
+        """
+        with self._lock:
+            if block:
+                self._lock.wait_for(lambda: self.active_jobs < self.capacity, timeout=timeout)
+            if self.active_jobs >= self.capacity:
+                raise SchedulerFullError(f"Server is busy ({self.active_jobs} jobs in progress), please retry later")
+            self._counts["ingestion_waiting"] += 1
+
+        self._ingestion_pool.submit(self._run_ingestion, ingest, transcribe, on_error)
+
+    @property
+    def active_jobs(self) -> int:
+        return sum(self._counts.values())
+
+    def can_start(self) -> bool:
+        """True if a job submitted now would start ingesting right away rather than queue."""
+        with self._lock:
+            ingesting = self._counts["ingestion_waiting"] + self._counts["ingestion_running"]
+            return ingesting < self.ingestion_workers and self.active_jobs < self.capacity
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts, capacity=self.capacity)
+
+    def shutdown(self, wait: bool = True):
+        self._ingestion_pool.shutdown(wait=wait)
+        self._transcription_pool.shutdown(wait=wait)
+
+    def _move(self, src: str, dst: str = None):
+        with self._lock:
+            self._counts[src] -= 1
+            if dst:
+                self._counts[dst] += 1
+            else:
+                # A job left the scheduler; wake blocked submitters
+                self._lock.notify_all()
+
+    def _run_ingestion(self, ingest, transcribe, on_error):
+        self._move("ingestion_waiting", "ingestion_running")
+        try:
+            result = ingest()
+        except Exception as e:
+            self._move("ingestion_running")
+            self._report(on_error, e)
+            return
+
+        if result is None:
+            self._move("ingestion_running")
+            return
+
+        self._move("ingestion_running", "transcription_waiting")
+        self._transcription_pool.submit(self._run_transcription, transcribe, result, on_error)
+
+    def _run_transcription(self, transcribe, result, on_error):
+        self._move("transcription_waiting", "transcription_running")
+        try:
+            transcribe(result)
+        except Exception as e:
+            self._report(on_error, e)
+        finally:
+            self._move("transcription_running")
+
+    def _report(self, on_error, e: Exception):
+        if on_error:
+            on_error(e)
+        else:
+            logger.error(f"Scheduled job failed: {e}")
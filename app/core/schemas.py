@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
+from typing import List, Optional, Union
 from datetime import datetime
+from app.core.transcript_columns import TranscriptColumns
+from app.utils.config import DECODE_PROFILE
 
 class Word(BaseModel):
     word: str
@@ -18,6 +20,7 @@ class Segment(BaseModel):
     words: List[Word] = []
 
 class VideoMetadata(BaseModel):
+    video_id: Optional[str] = None
     title: str
     duration: float
     upload_date: Optional[str] = None
@@ -25,16 +28,54 @@ class VideoMetadata(BaseModel):
     thumbnail_url: Optional[str] = None
 
 class Transcript(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     job_id: str
-    segments: List[Segment]
+    segments: Union[TranscriptColumns, List[Segment]] # Columns from transcription, converted only when serialized
     metadata: VideoMetadata
 
+    @field_serializer("segments")
+    def _serialize_segments(self, segments):
+        if isinstance(segments, TranscriptColumns):
+            segments = segments.to_segments()
+        return [segment.model_dump() for segment in segments]
+
+class JobRequest(BaseModel):
+    url: str
+    language: Optional[str] = None
+    model_size: str = "medium"
+    decode_profile: str = DECODE_PROFILE # fast, balanced, accurate
+    include_timestamps: bool = True
+    include_speakers: bool = True
+    cookies_path: Optional[str] = None
+    cookies: Optional[str] = None # Uploaded cookies.txt, queued with the job for whichever worker claims it; the store drops it on claim
+    batch_id: Optional[str] = None
+    formats: Optional[List[str]] = None # Output formats to write; None writes OUTPUT_FORMATS
+
 class JobStatus(BaseModel):
     job_id: str
-    status: str = "pending" # pending, processing, completed, failed
+    status: str = "pending" # pending, queued, processing, completed, failed
     progress_percent: int = 0
     current_step: str = "initialized"
     error: Optional[str] = None
     artifacts: dict = {} # {"docx": "path", "txt": "path"}
+    partial_segments: List[Segment] = [] # Segments decoded so far, published while transcribing
+    vad_skipped_seconds: float = 0.0 # Silence the VAD filter skipped instead of decoding
+    timings: dict = {} # Stage -> {"wall_seconds": ..., "cpu_seconds": ...}
+    downloaded_bytes: int = 0
+    audio_seconds: float = 0.0
+    realtime_factor: Optional[float] = None # Decode wall time per second of audio
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
+
+class BatchStatus(BaseModel):
+    batch_id: str
+    url: str
+    status: str = "processing" # processing, completed, failed
+    job_ids: List[str] = []
+    completed: int = 0
+    failed: int = 0
+    progress_percent: int = 0
+    artifacts: dict = {} # Combined transcript of all items: {"docx": "path", "txt": "path"}
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,144 @@
+from pathlib import Path
+from typing import Optional
+import fcntl
+import shutil
+import threading
+import logging
+from app.utils.config import SCRATCH_DIR, SCRATCH_QUOTA_MB, SCRATCH_WAIT_SECONDS, SCRATCH_TMPFS_DIR, SCRATCH_TMPFS_MB
+
+logger = logging.getLogger(__name__)
+
+_LOCK_FILE = ".owner.lock"
+
+
+class ScratchFullError(RuntimeError):
+    """Raised when a job's scratch space cannot be reserved within the quota."""
+
+
+class _Area:
+    # One scratch location (disk or tmpfs) with its own quota
+    def __init__(self, root: Path, quota_bytes: int):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.reserved = {} # job id -> bytes
+
+    @property
+    def used(self) -> int:
+        return sum(self.reserved.values())
+
+    def fits(self, size: int) -> bool:
+        return self.used + size <= self.quota_bytes
+
+
+class ScratchManager:
+    """
+    Per-job scratch directories for downloads and uploaded cookies, with a disk quota.
+
+    Each process keeps its job directories under `<root>/<owner_id>/` and holds an flock on
+    that directory for its lifetime. At startup, directories whose owner no longer holds its
+    lock (the process exited or crashed) are removed, so nothing leaks across restarts.
+
+    reserve() sets aside space for a job before it downloads and waits while the quota is
+    taken; release() deletes the job's directory and frees its reservation. With a tmpfs
+    root, jobs whose reservation fits its quota are placed there instead of on disk.
+    """
+
+    def __init__(self, owner_id: str, root: Path = SCRATCH_DIR, quota_mb: int = SCRATCH_QUOTA_MB,
+                 tmpfs_root: Optional[Path] = SCRATCH_TMPFS_DIR, tmpfs_mb: int = SCRATCH_TMPFS_MB,
+                 wait_seconds: float = SCRATCH_WAIT_SECONDS):
+        self.owner_id = owner_id
+        self.wait_seconds = wait_seconds
+        self._areas = [_Area(Path(root), quota_mb * 1024 * 1024)]
+        if tmpfs_root:
+            # Tried first, so small jobs stay in RAM
+            self._areas.insert(0, _Area(Path(tmpfs_root), tmpfs_mb * 1024 * 1024))
+        self._cond = threading.Condition()
+        self._dirs = {} # job id -> directories (cookies on disk, downloads wherever the reservation landed)
+        self._locks = []
+        for area in self._areas:
+            self._sweep(area.root)
+            self._locks.append(self._claim(area.root / owner_id))
+
+    def job_dir(self, job_id: str) -> Path:
+        """The job's directory on disk for small files, outside the quota. Created on first use."""
+        return self._add_dir(job_id, self._areas[-1])
+
+    def reserve(self, job_id: str, size_bytes: int) -> Path:
+        """
+        Reserve `size_bytes` for the job and return its directory. Waits up to `wait_seconds`
+        for other jobs to free space; raises ScratchFullError if it never fits.
+        """
+        if size_bytes > max(area.quota_bytes for area in self._areas):
+            raise ScratchFullError(f"Job needs {size_bytes / 1e6:.0f} MB of scratch space, more than the quota allows")
+
+        with self._cond:
+            area = self._cond.wait_for(lambda: self._fitting_area(size_bytes), timeout=self.wait_seconds)
+            if area is None:
+                raise ScratchFullError(f"Scratch space is full ({self.usage()['reserved_mb']:.0f} MB reserved), please retry later")
+            area.reserved[job_id] = size_bytes
+        return self._add_dir(job_id, area)
+
+    def write_file(self, job_id: str, name: str, data: bytes) -> Path:
+        path = self.job_dir(job_id) / name
+        path.write_bytes(data)
+        return path
+
+    def release(self, job_id: str):
+        """Delete the job's directory and free its reservation. Safe to call more than once."""
+        with self._cond:
+            paths = self._dirs.pop(job_id, [])
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+        # The space is only handed on once the files are gone
+        with self._cond:
+            for area in self._areas:
+                area.reserved.pop(job_id, None)
+            self._cond.notify_all()
+
+    def usage(self) -> dict:
+        with self._cond:
+            return {
+                "reserved_mb": sum(area.used for area in self._areas) / 1024 / 1024,
+                "quota_mb": sum(area.quota_bytes for area in self._areas) / 1024 / 1024,
+                "jobs": len(self._dirs),
+            }
+
+    def _add_dir(self, job_id: str, area: _Area) -> Path:
+        path = area.root / self.owner_id / job_id
+        with self._cond:
+            paths = self._dirs.setdefault(job_id, [])
+            if path not in paths:
+                paths.append(path)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _fitting_area(self, size: int) -> Optional[_Area]:
+        # Called with the lock held
+        for area in self._areas:
+            if area.fits(size) and shutil.disk_usage(area.root).free > size:
+                return area
+        return None
+
+    @staticmethod
+    def _claim(owner_dir: Path):
+        owner_dir.mkdir(parents=True, exist_ok=True)
+        lock = open(owner_dir / _LOCK_FILE, "w")
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return lock
+
+    @staticmethod
+    def _sweep(root: Path):
+        # Remove the directories of owners that are gone; live owners hold their lock
+        root.mkdir(parents=True, exist_ok=True)
+        for owner_dir in root.iterdir():
+            if not owner_dir.is_dir():
+                continue
+            try:
+                with open(owner_dir / _LOCK_FILE, "a") as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    shutil.rmtree(owner_dir, ignore_errors=True)
+                logger.info(f"Removed leftover scratch directory {owner_dir}")
+            except BlockingIOError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not clean up scratch directory {owner_dir}: {e}")
@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import os
+import threading
+import logging
+from app.core.schemas import Transcript
+from app.utils.config import CACHE_DIR, TRANSCRIPT_CACHE_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptCache:
+    """
+    On-disk cache of finished transcripts, one JSON file per key.
+
+    Keys are content addresses of (video id, model size, language, decode parameters).
+    File mtimes track recency; the least recently used entries are evicted once the
+    cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR / "transcripts", max_bytes: int = TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*.json"))
+        self.metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(video_id: str, model_size: str, language: Optional[str], params: dict = None) -> str:
+        payload = json.dumps([video_id, model_size, language or "auto", params or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Transcript]:
+        path = self.cache_dir / f"{key}.json"
+        try:
+            transcript = Transcript.model_validate_json(path.read_bytes())
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            transcript = None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            self._remove(path)
+            transcript = None
+
+        with self._lock:
+            self.metrics["hits" if transcript else "misses"] += 1
+        return transcript
+
+    def put(self, key: str, transcript: Transcript):
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        data = transcript.model_dump_json().encode("utf-8")
+        try:
+            tmp_path.write_bytes(data)
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)  # Atomic, readers never see a partial file
+        except OSError as e:
+            logger.warning(f"Could not write transcript cache entry: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return dict(
+                self.metrics,
+                hit_rate=self.metrics["hits"] / lookups if lookups else 0.0,
+                size_bytes=self._size,
+                max_bytes=self.max_bytes,
+            )
+
+    def _evict(self):
+        # Called with the lock held
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                continue
+
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self._size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+            self.metrics["evictions"] += 1
+            logger.info(f"Evicted cached transcript {path.name}")
+
+    def _remove(self, path: Path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._size -= size
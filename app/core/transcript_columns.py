@@ -0,0 +1,300 @@
+from itertools import accumulate
+from typing import Iterable, Iterator, Sequence
+import numpy as np
+
+DEFAULT_SPEAKER = "SPEAKER_00"
+# Appended text is folded into the main buffer in pages of this many characters
+_TEXT_PAGE_CHARS = 8192
+
+
+class _Column:
+    """Growable NumPy column. Slices of view() keep their values when more rows are appended."""
+
+    def __init__(self, dtype, capacity: int = 256):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        count = len(values)
+        if self.size + count > len(self._data):
+            grown = np.empty(max(self.size + count, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:self.size + count] = values
+        self.size += count
+
+    def view(self) -> np.ndarray:
+        return self._data[:self.size]
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+
+class SegmentView:
+    """
+    One segment of a TranscriptColumns, read in place. Has the same attributes as
+    schemas.Segment; `words` builds Word models on access, the word_* columns don't copy.
+    """
+
+    __slots__ = ("_columns", "index")
+
+    def __init__(self, columns: "TranscriptColumns", index: int):
+        self._columns = columns
+        self.index = index
+
+    @property
+    def segment_id(self) -> int:
+        return int(self._columns._segment_ids[self.index])
+
+    @property
+    def start_time(self) -> float:
+        return float(self._columns._starts[self.index])
+
+    @property
+    def end_time(self) -> float:
+        return float(self._columns._ends[self.index])
+
+    @property
+    def confidence(self) -> float:
+        return float(self._columns._confidences[self.index])
+
+    @property
+    def speaker(self) -> str:
+        return self._columns._speaker_labels[self._columns._speakers[self.index]]
+
+    @property
+    def text(self) -> str:
+        columns = self._columns
+        return columns._slice_text(columns._text_starts[self.index], columns._text_ends[self.index])
+
+    @property
+    def _word_range(self) -> slice:
+        return slice(self._columns._first_words[self.index], self._columns._last_words[self.index])
+
+    @property
+    def word_starts(self) -> np.ndarray:
+        return self._columns._word_starts.view()[self._word_range]
+
+    @property
+    def word_ends(self) -> np.ndarray:
+        return self._columns._word_ends.view()[self._word_range]
+
+    @property
+    def word_confidences(self) -> np.ndarray:
+        return self._columns._word_confidences.view()[self._word_range]
+
+    @property
+    def word_texts(self) -> list[str]:
+        columns = self._columns
+        word_range = self._word_range
+        starts = columns._word_text_starts.view()[word_range].tolist()
+        ends = columns._word_text_ends.view()[word_range].tolist()
+        if ends and ends[-1] <= len(columns._text):
+            text = columns._text
+            return [text[start:end] for start, end in zip(starts, ends)]
+        return [columns._slice_text(start, end) for start, end in zip(starts, ends)]
+
+    @property
+    def words(self) -> list:
+        return self.to_segment().words
+
+    def to_segment(self, include_words: bool = True):
+        from app.core.schemas import Segment, Word
+
+        words = []
+        if include_words:
+            words = [
+                Word(word=text, start=start, end=end, confidence=confidence)
+                for text, start, end, confidence in zip(
+                    self.word_texts, self.word_starts.tolist(), self.word_ends.tolist(), self.word_confidences.tolist()
+                )
+            ]
+        return Segment(
+            segment_id=self.segment_id,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            text=self.text,
+            speaker=self.speaker,
+            confidence=self.confidence,
+            words=words,
+        )
+
+    def __repr__(self):
+        return f"SegmentView({self.segment_id}, {self.start_time:.2f}-{self.end_time:.2f}, {self.text!r})"
+
+
+class TranscriptColumns:
+    """
+    Column-oriented transcript: per-segment and per-word NumPy columns (times, confidences,
+    offsets) plus one text buffer holding all segment and word texts.
+
+    Iterating yields SegmentViews, which stand in for schemas.Segment; to_segments() converts
+    to the pydantic models only when a caller needs them. A 4-hour transcript is a handful of
+    arrays instead of ~40k validated Word objects, and pickles compactly between processes.
+    """
+
+    def __init__(self):
+        self._segment_ids = _Column(np.uint32)
+        self._starts = _Column(np.float64)
+        self._ends = _Column(np.float64)
+        self._confidences = _Column(np.float64)
+        self._speakers = _Column(np.uint16)
+        self._text_starts = _Column(np.int64)
+        self._text_ends = _Column(np.int64)
+        self._first_words = _Column(np.int64)
+        self._last_words = _Column(np.int64)
+
+        self._word_starts = _Column(np.float64)
+        self._word_ends = _Column(np.float64)
+        self._word_confidences = _Column(np.float64)
+        self._word_text_starts = _Column(np.int64)
+        self._word_text_ends = _Column(np.int64)
+
+        self._speaker_labels = [DEFAULT_SPEAKER]
+        self._speaker_index = {DEFAULT_SPEAKER: 0}
+        self._text_parts = []
+        self._text_length = 0
+        self._text = ""
+        # Seconds of audio the VAD filter dropped before decoding
+        self.vad_skipped_seconds = 0.0
+
+    def __len__(self) -> int:
+        return self._starts.size
+
+    def __getitem__(self, index: int) -> SegmentView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return SegmentView(self, index)
+
+    def __iter__(self) -> Iterator[SegmentView]:
+        for index in range(len(self)):
+            yield SegmentView(self, index)
+
+    @property
+    def word_count(self) -> int:
+        return self._word_starts.size
+
+    @property
+    def text_buffer(self) -> str:
+        if self._text_parts:
+            self._text = "".join([self._text, *self._text_parts])
+            self._text_parts = []
+        return self._text
+
+    @property
+    def nbytes(self) -> int:
+        columns = [value for value in vars(self).values() if isinstance(value, _Column)]
+        return sum(column.view().nbytes for column in columns) + len(self.text_buffer.encode("utf-8"))
+
+    def segment_starts(self) -> np.ndarray:
+        return self._starts.view()
+
+    def segment_ends(self) -> np.ndarray:
+        return self._ends.view()
+
+    def append(self, start: float, end: float, text: str, confidence: float, words: Iterable[tuple] = (),
+               speaker: str = DEFAULT_SPEAKER, segment_id: int = None) -> SegmentView:
+        """Append a segment; `words` are (word, start, end, confidence) tuples. Returns its view."""
+        first_word = self._word_starts.size
+        words = list(words)
+        if words:
+            texts, word_starts, word_ends, word_confidences = zip(*words)
+            offsets = list(accumulate(map(len, texts), initial=self._text_length))
+            self._text_parts.extend(texts)
+            self._text_length = offsets[-1]
+            self._word_starts.extend(word_starts)
+            self._word_ends.extend(word_ends)
+            self._word_confidences.extend(word_confidences)
+            self._word_text_starts.extend(offsets[:-1])
+            self._word_text_ends.extend(offsets[1:])
+
+        self._segment_ids.extend([segment_id if segment_id is not None else len(self) + 1])
+        self._starts.extend([start])
+        self._ends.extend([end])
+        self._confidences.extend([confidence])
+        self._speakers.extend([self._speaker_id(speaker)])
+        self._text_starts.extend([self._add_text(text)])
+        self._text_ends.extend([self._text_length])
+        self._first_words.extend([first_word])
+        self._last_words.extend([self._word_starts.size])
+        return SegmentView(self, len(self) - 1)
+
+    def append_view(self, view: SegmentView, word_indices: Sequence[int] = None, segment_id: int = None) -> SegmentView:
+        """
+        Copy a segment from another container. With `word_indices` (positions within the segment)
+        only those words are kept, and the times and text are narrowed to them.
+        """
+        texts = view.word_texts
+        starts = view.word_starts.tolist()
+        ends = view.word_ends.tolist()
+        confidences = view.word_confidences.tolist()
+        start, end, text = view.start_time, view.end_time, view.text
+
+        if word_indices is not None and len(word_indices) != len(starts):
+            texts = [texts[i] for i in word_indices]
+            starts = [starts[i] for i in word_indices]
+            ends = [ends[i] for i in word_indices]
+            confidences = [confidences[i] for i in word_indices]
+            start, end, text = starts[0], ends[-1], "".join(texts).strip()
+
+        return self.append(start, end, text, view.confidence, zip(texts, starts, ends, confidences), speaker=view.speaker, segment_id=segment_id)
+
+    def set_speakers(self, speakers: Sequence[str]):
+        """Relabel every segment, e.g. with the speakers found by diarization."""
+        self._speakers.view()[:] = [self._speaker_id(speaker or DEFAULT_SPEAKER) for speaker in speakers]
+
+    def to_segments(self) -> list:
+        return [view.to_segment() for view in self]
+
+    @classmethod
+    def from_segments(cls, segments: Iterable) -> "TranscriptColumns":
+        columns = cls()
+        for segment in segments:
+            columns.append(
+                segment.start_time, segment.end_time, segment.text, segment.confidence,
+                ((w.word, w.start, w.end, w.confidence) for w in segment.words),
+                speaker=segment.speaker, segment_id=segment.segment_id,
+            )
+        return columns
+
+    def __getstate__(self) -> dict:
+        # Only the used part of each column is pickled
+        state = {name: value.view().copy() if isinstance(value, _Column) else value for name, value in vars(self).items()}
+        state.update(_text=self.text_buffer, _text_parts=[])
+        return state
+
+    def __setstate__(self, state: dict):
+        for name, value in state.items():
+            if isinstance(value, np.ndarray):
+                column = _Column(value.dtype, capacity=max(len(value), 1))
+                column.extend(value)
+                value = column
+            setattr(self, name, value)
+
+    def _slice_text(self, start: int, end: int) -> str:
+        # Each text lies entirely in the main buffer or in the pending tail. The tail is joined on
+        # read and folded in once it reaches a page, so reading while appending stays linear.
+        base = len(self._text)
+        if end <= base:
+            return self._text[start:end]
+        tail = "".join(self._text_parts)
+        if len(tail) >= _TEXT_PAGE_CHARS:
+            self._text += tail
+            self._text_parts = []
+            return self._text[start:end]
+        self._text_parts = [tail]
+        return tail[start - base:end - base]
+
+    def _add_text(self, text: str) -> int:
+        offset = self._text_length
+        self._text_parts.append(text)
+        self._text_length += len(text)
+        return offset
+
+    def _speaker_id(self, speaker: str) -> int:
+        if speaker not in self._speaker_index:
+            self._speaker_index[speaker] = len(self._speaker_labels)
+            self._speaker_labels.append(speaker)
+        return self._speaker_index[speaker]
@@ -1,5 +1,4 @@
 import streamlit as st
-import time
 from pathlib import Path
 import sys
 
@@ -7,17 +6,23 @@ import sys
 # This MUST happen before importing app.utils.config
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
-from app.utils.config import TEMP_DIR
-from app.core.orchestrator import Orchestrator
+from app.agents.ingestion import is_allowed_url
+from app.core.orchestrator import Orchestrator, get_orchestrator
+from app.core.scheduler import SchedulerFullError
+from app.utils.config import LOG_FORMAT
+from app.utils.logger import setup_logger
 
 st.set_page_config(page_title="YouTube Voice-to-Text", page_icon="🎙️", layout="centered")
 
-# Initialize Orchestrator in Session State to persist across reruns
-if 'orchestrator_v5' not in st.session_state:
-    with st.spinner("Initializing AI Models... (This may take a moment)"):
-        st.session_state.orchestrator_v5 = Orchestrator()
 
-orchestrator = st.session_state.orchestrator_v5
+# One Orchestrator per server process, shared by all sessions and reruns
+@st.cache_resource(show_spinner="Initializing AI Models... (This may take a moment)")
+def load_orchestrator() -> Orchestrator:
+    setup_logger("app", json_format=LOG_FORMAT == "json")
+    return get_orchestrator()
+
+
+orchestrator = load_orchestrator()
 
 
 st.header("🎙️ YouTube Voice-to-Text Converter")
@@ -29,16 +34,24 @@ with st.form("job_form"):
     
     col1, col2 = st.columns(2)
     with col1:
-        language = st.selectbox("Language", ["en", "es", "fr", "de", "it", "ja", "zh", "ru"], index=0)
+        language = st.selectbox("Language", ["auto", "en", "es", "fr", "de", "it", "ja", "zh", "ru"], index=0,
+                                help="Auto detects the language once, on a short sample of speech.")
     with col2:
         model_size = st.selectbox("Model Size", ["tiny", "base", "small", "medium"], index=2, help="Larger models are more accurate but slower.")
     
+    decode_profile = st.selectbox(
+        "Decode Profile", ["fast", "balanced", "accurate"], index=1,
+        help="Fast: greedy decoding, no word timings. Balanced: skips silence. Accurate: decodes all audio, slowest."
+    )
+    
     col_opt1, col_opt2 = st.columns(2)
     with col_opt1:
         include_timestamps = st.checkbox("Include Timestamps", value=True)
     with col_opt2:
         include_speakers = st.checkbox("Include Speaker Labels", value=True)
     
+    is_batch = st.checkbox("Playlist / Channel URL (transcribe every video)", value=False)
+    
     # Advanced Options for Cookies
     with st.expander("Advanced Options (Fix 403 Forbidden Error)"):
         st.markdown("Upload a `cookies.txt` file if you encounter valid YouTube URL errors (403 Forbidden).")
@@ -47,28 +60,45 @@ with st.form("job_form"):
     submitted = st.form_submit_button("Start Transcription")
 
 if submitted and url:
-    if "youtube.com" not in url and "youtu.be" not in url:
+    if not is_allowed_url(url):
         st.error("Please enter a valid YouTube URL.")
     else:
-        # Handle Cookies
-        cookies_path = None
-        if uploaded_cookies is not None:
-             cookies_path = TEMP_DIR / "user_cookies.txt"
-             # Save uploaded file
-             with open(cookies_path, "wb") as f:
-                 f.write(uploaded_cookies.getbuffer())
+        # Uploaded cookies are stored per job by the orchestrator, so concurrent users don't share them
+        cookies = uploaded_cookies.getvalue() if uploaded_cookies is not None else None
         
         # Start Job
-        job_id = orchestrator.start_job(
-            url, 
-            language, 
-            model_size, 
-            include_timestamps, 
-            include_speakers,
-            cookies_path=str(cookies_path) if cookies_path else None
-        )
-        st.session_state.current_job_id = job_id
-        st.success(f"Job started! ID: {job_id}")
+        if language == "auto":
+            language = None
+        try:
+            if is_batch:
+                with st.spinner("Listing playlist videos..."):
+                    batch_id = orchestrator.start_batch(
+                        url, 
+                        language, 
+                        model_size, 
+                        include_timestamps, 
+                        include_speakers,
+                        decode_profile=decode_profile,
+                        cookies=cookies,
+                    )
+                st.session_state.pop('current_job_id', None)
+                st.session_state.current_batch_id = batch_id
+                st.success(f"Batch started! ID: {batch_id}")
+            else:
+                job_id = orchestrator.start_job(
+                    url, 
+                    language, 
+                    model_size, 
+                    include_timestamps, 
+                    include_speakers,
+                    decode_profile=decode_profile,
+                    cookies=cookies,
+                )
+                st.session_state.pop('current_batch_id', None)
+                st.session_state.current_job_id = job_id
+                st.success(f"Job started! ID: {job_id}")
+        except (SchedulerFullError, ValueError) as e:
+            st.error(str(e))
 
 # Status Tracking
 if 'current_job_id' in st.session_state:
@@ -76,8 +106,8 @@ if 'current_job_id' in st.session_state:
     status_placeholder = st.empty()
     progress_bar = st.progress(0)
     
-    while True:
-        job = orchestrator.get_job_status(job_id)
+    # Redrawn whenever the job changes, instead of polling
+    for job in orchestrator.watch_job(job_id):
         if not job:
             st.error("Job not found.")
             break
@@ -89,24 +119,52 @@ if 'current_job_id' in st.session_state:
             if job.error:
                 st.error(f"Error: {job.error}")
                 break
+            
+            # Partial transcript, published while the audio is being decoded
+            if job.status == "processing" and job.partial_segments:
+                recent = job.partial_segments[-10:]
+                st.caption("Transcript so far")
+                st.text("\n".join(f"[{s.start_time:.1f}s] {s.text}" for s in recent))
                 
             if job.status == "completed":
                 st.success("Transcription Complete!")
+                if job.vad_skipped_seconds:
+                    st.caption(f"Skipped {job.vad_skipped_seconds:.0f}s of silence")
+                if job.timings:
+                    stages = ", ".join(f"{stage} {timing['wall_seconds']:.1f}s" for stage, timing in job.timings.items())
+                    speed = f" | {job.realtime_factor:.2f}x real time" if job.realtime_factor else ""
+                    st.caption(f"{stages}{speed}")
                 
-                # Show Download Buttons
-                col_d1, col_d2 = st.columns(2)
-                
-                if "docx" in job.artifacts:
-                    with open(job.artifacts["docx"], "rb") as f:
-                        col_d1.download_button("Download DOCX", f, file_name=Path(job.artifacts["docx"]).name)
-                        
-                if "txt" in job.artifacts:
-                    with open(job.artifacts["txt"], "rb") as f:
-                        col_d2.download_button("Download TXT", f, file_name=Path(job.artifacts["txt"]).name)
-                
-                break
+                # Show Download Buttons, one per output format
+                for column, (fmt, path) in zip(st.columns(len(job.artifacts)), job.artifacts.items()):
+                    with open(path, "rb") as f:
+                        column.download_button(f"Download {fmt.upper()}", f, file_name=Path(path).name)
+
+# Batch Status Tracking
+if 'current_batch_id' in st.session_state:
+    batch_id = st.session_state.current_batch_id
+    status_placeholder = st.empty()
+    progress_bar = st.progress(0)
+    
+    for batch in orchestrator.watch_batch(batch_id):
+        if not batch:
+            st.error("Batch not found.")
+            break
         
-        time.sleep(2)
+        with status_placeholder.container():
+            st.info(f"Status: {batch.status.upper()} - {batch.completed} of {len(batch.job_ids)} videos done, {batch.failed} failed")
+            progress_bar.progress(batch.progress_percent / 100)
+            
+            if batch.error:
+                st.error(f"Error: {batch.error}")
+                break
+            
+            if batch.status == "completed":
+                st.success("Batch Transcription Complete!")
+                
+                for column, (fmt, path) in zip(st.columns(len(batch.artifacts)), batch.artifacts.items()):
+                    with open(path, "rb") as f:
+                        column.download_button(f"Download {fmt.upper()}", f, file_name=Path(path).name)
 
 st.markdown("---")
 st.markdown("""
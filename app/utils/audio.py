@@ -0,0 +1,120 @@
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+import itertools
+import subprocess
+import tempfile
+import numpy as np
+
+# faster-whisper works on 16 kHz mono float32
+SAMPLE_RATE = 16000
+
+
+def decode_pcm_blocks(audio_path: Path, sampling_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """Decode an audio file frame by frame into 16 kHz mono float32 blocks."""
+    import av
+
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=sampling_rate)
+    with av.open(str(audio_path), mode="r", metadata_errors="ignore") as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                yield resampled.to_ndarray().reshape(-1).astype(np.float32) / 32768.0
+        # Flush whatever the resampler is still holding
+        for resampled in resampler.resample(None):
+            yield resampled.to_ndarray().reshape(-1).astype(np.float32) / 32768.0
+
+
+def probe_duration(audio_path: Path) -> float:
+    """Duration of an audio file in seconds, from its container header (nothing is decoded)."""
+    import av
+
+    with av.open(str(audio_path), mode="r", metadata_errors="ignore") as container:
+        if container.duration is not None:
+            return container.duration / av.time_base
+        # Some containers only give the stream duration
+        stream = container.streams.audio[0]
+        return float(stream.duration * stream.time_base) if stream.duration else 0.0
+
+
+def ffmpeg_pcm_blocks(source: str, headers: dict = None, block_seconds: float = 1.0,
+                      sampling_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """
+    Pipe a local file or remote URL through ffmpeg and yield 16 kHz mono float32 blocks
+    as soon as they are decoded, so consumers can start before the download finishes.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if headers:
+        cmd += ["-headers", "".join(f"{key}: {value}\r\n" for key, value in headers.items())]
+    cmd += ["-i", str(source), "-vn", "-f", "s16le", "-ac", "1", "-ar", str(sampling_rate), "pipe:1"]
+
+    # stderr goes to a file: a pipe nobody reads until stdout ends would stall ffmpeg once full
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+    block_bytes = int(block_seconds * sampling_rate) * 2
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+
+        if process.wait() != 0:
+            stderr.seek(0)
+            error = stderr.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg exited with code {process.returncode}: {error}")
+    finally:
+        # Consumer stopped early or failed: don't leave ffmpeg running
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        stderr.close()
+
+
+def window_samples(blocks: Iterable[np.ndarray], window_seconds: float, overlap_seconds: float = 0.0,
+                   sampling_rate: int = SAMPLE_RATE) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Regroup a stream of sample blocks into fixed-size windows.
+
+    Yields (offset_seconds, samples) where each window holds `window_seconds` of audio
+    plus `overlap_seconds` shared with the start of the next window.
+    """
+    window = int(window_seconds * sampling_rate)
+    overlap = int(overlap_seconds * sampling_rate)
+    pending = []
+    pending_len = 0
+    offset = 0
+
+    for block in blocks:
+        if not len(block):
+            continue
+        pending.append(block)
+        pending_len += len(block)
+
+        while pending_len >= window + overlap:
+            buffer = np.concatenate(pending)
+            yield offset / sampling_rate, buffer[:window + overlap]
+            buffer = buffer[window:]
+            pending = [buffer]
+            pending_len = len(buffer)
+            offset += window
+
+    # The tail is only worth emitting if it holds audio the previous window did not cover
+    if pending_len and (offset == 0 or pending_len > overlap):
+        yield offset / sampling_rate, np.concatenate(pending)
+
+
+def split_head(blocks: Iterable[np.ndarray], seconds: float, sampling_rate: int = SAMPLE_RATE) -> Tuple[np.ndarray, Iterator[np.ndarray]]:
+    """
+    Read the first `seconds` of a block stream. Returns those samples and an iterator
+    over the whole stream, head included, so the caller can peek without losing audio.
+    """
+    blocks = iter(blocks)
+    head = []
+    head_len = 0
+    for block in blocks:
+        head.append(block)
+        head_len += len(block)
+        if head_len >= seconds * sampling_rate:
+            break
+    samples = np.concatenate(head)[:int(seconds * sampling_rate)] if head else np.zeros(0, dtype=np.float32)
+    return samples, itertools.chain(head, blocks)
@@ -1,10 +1,11 @@
-import os
 from pathlib import Path
 
 # Base Paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMP_DIR = BASE_DIR / "temp"
 OUTPUT_DIR = BASE_DIR / "output"
+CACHE_DIR = BASE_DIR / "cache"
+DATA_DIR = BASE_DIR / "data"
 
 # Ensure dirs exist
 TEMP_DIR.mkdir(parents=True, exist_ok=True)
@@ -14,12 +15,95 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 MAX_VIDEO_DURATION_SECONDS = 4 * 3600  # 4 hours
 CHUNK_SIZE_SECONDS = 600  # 10 minutes
 CHUNK_OVERLAP_SECONDS = 5
+# Worker processes for chunked transcription of long videos, e.g. min(4, os.cpu_count()). Each holds its
+# own int8 CPU model outside MODEL_POOL_MEMORY_MB, so chunking is off (1) unless memory allows for them
+CHUNK_WORKERS = 1
+# Streaming mode decodes audio while it downloads, in fixed windows fed to Whisper as they arrive
+STREAMING_TRANSCRIPTION = False
+STREAM_WINDOW_SECONDS = 30
+STREAM_OVERLAP_SECONDS = 2
+# Batched inference decodes ~30s windows from all transcribing jobs (and from within one long job)
+# together in single BatchedInferencePipeline calls. Jobs mostly wait on the batcher in this mode,
+# so TRANSCRIPTION_WORKERS can be raised to let more jobs contribute windows.
+BATCHED_INFERENCE = False
+INFERENCE_BATCH_SIZE = 8  # Windows per call
+INFERENCE_BATCH_WAIT_SECONDS = 0.2  # A partial batch runs once its oldest window has waited this long
+BATCH_WINDOW_SECONDS = 28  # Plus STREAM_OVERLAP_SECONDS shared with the next window, within Whisper's 30s
+# How audio is fetched for Whisper:
+#   'native' - smallest audio-only stream, kept as downloaded (no transcode)
+#   'pcm'    - audio-only stream transcoded to 16 kHz mono FLAC, the format Whisper decodes to anyway
+#   'mp3'    - legacy: best muxed stream re-encoded to 192 kbps MP3
+AUDIO_DOWNLOAD_MODE = "native"
+OUTPUT_FORMATS = ["docx", "txt", "srt", "vtt", "jsonl"]  # Written for every job, in one pass over the transcript
+# Subtitle cues are regrouped from word timestamps
+CAPTION_MAX_SECONDS = 6.0
+CAPTION_MAX_CHARS = 84
+CAPTION_LINE_CHARS = 42  # Longer cues are split over two lines
+ALLOWED_HOSTS = ["youtube.com", "youtu.be"]  # Hosts (and their subdomains) jobs may fetch from; yt-dlp's generic extractor would fetch any URL
 SUPPORTED_LANGUAGES = ["en", "es", "fr", "de", "it", "pt", "nl", "ja", "zh", "ru"]
 
+# Diarization Settings
+# Speaker labels come from clustering voice embeddings of short speech windows, computed on
+# CPU worker threads while Whisper decodes
+DIARIZATION_WORKERS = 2
+DIARIZATION_WINDOW_SECONDS = 1.5  # Length of the speech windows that are embedded and clustered
+DIARIZATION_THRESHOLD = 0.0  # Clusters merge while their mean cosine similarity is above this
+DIARIZATION_MIN_SEPARATION = 1.0  # Then clusters closer than this, relative to one voice's variation, are merged back
+DIARIZATION_MAX_SPEAKERS = 8
+DIARIZATION_MIN_SPEAKER_SECONDS = 10  # Speakers with less speech than this are folded into the nearest one
+DIARIZATION_MAX_WINDOWS = 2000  # Longer recordings cluster a subsample and assign the rest to the nearest speaker
+
+# Scratch Settings
+# Downloads and uploaded cookies live in one directory per job, removed when the job ends
+SCRATCH_DIR = TEMP_DIR / "jobs"
+SCRATCH_QUOTA_MB = 8192  # Downloads wait for space once reservations would exceed this
+SCRATCH_WAIT_SECONDS = 600  # ...and fail after waiting this long
+SCRATCH_BYTES_PER_SECOND = 32000  # Reserved per second of audio; 16 kHz mono FLAC is ~32 kB/s, native Opus far less
+SCRATCH_TMPFS_DIR = None  # e.g. "/dev/shm/yt-transcriber": RAM-backed placement for jobs that fit in SCRATCH_TMPFS_MB
+SCRATCH_TMPFS_MB = 1024
+
+# Scheduler Settings
+INGESTION_WORKERS = 4  # Concurrent downloads (network bound)
+TRANSCRIPTION_WORKERS = 1  # Concurrent Whisper decodes (CPU bound)
+MAX_QUEUED_JOBS = 20  # Jobs allowed to wait beyond the running workers before new ones are rejected
+MAX_BATCH_ITEMS = 200  # Videos taken from one playlist or channel
+
+# Job Store Settings
+JOB_STORE_BACKEND = "sqlite"  # Store of the UI and API: 'sqlite' (persistent, shareable between worker processes) or 'memory'
+JOB_STORE_PATH = DATA_DIR / "jobs.db"
+JOB_STORE_POLL_SECONDS = 1.0  # How often idle workers look for jobs queued by other processes
+JOB_TTL_SECONDS = 7 * 24 * 3600  # Finished jobs are purged after this long
+JOB_STALE_SECONDS = 1800  # Unfinished jobs not updated for this long are requeued (their worker died)
+JOB_WATCH_TIMEOUT_SECONDS = 15  # Status watchers re-read the store at least this often (jobs in other processes publish no events here)
+
+# Observability
+METRICS_PATH = DATA_DIR / "metrics.prom"  # Prometheus text format, rewritten as jobs finish; None to disable
+LOG_FORMAT = "text"  # 'text' or 'json' (one object per line, with the job id)
+
+# API Settings
+# Headless HTTP API (python -m app.api.server); the CLI is transcribe.py
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_LOCAL_FILES = False  # Accept server-side file paths as job URLs; only for trusted clients
+API_MAX_BODY_BYTES = 1024 * 1024  # Request bodies, including uploaded cookies
+
+# Cache Settings
+METADATA_CACHE_TTL_SECONDS = 1800  # Extracted video info is reused for this long
+TRANSCRIPT_CACHE_MAX_MB = 512  # Least recently used transcripts are evicted beyond this
+AUDIO_CACHE_MAX_MB = 4096  # Downloaded audio, reused by later jobs for the same video with any model
+PARTIAL_DOWNLOAD_MAX_AGE_HOURS = 24  # Interrupted downloads kept for later jobs of the same video to resume
+
 # Model Settings
 WHISPER_MODEL_SIZE = "medium"  # 'tiny', 'base', 'small', 'medium', 'large-v2'
+MODEL_SIZES = ["tiny", "base", "small", "medium", "large-v2"]  # Sizes jobs may request
 COMPUTE_TYPE = "int8" # 'float16' for GPU, 'int8' for CPU efficiency
+MODEL_POOL_MEMORY_MB = 4096  # RAM budget for loaded models; idle ones are evicted LRU beyond this
+MODEL_INSTANCES_PER_SIZE = 1  # Copies of one model allowed for concurrent inference
+PREWARM_MODEL_SIZE = None  # e.g. "medium": loaded in the background at startup instead of on the first job
+DECODE_PROFILE = "balanced"  # 'fast' (greedy, VAD, no word timestamps), 'balanced' (VAD) or 'accurate' (no VAD)
+LANGUAGE_PROBE_SECONDS = 120  # Auto language detection looks for speech in this much audio from the start
+LANGUAGE_PROBE_MODEL_SIZE = "tiny"  # Detects the language when no model is loaded yet; otherwise the smallest loaded one does
 
 # Retry Logic
-MAX_RETRIES = 3
-RETRY_DELAY = 5
+MAX_RETRIES = 3  # Failed downloads are resumed this many times
+RETRY_DELAY = 5  # Seconds before the first retry, doubled for each one after
@@ -1,13 +1,56 @@
+import contextvars
+import json
 import logging
 import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
-def setup_logger(name: str, log_file: Path = None, level=logging.INFO):
-    """Function to setup as many loggers as you want"""
-    formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+# Job id of the work running on the current thread, added to every log record
+_job_id = contextvars.ContextVar("job_id", default=None)
+
+
+@contextmanager
+def job_context(job_id: str):
+    token = _job_id.set(job_id)
+    try:
+        yield
+    finally:
+        _job_id.reset(token)
+
+
+class JobContextFilter(logging.Filter):
+    def filter(self, record):
+        record.job_id = _job_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the job id and any `extra={...}` fields."""
+
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "job_id"}
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "job_id": getattr(record, "job_id", None),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._RESERVED})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logger(name: str, log_file: Path = None, level=logging.INFO, json_format: bool = False, stream=None):
+    """Function to setup as many loggers as you want. Logs go to `stream`, stdout by default."""
+    formatter = JsonFormatter() if json_format else logging.Formatter('%(asctime)s %(levelname)s [%(job_id)s] %(message)s')
     
-    handler = logging.StreamHandler(sys.stdout)        
+    handler = logging.StreamHandler(stream or sys.stdout)        
     handler.setFormatter(formatter)
+    handler.addFilter(JobContextFilter())
     
     logger = logging.getLogger(name)
     logger.setLevel(level)
@@ -16,6 +59,7 @@ def setup_logger(name: str, log_file: Path = None, level=logging.INFO):
     if log_file:
         file_handler = logging.FileHandler(log_file)
         file_handler.setFormatter(formatter)
+        file_handler.addFilter(JobContextFilter())
         logger.addHandler(file_handler)
         
     return logger
@@ -0,0 +1,285 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator
+from xml.sax.saxutils import escape
+import importlib.util
+import json
+import re
+import zipfile
+from app.core.schemas import VideoMetadata
+from app.core.transcript_columns import SegmentView
+from app.utils.config import CAPTION_MAX_SECONDS, CAPTION_MAX_CHARS, CAPTION_LINE_CHARS
+
+
+def output_stem(name: str) -> str:
+    """Filename-safe stem: letters, digits, spaces and underscores only."""
+    return "".join(c for c in name if c.isalpha() or c.isdigit() or c == ' ' or c == '_').rstrip()
+
+
+class TranscriptWriter(ABC):
+    """
+    One output format, written incrementally. The formatter calls the header methods, then
+    write_segment() for each segment with its display prefix (computed once for all writers),
+    then close().
+    """
+
+    extension = ""
+    supports_batch = True # Whether it can hold several videos in one file
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def write_header(self, metadata: VideoMetadata):
+        """Header of a single-video document."""
+
+    def write_batch_header(self, title: str):
+        """Header of a combined document; each video follows as a section."""
+
+    def write_section(self, metadata: VideoMetadata):
+        pass
+
+    def end_section(self):
+        pass
+
+    @abstractmethod
+    def write_segment(self, segment, prefix: str):
+        ...
+
+    def close(self):
+        pass
+
+
+class TxtWriter(TranscriptWriter):
+    extension = "txt"
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write_header(self, metadata: VideoMetadata):
+        self._file.write(f"Title: {metadata.title}\nURL: {metadata.url}\n\n")
+
+    def write_batch_header(self, title: str):
+        self._file.write(f"Title: {title}\n\n")
+
+    def write_section(self, metadata: VideoMetadata):
+        self._file.write(f"== {metadata.title} ==\nURL: {metadata.url}\n\n")
+
+    def end_section(self):
+        self._file.write("\n")
+
+    def write_segment(self, segment, prefix: str):
+        self._file.write(f"{prefix}{segment.text}\n")
+
+    def close(self):
+        self._file.close()
+
+
+# Characters XML 1.0 does not allow; Whisper output occasionally contains them
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _xml_text(text: str) -> str:
+    return escape(_INVALID_XML_CHARS.sub("", text))
+
+
+def _docx_template() -> Path:
+    # python-docx's blank document supplies styles, settings and page setup; located without importing docx
+    spec = importlib.util.find_spec("docx")
+    return Path(spec.submodule_search_locations[0]) / "templates" / "default.docx"
+
+
+class DocxWriter(TranscriptWriter):
+    """
+    Writes word/document.xml paragraph by paragraph straight into the zip archive, instead of
+    building the document tree in memory, so memory stays flat however long the transcript is.
+    Styles and the other parts are copied from python-docx's default template.
+    """
+
+    extension = "docx"
+    FLUSH_PARAGRAPHS = 256
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(_docx_template()) as template:
+            for item in template.infolist():
+                if item.filename != "word/document.xml":
+                    self._zip.writestr(item, template.read(item))
+            document = template.read("word/document.xml").decode("utf-8")
+
+        body_start = document.index("<w:body>") + len("<w:body>")
+        self._document_tail = document[document.index("<w:sectPr", body_start):]
+        self._document = self._zip.open("word/document.xml", 'w')
+        self._document.write(document[:body_start].encode("utf-8"))
+        self._pending = []
+
+    def write_header(self, metadata: VideoMetadata):
+        self._heading(metadata.title, 0)
+        self._paragraph(f"Source: {metadata.url}")
+        self._paragraph(f"Duration: {metadata.duration} seconds")
+        self._paragraph(f"Date: {metadata.upload_date or 'N/A'}")
+        self._heading("Transcript", 1)
+
+    def write_batch_header(self, title: str):
+        self._heading(title, 0)
+
+    def write_section(self, metadata: VideoMetadata):
+        self._heading(metadata.title, 1)
+        self._paragraph(f"Source: {metadata.url}")
+
+    def write_segment(self, segment, prefix: str):
+        self._paragraph(segment.text, bold_prefix=prefix)
+
+    def close(self):
+        self._flush()
+        self._document.write(self._document_tail.encode("utf-8"))
+        self._document.close()
+        self._zip.close()
+
+    def _heading(self, text: str, level: int):
+        style = "Title" if level == 0 else f"Heading{level}"
+        self._append(f'<w:p><w:pPr><w:pStyle w:val="{style}"/></w:pPr><w:r><w:t xml:space="preserve">{_xml_text(text)}</w:t></w:r></w:p>')
+
+    def _paragraph(self, text: str, bold_prefix: str = ""):
+        runs = ""
+        if bold_prefix:
+            runs += f'<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{_xml_text(bold_prefix)}</w:t></w:r>'
+        runs += f'<w:r><w:t xml:space="preserve">{_xml_text(text)}</w:t></w:r>'
+        self._append(f"<w:p>{runs}</w:p>")
+
+    def _append(self, xml: str):
+        self._pending.append(xml)
+        if len(self._pending) >= self.FLUSH_PARAGRAPHS:
+            self._flush()
+
+    def _flush(self):
+        self._document.write("".join(self._pending).encode("utf-8"))
+        self._pending = []
+
+
+def segment_words(segment) -> tuple[list[str], list[float], list[float]]:
+    # Word texts, starts and ends, read from the columns for views
+    if isinstance(segment, SegmentView):
+        return segment.word_texts, segment.word_starts.tolist(), segment.word_ends.tolist()
+    return [w.word for w in segment.words], [w.start for w in segment.words], [w.end for w in segment.words]
+
+
+def segment_cues(segment, max_seconds: float = CAPTION_MAX_SECONDS, max_chars: int = CAPTION_MAX_CHARS) -> Iterator[tuple[float, float, str]]:
+    """
+    Regroup a segment's words into caption cues of at most `max_seconds` and `max_chars`,
+    in a single pass. Yields (start, end, text); a segment without words is one cue.
+    """
+    texts, starts, ends = segment_words(segment)
+    if not texts:
+        if segment.text:
+            yield segment.start_time, segment.end_time, segment.text
+        return
+
+    parts, length = [], 0
+    cue_start = cue_end = starts[0]
+    for text, start, end in zip(texts, starts, ends):
+        if parts and (end - cue_start > max_seconds or length + len(text) > max_chars):
+            yield cue_start, cue_end, "".join(parts).strip()
+            parts, length = [], 0
+        if not parts:
+            cue_start = start
+            text = text.lstrip()
+        parts.append(text)
+        length += len(text)
+        cue_end = end
+    if parts:
+        yield cue_start, cue_end, "".join(parts).strip()
+
+
+def wrap_cue(text: str, line_chars: int = CAPTION_LINE_CHARS) -> str:
+    # Long cues become two lines, split at the space closest to the middle
+    if len(text) <= line_chars:
+        return text
+    middle = len(text) // 2
+    left, right = text.rfind(" ", 0, middle + 1), text.find(" ", middle)
+    candidates = [i for i in (left, right) if i > 0]
+    if not candidates:
+        return text
+    split = min(candidates, key=lambda i: abs(i - middle))
+    return f"{text[:split]}\n{text[split + 1:]}"
+
+
+def caption_time(seconds: float, separator: str) -> str:
+    millis = max(0, int(round(seconds * 1000)))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+class SrtWriter(TranscriptWriter):
+    extension = "srt"
+    supports_batch = False # Cue times restart with every video
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+        self._index = 0
+
+    def write_segment(self, segment, prefix: str):
+        for start, end, text in segment_cues(segment):
+            self._index += 1
+            self._file.write(f"{self._index}\n{caption_time(start, ',')} --> {caption_time(end, ',')}\n{wrap_cue(text)}\n\n")
+
+    def close(self):
+        self._file.close()
+
+
+class VttWriter(TranscriptWriter):
+    extension = "vtt"
+    supports_batch = False
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write("WEBVTT\n\n")
+
+    def write_segment(self, segment, prefix: str):
+        for start, end, text in segment_cues(segment):
+            self._file.write(f"{caption_time(start, '.')} --> {caption_time(end, '.')}\n{wrap_cue(text)}\n\n")
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter(TranscriptWriter):
+    """One JSON object per segment, with its words, for machine consumers."""
+
+    extension = "jsonl"
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+        self._video = {}
+
+    def write_header(self, metadata: VideoMetadata):
+        self.write_section(metadata)
+
+    def write_section(self, metadata: VideoMetadata):
+        self._video = {"video_id": metadata.video_id, "url": metadata.url}
+
+    def write_segment(self, segment, prefix: str):
+        texts, starts, ends = segment_words(segment)
+        record = dict(
+            self._video,
+            segment_id=segment.segment_id,
+            start=segment.start_time,
+            end=segment.end_time,
+            speaker=segment.speaker,
+            text=segment.text,
+            confidence=segment.confidence,
+            words=[{"word": text, "start": start, "end": end} for text, start, end in zip(texts, starts, ends)],
+        )
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+WRITERS = {writer.extension: writer for writer in (DocxWriter, TxtWriter, SrtWriter, VttWriter, JsonlWriter)}
@@ -0,0 +1,55 @@
+import sys
+import time
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from faster_whisper import decode_audio
+from tests.fixtures import FIXTURE_DIR, fixture_audio, transcode
+
+# What each AUDIO_DOWNLOAD_MODE downloads and what it converts it to before Whisper.
+# Sources stand in for YouTube streams: 'best' is represented by its AAC audio track only,
+# so the legacy numbers understate its download size (the video stream is not counted).
+MODES = {
+    "mp3": {"source": ("aac", 128_000, "m4a"), "transcode": ("libmp3lame", 192_000, "mp3", None, None)},
+    "native": {"source": ("libopus", 64_000, "webm"), "transcode": None},
+    "pcm": {"source": ("libopus", 64_000, "webm"), "transcode": ("flac", None, "flac", 16000, "mono")},
+}
+
+
+def bench_mode(name: str, wav: Path, minutes: float):
+    codec, bit_rate, ext = MODES[name]["source"]
+    source = FIXTURE_DIR / f"{wav.stem}_{codec}.{ext}"
+    if not source.exists():
+        transcode(wav, source, codec, sample_rate=48000, layout="stereo", bit_rate=bit_rate)
+
+    audio_path = source
+    transcode_cpu = 0.0
+    if MODES[name]["transcode"]:
+        codec, bit_rate, ext, rate, layout = MODES[name]["transcode"]
+        audio_path = FIXTURE_DIR / f"{wav.stem}_{name}_out.{ext}"
+        start = time.process_time()
+        transcode(source, audio_path, codec, sample_rate=rate, layout=layout, bit_rate=bit_rate)
+        transcode_cpu = time.process_time() - start
+
+    start = time.process_time()
+    decode_audio(str(audio_path))
+    decode_cpu = time.process_time() - start
+
+    print(f"{name:<8} download {source.stat().st_size / 1e6:7.2f} MB | transcode {transcode_cpu:6.2f}s CPU | "
+          f"temp file {audio_path.stat().st_size / 1e6:7.2f} MB | whisper decode {decode_cpu:5.2f}s CPU")
+    if audio_path != source:
+        audio_path.unlink()
+
+
+def bench_audio_formats(minutes: float = 10):
+    wav = fixture_audio(minutes, sample_rate=48000)
+    print(f"Fixture: {minutes:g} min speech-like audio")
+    for name in MODES:
+        bench_mode(name, wav, minutes)
+
+
+if __name__ == "__main__":
+    bench_audio_formats(float(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,50 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from app.agents.transcription import TranscriptionAgent
+from app.core.inference_batcher import InferenceBatcher
+from app.core.model_pool import ModelPool
+from tests.fixtures import fixture_audio
+
+
+def run_jobs(agent: TranscriptionAgent, wav: Path, jobs: int, model_size: str) -> float:
+    # All jobs transcribe at once, as they would with that many transcription workers
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(agent.transcribe, wav, language="en", model_size=model_size, profile="accurate") for _ in range(jobs)]
+        for future in futures:
+            future.result()
+    return time.perf_counter() - start
+
+
+def bench_batched_inference(minutes: float = 5, jobs: int = 4, model_size: str = "tiny", batch_size: int = 8):
+    wav = fixture_audio(minutes)
+    audio_hours = jobs * minutes / 60
+    pool = ModelPool(instances_per_key=1)
+    TranscriptionAgent(pool).load_model(model_size)
+    print(f"{jobs} concurrent jobs of {minutes:g} min fixture audio, {model_size} model")
+
+    # One model instance, so the independent jobs take turns on it, as they do in the pool today
+    elapsed = run_jobs(TranscriptionAgent(pool), wav, jobs, model_size)
+    print(f"{'sequential':<12} {elapsed:7.1f}s | {audio_hours / (elapsed / 3600):7.1f} audio-hours per wall-hour")
+
+    batcher = InferenceBatcher(pool, batch_size=batch_size)
+    elapsed = run_jobs(TranscriptionAgent(pool, batcher=batcher), wav, jobs, model_size)
+    stats = batcher.stats()
+    batcher.shutdown()
+    print(f"{'batched':<12} {elapsed:7.1f}s | {audio_hours / (elapsed / 3600):7.1f} audio-hours per wall-hour | "
+          f"{stats['windows'] / max(stats['batches'], 1):.1f} windows per batch")
+
+
+if __name__ == "__main__":
+    bench_batched_inference(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+        sys.argv[3] if len(sys.argv) > 3 else "tiny",
+    )
@@ -0,0 +1,29 @@
+import sys
+import time
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from app.agents.transcription import DECODE_PROFILES, TranscriptionAgent
+from app.core.model_pool import ModelPool
+from tests.fixtures import fixture_audio
+
+
+def bench_decode_profiles(minutes: float = 5, model_size: str = "tiny"):
+    # Real-time factor = decode wall time / audio duration; lower is faster
+    wav = fixture_audio(minutes)
+    agent = TranscriptionAgent(ModelPool())
+    agent.load_model(model_size) # Load time is not part of any profile's RTF
+    print(f"Fixture: {minutes:g} min speech-like audio (every 8th second silent), {model_size} model")
+    for profile in DECODE_PROFILES:
+        start = time.perf_counter()
+        columns = agent.transcribe(wav, language="en", model_size=model_size, profile=profile)
+        elapsed = time.perf_counter() - start
+        print(f"{profile:<9} RTF {elapsed / (minutes * 60):5.3f} | {elapsed:6.1f}s | {len(columns):5d} segments | "
+              f"VAD skipped {columns.vad_skipped_seconds:6.1f}s")
+
+
+if __name__ == "__main__":
+    bench_decode_profiles(float(sys.argv[1]) if len(sys.argv) > 1 else 5, sys.argv[2] if len(sys.argv) > 2 else "tiny")
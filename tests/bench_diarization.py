@@ -0,0 +1,61 @@
+import sys
+import time
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from app.agents.diarization import DiarizationAgent
+from app.agents.transcription import TranscriptionAgent
+from app.core.model_pool import ModelPool
+from tests.fixtures import fixture_conversation
+
+
+def bench_diarization(minutes: float = 10, speakers: int = 2, model_size: str = "tiny"):
+    wav = fixture_conversation(minutes, speakers)
+    audio_seconds = minutes * 60
+    agent = DiarizationAgent()
+    print(f"Fixture: {minutes:g} min conversation of {speakers} synthetic speakers")
+
+    # Alone. Silero finds little speech in the synthetic voices, so every window is also embedded:
+    # the worst case for clustering, and the run whose speaker count is meaningful here
+    everything = DiarizationAgent(speech_detector=lambda samples: [(0, len(samples))])
+    for name, runner in (("diarization", agent), ("diarization, all windows", everything)):
+        start, cpu = time.perf_counter(), time.process_time()
+        turns = runner.diarize_file(wav).result()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28} RTF {elapsed / audio_seconds:6.4f} | {elapsed:6.1f}s | {time.process_time() - cpu:6.1f}s CPU | "
+              f"{len({turn.speaker for turn in turns})} speakers, {len(turns)} turns")
+    everything.shutdown()
+
+    try:
+        transcription = TranscriptionAgent(ModelPool())
+        transcription.load_model(model_size)
+    except Exception as e:
+        print(f"Skipping the comparison with transcription, no {model_size} model: {e}")
+        return
+
+    # The job's view: decoding alone, then with diarization running alongside as the orchestrator does
+    start = time.perf_counter()
+    transcription.transcribe(wav, language="en", model_size=model_size)
+    decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    diarized = agent.diarize_file(wav)
+    transcription.transcribe(wav, language="en", model_size=model_size)
+    decoded = time.perf_counter() - start
+    diarized.result()
+    together = time.perf_counter() - start
+    print(f"{'transcription':<28} RTF {decode / audio_seconds:6.4f} | {decode:6.1f}s")
+    print(f"{'transcription + diarization':<28} RTF {together / audio_seconds:6.4f} | {together:6.1f}s | "
+          f"+{(together - decode) / decode:.1%} wall time ({decoded - decode:+.1f}s slower decoding, {together - decoded:.1f}s waiting for speakers)")
+    agent.shutdown()
+
+
+if __name__ == "__main__":
+    bench_diarization(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 10,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2,
+        sys.argv[3] if len(sys.argv) > 3 else "tiny",
+    )
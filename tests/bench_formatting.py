@@ -0,0 +1,73 @@
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from app.agents.formatting import FormattingAgent, line_prefix
+from app.core.schemas import Transcript, VideoMetadata
+from app.utils.config import OUTPUT_DIR
+from tests.bench_transcript_memory import build_columns, fake_whisper_segments
+
+
+def format_legacy(transcript: Transcript) -> list[Path]:
+    # The previous approach: python-docx document tree built in memory, then a second pass for TXT
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading(transcript.metadata.title, 0)
+    for segment in transcript.segments:
+        p = doc.add_paragraph()
+        p.add_run(line_prefix(segment)).bold = True
+        p.add_run(segment.text)
+    docx_path = OUTPUT_DIR / "bench_legacy.docx"
+    doc.save(str(docx_path))
+
+    txt_path = OUTPUT_DIR / "bench_legacy.txt"
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        for segment in transcript.segments:
+            f.write(f"{line_prefix(segment)}{segment.text}\n")
+    return [docx_path, txt_path]
+
+
+def format_streaming(transcript: Transcript) -> list[Path]:
+    return list(FormattingAgent().format_transcript(transcript, ["docx", "txt"]).values())
+
+
+def format_captions(transcript: Transcript) -> list[Path]:
+    # Subtitle and machine formats, regrouped from word timestamps
+    return list(FormattingAgent().format_transcript(transcript, ["srt", "vtt", "jsonl"]).values())
+
+
+def run(method: str, hours: float):
+    # Runs in its own process so max RSS reflects this method only
+    columns = build_columns(fake_whisper_segments(hours))
+    transcript = Transcript(job_id="bench", segments=columns, metadata=VideoMetadata(title="Bench", duration=hours * 3600, url="http://bench"))
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    paths = {"legacy": format_legacy, "streaming": format_streaming, "captions": format_captions}[method](transcript)
+    elapsed = time.perf_counter() - start
+    peak_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    for path in paths:
+        path.unlink()
+    print(json.dumps({"seconds": elapsed, "peak_growth_mb": peak_growth / 1024}))
+
+
+def bench_formatting(hours: float = 4):
+    print(f"Formatting a {hours:g}h transcript to DOCX + TXT (legacy, streaming) and SRT + VTT + JSONL (captions)")
+    for method in ["legacy", "streaming", "captions"]:
+        out = subprocess.run([sys.executable, __file__, "--run", method, str(hours)], capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{method:<10} {result['seconds']:6.2f}s | peak RSS growth {result['peak_growth_mb']:6.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run(sys.argv[2], float(sys.argv[3]))
+    else:
+        bench_formatting(float(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,76 @@
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from app.agents.ingestion import IngestionAgent
+from app.utils.config import TEMP_DIR
+
+# Simulated cost of one extractor round-trip to YouTube
+EXTRACTION_LATENCY_SECONDS = 0.05
+
+
+class StubYoutubeDL:
+    """Local stand-in for yt_dlp.YoutubeDL that counts extractor invocations."""
+    extractions = 0
+    downloads = 0
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=True, process=True):
+        StubYoutubeDL.extractions += 1
+        time.sleep(EXTRACTION_LATENCY_SECONDS)
+        info = {
+            'id': url.rsplit('=', 1)[-1],
+            'title': f"Stub video {url}",
+            'duration': 60,
+            'timestamp': 1700000000,
+            'ext': 'mp3',
+        }
+        return self.process_ie_result(info, download) if download else info
+
+    def process_ie_result(self, info, download=True):
+        if download:
+            StubYoutubeDL.downloads += 1
+            path = Path(self.opts['outtmpl'].replace('%(id)s', info['id']).replace('%(ext)s', 'mp3'))
+            path.write_bytes(b"\0" * 1024)
+            info['requested_downloads'] = [{'filepath': str(path)}]
+        return info
+
+
+def run_jobs(agent, urls):
+    # Same call sequence as Orchestrator._ingest
+    for url in urls:
+        agent.get_metadata(url)
+        audio_path = agent.download_audio(url)
+        audio_path.unlink()
+
+
+def bench_extractions(jobs: int = 20, distinct_videos: int = 5):
+    urls = [f"https://www.youtube.com/watch?v=stub{i % distinct_videos}" for i in range(jobs)]
+
+    with patch("yt_dlp.YoutubeDL", StubYoutubeDL):
+        start = time.perf_counter()
+        run_jobs(IngestionAgent(), urls)
+        elapsed = time.perf_counter() - start
+
+    print(f"Jobs: {jobs} ({distinct_videos} distinct videos)")
+    print(f"Extractor invocations: {StubYoutubeDL.extractions} ({StubYoutubeDL.extractions / jobs:.2f} per job)")
+    print(f"Downloads: {StubYoutubeDL.downloads}")
+    print(f"Ingestion time: {elapsed:.2f}s ({elapsed / jobs * 1000:.0f} ms per job)")
+
+
+if __name__ == "__main__":
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    bench_extractions()
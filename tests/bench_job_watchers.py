@@ -0,0 +1,79 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from app.core.job_events import JobEvents
+from app.core.job_store import InMemoryJobStore
+from app.core.orchestrator import Orchestrator
+from app.core.schemas import JobStatus
+
+
+def fake_job(orchestrator: Orchestrator, job_id: str, updates: int, interval: float):
+    # Stands in for a running job: a progress update every `interval` seconds, then completion
+    for step in range(updates):
+        time.sleep(interval)
+        orchestrator._update_job(job_id, status="processing", current_step="transcribing", progress_percent=step * 100 // updates)
+    orchestrator._update_job(job_id, status="completed", progress_percent=100, current_step="done")
+    orchestrator._release_job(job_id)
+
+
+def polling_watcher(orchestrator: Orchestrator, job_id: str, seen: list, interval: float = 2.0):
+    # The previous UI loop
+    while True:
+        job = orchestrator.get_job_status(job_id)
+        seen.append(time.monotonic())
+        if job.status in ("completed", "failed"):
+            return
+        time.sleep(interval)
+
+
+def event_watcher(orchestrator: Orchestrator, job_id: str, seen: list):
+    for job in orchestrator.watch_job(job_id):
+        seen.append(time.monotonic())
+
+
+def run(orchestrator: Orchestrator, watcher, watchers: int, updates: int, interval: float) -> dict:
+    job_id = f"job-{watcher.__name__}-{watchers}"
+    job = JobStatus(job_id=job_id, status="processing", current_step="queued")
+    orchestrator.store.add(job, None)
+    orchestrator.jobs[job_id] = job
+
+    reads = [[] for _ in range(watchers)]
+    threads = [threading.Thread(target=watcher, args=(orchestrator, job_id, reads[i])) for i in range(watchers)]
+    start_cpu, start = time.process_time(), time.monotonic()
+    for thread in threads:
+        thread.start()
+    fake_job(orchestrator, job_id, updates, interval)
+    finished = time.monotonic()
+    for thread in threads:
+        thread.join()
+    cpu = time.process_time() - start_cpu
+    # How long after the job finished its watchers saw it
+    lag = sum(r[-1] - finished for r in reads) / watchers
+    return {"cpu_ms_per_watcher": cpu * 1000 / watchers, "reads_per_watcher": sum(map(len, reads)) / watchers, "completion_lag": max(lag, 0)}
+
+
+def bench_job_watchers(watcher_counts=(1, 10, 100), updates: int = 20, interval: float = 0.25):
+    orchestrator = Orchestrator.__new__(Orchestrator)
+    orchestrator.jobs, orchestrator._job_batches = {}, {}
+    orchestrator._jobs_lock = threading.Lock()
+    orchestrator.store = InMemoryJobStore()
+    orchestrator.events = JobEvents()
+    orchestrator.scratch = type("NoScratch", (), {"release": lambda self, job_id: None})()
+    orchestrator._wakeup = threading.Event()
+
+    print(f"Job with {updates} updates over {updates * interval:.0f}s")
+    for watchers in watcher_counts:
+        for watcher in (polling_watcher, event_watcher):
+            result = run(orchestrator, watcher, watchers, updates, interval)
+            print(f"{watcher.__name__:<16} {watchers:>4} watchers | {result['cpu_ms_per_watcher']:6.2f} ms CPU per watcher | "
+                  f"{result['reads_per_watcher']:5.1f} status reads each | completion seen after {result['completion_lag']:.2f}s")
+
+
+if __name__ == "__main__":
+    bench_job_watchers()
@@ -0,0 +1,325 @@
+"""
+End-to-end benchmark of Orchestrator jobs, from metadata lookup to written transcripts.
+
+yt-dlp is replaced by FakeYoutubeDL, which downloads fixture streams from a local HTTP server
+and postprocesses them with ffmpeg like yt-dlp does, so jobs run offline through the real
+ingestion, audio cache, scratch, transcription, diarization and formatting code. Each scenario
+runs in a fresh process, for a clean peak RSS and a cold model pool:
+
+    {m}min       one job for an m minute video, for every --minutes
+    {n}x{m}min   n jobs submitted at once, for throughput under concurrency
+
+Stages are the job timings the orchestrator records: metadata + download (ingestion), transcode
+(only in the 'pcm' and 'mp3' download modes), language_detection, model_load, decode,
+diarization and formatting. Results are compared with tests/bench_baseline.json; slowdowns
+beyond --tolerance are flagged and make the exit status 1. Without the Whisper model (e.g.
+offline), decoding is replaced by a stub that only decodes the audio; such runs are only
+compared with baselines recorded the same way. The committed baseline is such a stub run, so
+a run with the real model finds no matching baseline: that is reported and exits with status 2
+until one is recorded with --update-baseline.
+
+    python tests/bench_pipeline.py [--minutes 1 10 60] [--concurrency 4] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from tests.fixtures import FIXTURE_DIR, fixture_stream
+
+BASELINE_PATH = Path(__file__).resolve().parent / "bench_baseline.json"
+MIN_COMPARED_SECONDS = 0.05 # Faster stages are too noisy to flag
+# Recorded with the results; runs are only compared with baselines that match on these
+SETTINGS = ["decoder", "mode", "workers", "speakers"]
+STAGES = ["metadata", "download", "transcode", "language_detection", "model_load", "decode", "diarization", "formatting"]
+
+
+class FakeYoutubeDL:
+    """
+    Stands in for yt_dlp.YoutubeDL. Video ids look like 'bench-10min-3': job 3 of the 10 minute
+    fixture. Each id is a distinct video to the caches, while all of them share one fixture file.
+    """
+
+    server_url = None # Set once the fixture server is up
+
+    def __init__(self, opts: dict):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def extract_info(self, url: str, download: bool = False, process: bool = False) -> dict:
+        video_id = url.rsplit("=", 1)[-1]
+        minutes = float(video_id.split("-")[1].removesuffix("min"))
+        path = fixture_stream(minutes)
+        return {
+            "id": video_id,
+            "title": f"Benchmark {video_id}",
+            "duration": minutes * 60,
+            "timestamp": time.time(),
+            "formats": [{"format_id": "251", "url": f"{self.server_url}/{path.name}", "ext": "webm", "acodec": "opus", "vcodec": "none"}],
+        }
+
+    def process_ie_result(self, info: dict, download: bool = True) -> dict:
+        audio_format = info["formats"][0]
+        info = dict(info, ext=audio_format["ext"], requested_formats=[audio_format])
+        if not download:
+            return info
+
+        path = Path(self.opts["outtmpl"].replace("%(id)s", info["id"]).replace("%(ext)s", audio_format["ext"]))
+        part = path.with_name(path.name + ".part")
+        with urllib.request.urlopen(audio_format["url"]) as response, open(part, "wb") as f:
+            shutil.copyfileobj(response, f, 1 << 20)
+        part.rename(path)
+        for hook in self.opts.get("progress_hooks", []):
+            hook({"status": "finished", "total_bytes": path.stat().st_size, "filename": str(path)})
+
+        for postprocessor in self.opts.get("postprocessors", []):
+            if postprocessor["key"] == "FFmpegExtractAudio":
+                path = self._extract_audio(path, postprocessor)
+        info["requested_downloads"] = [{"filepath": str(path)}]
+        return info
+
+    def _extract_audio(self, path: Path, postprocessor: dict) -> Path:
+        hooks = self.opts.get("postprocessor_hooks", [])
+        for hook in hooks:
+            hook({"status": "started", "postprocessor": "ExtractAudio"})
+        codec = postprocessor["preferredcodec"]
+        target = path.with_suffix(f".{codec}")
+        cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", str(path), "-vn"]
+        cmd += self.opts.get("postprocessor_args", {}).get("extractaudio", [])
+        if codec == "mp3":
+            cmd += ["-b:a", f"{postprocessor.get('preferredquality', '192')}k"]
+        subprocess.run(cmd + [str(target)], check=True)
+        path.unlink()
+        for hook in hooks:
+            hook({"status": "finished", "postprocessor": "ExtractAudio"})
+        return target
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_fixtures() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(FIXTURE_DIR)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stub_transcribe(audio_path: Path, language: str = None, model_size: str = None, chunked: bool = False, on_segment=None, profile: str = None):
+    # Without a model: decode the audio as Whisper would, and emit one segment per 30 s window
+    from app.core.transcript_columns import TranscriptColumns
+    from app.utils.audio import SAMPLE_RATE, decode_pcm_blocks, window_samples
+
+    columns = TranscriptColumns()
+    for offset, samples in window_samples(decode_pcm_blocks(audio_path), 30):
+        end = offset + len(samples) / SAMPLE_RATE
+        segment = columns.append(offset, end, "Synthetic speech.", 0.9, [("Synthetic", offset, offset + 1, 0.9), (" speech.", offset + 1, end, 0.9)])
+        if on_segment:
+            on_segment(segment)
+    columns.vad_skipped_seconds = 0.0
+    return columns
+
+
+def model_available(model_size: str) -> bool:
+    # Also downloads the model, so the download is not timed as model_load
+    try:
+        from faster_whisper import WhisperModel
+        WhisperModel(model_size, device="cpu", compute_type="int8")
+        return True
+    except Exception as e:
+        print(f"No {model_size} model ({type(e).__name__}), decoding is stubbed", file=sys.stderr)
+        return False
+
+
+def run_scenario(minutes: float, jobs: int, decoder: str, mode: str, workers: int, speakers: bool) -> dict:
+    """Runs `jobs` jobs for the `minutes` fixture at once in this process. Returns the scenario's results."""
+    from unittest.mock import MagicMock
+    from app.agents import ingestion
+    from app.agents.ingestion import IngestionAgent
+    from app.core.audio_cache import AudioCache
+    from app.core.job_store import InMemoryJobStore
+    from app.core.orchestrator import Orchestrator
+    from app.core.scheduler import JobScheduler
+    from app.core.transcript_cache import TranscriptCache
+
+    server = serve_fixtures()
+    FakeYoutubeDL.server_url = f"http://127.0.0.1:{server.server_address[1]}"
+    ingestion._youtube_dl = FakeYoutubeDL
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        orchestrator = Orchestrator(
+            scheduler=JobScheduler(transcription_workers=workers),
+            cache=TranscriptCache(Path(work_dir) / "transcripts"),
+            audio_cache=AudioCache(Path(work_dir) / "audio"),
+            store=InMemoryJobStore(),
+            scratch_root=Path(work_dir) / "scratch",
+            metrics_path=None,
+            output_dir=Path(work_dir) / "output",
+        )
+        orchestrator.ingestion = IngestionAgent(mode=mode)
+        if decoder == "stub":
+            orchestrator.transcription.load_model = MagicMock()
+            orchestrator.transcription.detect_language = MagicMock(return_value="en")
+            orchestrator.transcription.transcribe = stub_transcribe
+
+        start = time.perf_counter()
+        job_ids = [orchestrator.start_job(f"https://www.youtube.com/watch?v=bench-{minutes:g}min-{i}", model_size=decoder if decoder != "stub" else "tiny",
+                                          include_speakers=speakers)
+                   for i in range(jobs)]
+        finished = [list(orchestrator.watch_job(job_id))[-1] for job_id in job_ids]
+        wall = time.perf_counter() - start
+        orchestrator.shutdown()
+    server.shutdown()
+
+    failed = [job for job in finished if job.status != "completed"]
+    for job in failed:
+        print(f"Job {job.job_id} failed: {job.error}", file=sys.stderr)
+    done = [job for job in finished if job.status == "completed"] or finished
+    stages = sorted({stage for job in done for stage in job.timings}, key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES))
+    audio_seconds = sum(job.audio_seconds for job in done)
+    return {
+        "jobs": jobs,
+        "failed": len(failed),
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "throughput": audio_seconds / wall, # Seconds of audio transcribed per second
+        "rtf": sum(job.realtime_factor or 0 for job in done) / len(done), # Decode time per second of audio, per job
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": {stage: sum(job.timings.get(stage, {}).get("wall_seconds", 0) for job in done) / len(done) for stage in stages},
+    }
+
+
+def run_isolated(spec: dict) -> dict:
+    # A fresh interpreter per scenario: cold model pool, and peak RSS of this scenario alone.
+    # Its warnings and job failures go straight to stderr.
+    out = subprocess.run([sys.executable, __file__, "--scenario", json.dumps(spec)], stdout=subprocess.PIPE, text=True, cwd=base_dir)
+    if out.returncode != 0:
+        raise RuntimeError(f"Scenario {spec} exited with code {out.returncode}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def flatten(result: dict) -> dict:
+    metrics = {name: result[name] for name in ("wall_seconds", "rtf", "throughput", "peak_rss_mb")}
+    metrics.update({f"stage.{stage}": seconds for stage, seconds in result["stages"].items()})
+    return metrics
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lines describing metrics of `result` worse than `baseline` by more than `tolerance`."""
+    regressions = []
+    current, before = flatten(result), flatten(baseline)
+    for metric, value in current.items():
+        reference = before.get(metric)
+        if reference is None or reference == 0:
+            continue
+        higher_is_better = metric == "throughput"
+        timed = metric == "wall_seconds" or metric.startswith("stage.")
+        if timed and max(value, reference) < MIN_COMPARED_SECONDS:
+            continue
+        change = value / reference - 1
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{name:<10} {metric:<28} {value:10.3f} vs {reference:10.3f} baseline ({change:+.0%})")
+    return regressions
+
+
+def print_result(name: str, result: dict):
+    print(f"{name:<10} {result['jobs']} job(s), {result['failed']} failed | wall {result['wall_seconds']:7.1f}s | "
+          f"decode RTF {result['rtf']:.4f} | {result['throughput']:6.1f}x realtime | peak RSS {result['peak_rss_mb']:5.0f} MB")
+    print(" " * 11 + " | ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stages"].items()))
+
+
+def bench_pipeline(minutes: list[float], concurrency: int, concurrent_minutes: float, model_size: str, mode: str, workers: int, speakers: bool,
+                   baseline_path: Path, tolerance: float, update_baseline: bool) -> int:
+    decoder = model_size if model_available(model_size) else "stub"
+    settings = {"decoder": decoder, "mode": mode, "workers": workers, "speakers": speakers}
+    environment = dict(settings, cpus=os.cpu_count(), platform=platform.platform(), python=platform.python_version())
+    print(f"Decoder {decoder} | download mode {mode} | {workers} transcription worker(s) | speakers {'on' if speakers else 'off'} | {os.cpu_count()} CPUs")
+
+    scenarios = {f"{m:g}min": (m, 1) for m in minutes}
+    if concurrency > 1:
+        scenarios[f"{concurrency}x{concurrent_minutes:g}min"] = (concurrent_minutes, concurrency)
+    results = {}
+    for name, (m, jobs) in scenarios.items():
+        fixture_stream(m) # Generated once, outside the timed run
+        results[name] = run_isolated(dict(settings, minutes=m, jobs=jobs))
+        print_result(name, results[name])
+
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    regressions, compared = [], []
+    if baseline is None:
+        print(f"NO BASELINE: nothing at {baseline_path}")
+    elif any(baseline["environment"].get(key) != settings[key] for key in SETTINGS):
+        recorded = ", ".join(f"{key}={baseline['environment'].get(key)}" for key in SETTINGS)
+        print(f"NO MATCHING BASELINE: {baseline_path.name} was recorded with {recorded}; nothing compared")
+    else:
+        if baseline["environment"].get("cpus") != os.cpu_count() or baseline["environment"].get("platform") != platform.platform():
+            print(f"Baseline was recorded on another machine ({baseline['environment'].get('cpus')} CPUs, {baseline['environment'].get('platform')}), expect differences")
+        compared = [name for name in results if name in baseline["scenarios"]]
+        for name in compared:
+            regressions += compare(name, results[name], baseline["scenarios"][name], tolerance)
+        missing = [name for name in results if name not in compared]
+        if missing:
+            print(f"No baseline for {', '.join(missing)}; not compared")
+        print(f"{len(regressions)} regression(s) beyond {tolerance:.0%} of the baseline")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+
+    failed = any(result["failed"] for result in results.values())
+    if update_baseline and failed:
+        print("Jobs failed, the baseline was not updated")
+    elif update_baseline:
+        scenarios = dict(baseline["scenarios"]) if baseline and baseline["environment"] == environment else {}
+        scenarios.update(results)
+        baseline_path.write_text(json.dumps({"environment": environment, "scenarios": scenarios}, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+    if regressions or failed:
+        return 1
+    # A run that compared nothing has not shown that performance held
+    return 0 if compared or update_baseline else 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with a stubbed yt-dlp.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60], help="Video lengths run as single jobs")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs submitted at once in the throughput scenario (at most MAX_QUEUED_JOBS)")
+    parser.add_argument("--concurrent-minutes", type=float, default=1, help="Video length of the throughput scenario's jobs")
+    parser.add_argument("--model", default="tiny", help="Whisper model size; stubbed when it cannot be loaded")
+    parser.add_argument("--mode", choices=["native", "pcm", "mp3"], default=None, help="Audio download mode (default: AUDIO_DOWNLOAD_MODE)")
+    parser.add_argument("--workers", type=int, default=None, help="Transcription workers (default: TRANSCRIPTION_WORKERS)")
+    parser.add_argument("--no-speakers", action="store_true", help="Skip diarization")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative slowdown flagged as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS) # Internal: run one scenario and print its results
+    args = parser.parse_args()
+
+    if args.scenario:
+        spec = json.loads(args.scenario)
+        print(json.dumps(run_scenario(spec["minutes"], spec["jobs"], spec["decoder"], spec["mode"], spec["workers"], spec["speakers"])))
+        sys.exit(0)
+
+    from app.utils.config import AUDIO_DOWNLOAD_MODE, TRANSCRIPTION_WORKERS
+    sys.exit(bench_pipeline(args.minutes, args.concurrency, args.concurrent_minutes, args.model, args.mode or AUDIO_DOWNLOAD_MODE,
+                            args.workers or TRANSCRIPTION_WORKERS, not args.no_speakers, args.baseline, args.tolerance, args.update_baseline))
@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+HEAVY_MODULES = ["yt_dlp", "faster_whisper", "ctranslate2", "docx", "torch", "av"]
+
+# Runs in a fresh interpreter so nothing is already imported
+PROBE = """
+import json, resource, sys, time
+sys.path.append({root!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(module: str, runs: int = 3) -> dict:
+    results = []
+    for _ in range(runs):
+        code = PROBE.format(root=str(base_dir), module=module, heavy=HEAVY_MODULES)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=base_dir, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    best = min(results, key=lambda r: r["seconds"])
+    return dict(best, max_rss_mb=max(r["max_rss_mb"] for r in results))
+
+
+def bench_startup():
+    print(f"Interpreter baseline: {measure('sys')['max_rss_mb']:.0f} MB RSS")
+    # Importing app.ui.main outside `streamlit run` executes the page in bare mode
+    for module in ["app.core.orchestrator", "app.cli.main", "app.api.server", "app.ui.main"]:
+        result = measure(module)
+        heavy = ", ".join(result["heavy"]) or "none"
+        print(f"{module:<24} import {result['seconds'] * 1000:7.0f} ms | max RSS {result['max_rss_mb']:6.0f} MB | heavy modules loaded: {heavy}")
+
+
+if __name__ == "__main__":
+    bench_startup()
@@ -0,0 +1,85 @@
+import gc
+import pickle
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+from app.agents.transcription import iter_columns
+from app.core.schemas import Segment, Word
+from app.core.transcript_columns import TranscriptColumns
+
+
+def fake_whisper_segments(hours: float, words_per_segment: int = 12, seconds_per_segment: float = 4.0):
+    # Stand-ins for faster_whisper segments; ~3 words/s of speech
+    segments = []
+    for i in range(int(hours * 3600 / seconds_per_segment)):
+        start = i * seconds_per_segment
+        step = seconds_per_segment / words_per_segment
+        words = [
+            SimpleNamespace(word=f" word{k}", start=start + k * step, end=start + (k + 1) * step, probability=0.9)
+            for k in range(words_per_segment)
+        ]
+        segments.append(SimpleNamespace(
+            start=start, end=start + seconds_per_segment, text="".join(w.word for w in words), avg_logprob=-0.2, words=words,
+        ))
+    return segments
+
+
+def build_models(segments) -> list[Segment]:
+    # What transcription built before: one validated Word per word, one Segment per segment
+    return [
+        Segment(
+            segment_id=i,
+            start_time=s.start,
+            end_time=s.end,
+            text=s.text.strip(),
+            confidence=s.avg_logprob,
+            words=[Word(word=w.word, start=w.start, end=w.end, confidence=w.probability) for w in s.words],
+        )
+        for i, s in enumerate(segments, start=1)
+    ]
+
+
+def build_columns(segments) -> TranscriptColumns:
+    columns = TranscriptColumns()
+    for _ in iter_columns(segments, columns):
+        pass
+    return columns
+
+
+def measure(name: str, build, segments):
+    # Timed without tracemalloc, which slows allocation-heavy code unevenly
+    gc.collect()
+    start = time.perf_counter()
+    build(segments)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(segments)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} build {elapsed:6.2f}s | retained {retained / 1e6:7.1f} MB | peak {peak / 1e6:7.1f} MB | "
+          f"pickled {len(pickle.dumps(result)) / 1e6:6.1f} MB")
+    return result
+
+
+def bench_transcript_memory(hours: float = 4):
+    segments = fake_whisper_segments(hours)
+    print(f"{hours:g}h transcript: {len(segments)} segments, {sum(len(s.words) for s in segments)} words")
+    measure("pydantic", build_models, segments)
+    columns = measure("columns", build_columns, segments)
+
+    start = time.perf_counter()
+    columns.to_segments()
+    print(f"Converting the columns to Segment models on demand: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    bench_transcript_memory(float(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,165 @@
+import wave
+from pathlib import Path
+import numpy as np
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures_data"
+
+
+def speech_like_samples(seconds: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic speech-like signal: harmonic 'syllables' with a wandering pitch,
+    about four per second, separated by short pauses and the odd longer silence.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+
+    # Pitch wanders between ~100 and ~220 Hz
+    pitch = 160 + 60 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, np.pi))
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+
+    # ~4 Hz syllable envelope, with every eighth second-long block silent
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    envelope[(t.astype(int) % 8) == 7] = 0
+
+    signal = 0.3 * voiced * envelope + 0.005 * rng.standard_normal(n)
+    return signal.astype(np.float32)
+
+
+# Pitch and formants (Hz, gain) of three distinguishable synthetic voices
+VOICES = [
+    (130, [(700, 1.0), (1200, 0.6), (2600, 0.3)]),
+    (210, [(500, 1.0), (1900, 0.7), (3000, 0.4)]),
+    (110, [(400, 1.0), (900, 0.8), (2400, 0.2)]),
+]
+
+
+def voice_samples(seconds: float, voice: tuple, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """
+    One synthetic speaker: a harmonic source at a drifting pitch shaped by the voice's formants,
+    in syllables of random length and spacing.
+    """
+    rng = np.random.default_rng(seed)
+    pitch, formants = voice
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    f0 = pitch * (1 + 0.15 * np.sin(2 * np.pi * rng.uniform(0.2, 0.6) * t + rng.uniform(0, 2 * np.pi)))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    # The pitch drifts slowly, so harmonic gains are computed every 10 ms and interpolated
+    coarse = np.arange(0, n, sample_rate // 100)
+    signal = np.zeros(n)
+    for k in range(1, 40):
+        gain = sum(a * np.exp(-0.5 * ((k * f0[coarse] - f) / 120) ** 2) for f, a in formants) + 0.02
+        signal += np.interp(np.arange(n), coarse, gain) * np.sin(k * phase) / np.sqrt(k)
+
+    envelope = np.zeros(n)
+    position = 0
+    while position < n:
+        length = int(rng.uniform(0.1, 0.35) * sample_rate)
+        envelope[position:position + length] = np.hanning(length)[:n - position]
+        position += length + int(rng.uniform(0.03, 0.25) * sample_rate)
+    return (0.1 * signal * envelope + 0.003 * rng.standard_normal(n)).astype(np.float32)
+
+
+def conversation_samples(turn_seconds: float, turns: int, speakers: int = 2, sample_rate: int = 16000) -> np.ndarray:
+    """Speakers from VOICES taking turns of `turn_seconds` in order."""
+    return np.concatenate([voice_samples(turn_seconds, VOICES[i % speakers], sample_rate, seed=i) for i in range(turns)])
+
+
+def make_wav(path: Path, seconds: float, sample_rate: int = 16000, block_seconds: int = 60) -> Path:
+    """Write a speech-like mono 16-bit WAV, generated block by block to keep memory flat."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        remaining = seconds
+        block = 0
+        while remaining > 0:
+            samples = speech_like_samples(min(block_seconds, remaining), sample_rate, seed=block)
+            f.writeframes((samples * 32767).astype("<i2").tobytes())
+            remaining -= block_seconds
+            block += 1
+    return path
+
+
+def transcode(src: Path, dst: Path, codec: str, sample_rate: int = None, layout: str = None, bit_rate: int = None) -> Path:
+    """Transcode audio with PyAV (same libav codecs ffmpeg uses)."""
+    import av
+
+    with av.open(str(src)) as inp, av.open(str(dst), "w") as out:
+        in_stream = inp.streams.audio[0]
+        rate = sample_rate or in_stream.rate
+        stream = out.add_stream(codec, rate=rate, layout=layout or in_stream.layout.name)
+        if bit_rate:
+            stream.bit_rate = bit_rate
+        resampler = av.audio.resampler.AudioResampler(
+            format=stream.codec_context.format or "s16", layout=layout or in_stream.layout.name, rate=rate
+        )
+        for frame in inp.decode(in_stream):
+            for resampled in resampler.resample(frame):
+                out.mux(stream.encode(resampled))
+        for resampled in resampler.resample(None):
+            out.mux(stream.encode(resampled))
+        out.mux(stream.encode(None))
+    return Path(dst)
+
+
+def fixture_audio(minutes: float, sample_rate: int = 16000) -> Path:
+    """Cached speech-like WAV fixture of the given length."""
+    path = FIXTURE_DIR / f"speech_{minutes:g}min_{sample_rate}.wav"
+    if not path.exists():
+        make_wav(path, minutes * 60, sample_rate)
+    return path
+
+
+def fixture_stream(minutes: float) -> Path:
+    """Cached stand-in for a YouTube audio stream: the speech-like fixture as 48 kHz stereo Opus in WebM."""
+    path = FIXTURE_DIR / f"speech_{minutes:g}min_16000_libopus.webm"
+    if not path.exists():
+        tmp_path = path.with_name(f"{path.stem}.tmp.webm")
+        transcode(fixture_audio(minutes), tmp_path, "libopus", sample_rate=48000, layout="stereo", bit_rate=64_000)
+        tmp_path.rename(path)
+    return path
+
+
+def fixture_conversation(minutes: float, speakers: int = 2, turn_seconds: float = 15, sample_rate: int = 16000) -> Path:
+    """Cached WAV of speakers from VOICES taking turns, written one turn at a time."""
+    path = FIXTURE_DIR / f"conversation_{minutes:g}min_{speakers}spk_{sample_rate}.wav"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(sample_rate)
+            for turn in range(int(np.ceil(minutes * 60 / turn_seconds))):
+                samples = voice_samples(turn_seconds, VOICES[turn % speakers], sample_rate, seed=turn)
+                f.writeframes((samples * 32767).astype("<i2").tobytes())
+    return path
+
+
+def offline_orchestrator(tmp_path: Path, store=None):
+    """
+    Orchestrator for local audio files that runs without the network or Whisper models:
+    every job decodes to the same two segments. Caches, scratch directories, transcripts and jobs
+    live in `tmp_path`, unless another job `store` is given; metrics are not written to disk.
+    """
+    from unittest.mock import MagicMock
+    from app.core.audio_cache import AudioCache
+    from app.core.job_store import InMemoryJobStore
+    from app.core.orchestrator import Orchestrator
+    from app.core.schemas import Segment
+    from app.core.transcript_cache import TranscriptCache
+
+    orchestrator = Orchestrator(cache=TranscriptCache(tmp_path / "transcripts"), audio_cache=AudioCache(tmp_path / "audio"),
+                                store=store or InMemoryJobStore(), scratch_root=tmp_path / "scratch", metrics_path=None,
+                                output_dir=tmp_path / "output")
+    orchestrator.transcription.detect_language = MagicMock(return_value="en")
+    orchestrator.transcription.load_model = MagicMock()
+    orchestrator.transcription.transcribe = MagicMock(return_value=[
+        Segment(segment_id=1, start_time=0.0, end_time=5.0, text="Hello world.", confidence=0.9),
+        Segment(segment_id=2, start_time=5.0, end_time=10.0, text="This is a test.", confidence=0.95),
+    ])
+    return orchestrator
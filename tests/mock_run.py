@@ -26,6 +26,8 @@ def test_mock_run():
     (base_dir / "temp/mock_audio.mp3").touch()
     
     # Mock Transcription
+    orchestrator.transcription.detect_language = MagicMock(return_value="en")
+    orchestrator.transcription.load_model = MagicMock()
     orchestrator.transcription.transcribe = MagicMock(return_value=[
         Segment(segment_id=1, start_time=0.0, end_time=5.0, text="Hello world.", confidence=0.9),
         Segment(segment_id=2, start_time=5.0, end_time=10.0, text="This is a test.", confidence=0.95),
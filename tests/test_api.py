@@ -0,0 +1,111 @@
+import asyncio
+import http.client
+import json
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.api.server import ApiServer
+from app.core.scheduler import SchedulerFullError
+from tests.fixtures import make_wav, offline_orchestrator
+
+
+@pytest.fixture
+def api(tmp_path):
+    orchestrator = offline_orchestrator(tmp_path)
+    loop = asyncio.new_event_loop()
+    api_server = ApiServer(orchestrator, allow_local_files=True)
+    server = loop.run_until_complete(api_server.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None):
+        connection = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=10)
+        connection.request(method, path, body=json.dumps(body) if body is not None else None)
+        return connection.getresponse()
+
+    yield request, api_server
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    orchestrator.shutdown()
+
+
+def test_job_is_submitted_streamed_and_its_transcript_fetched(api, tmp_path):
+    request, _ = api
+    wav = make_wav(tmp_path / "talk.wav", 10)
+
+    response = request("POST", "/jobs", {"url": str(wav), "formats": ["srt"], "include_speakers": False})
+    assert response.status == 202
+    job_id = json.loads(response.read())["job_id"]
+
+    events = request("GET", f"/jobs/{job_id}/events")
+    assert events.getheader("Content-Type") == "text/event-stream"
+    statuses = [json.loads(line[len(b"data: "):]) for line in events.read().splitlines() if line.startswith(b"data: ")]
+    assert statuses[-1]["status"] == "completed"
+    assert [status["progress_percent"] for status in statuses] == sorted(status["progress_percent"] for status in statuses)
+    assert set(statuses[-1]["artifacts"]) == {"srt"}
+
+    transcript = request("GET", f"/jobs/{job_id}/artifacts/srt")
+    assert transcript.status == 200
+    assert b"Hello world." in transcript.read()
+    assert request("GET", f"/jobs/{job_id}/artifacts/docx").status == 404
+    assert json.loads(request("GET", f"/jobs/{job_id}").read())["status"] == "completed"
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"url": "https://youtu.be/abc", "formats": ["pdf"]}, "Unknown output format"),
+    ({"url": "https://youtu.be/abc", "model_size": "huge"}, "Unknown model size"),
+    ({"url": "https://youtu.be/abc", "cookies_path": "/etc/passwd"}, "Unknown fields: cookies_path"),
+    ({"language": "en"}, "url"),
+])
+def test_invalid_submissions_are_rejected(api, body, error):
+    request, _ = api
+
+    response = request("POST", "/jobs", body)
+
+    assert response.status == 400
+    assert error in json.loads(response.read())["error"]
+
+
+def test_local_files_need_to_be_allowed(api, tmp_path):
+    request, api_server = api
+    api_server.allow_local_files = False
+    wav = make_wav(tmp_path / "talk.wav", 1)
+
+    for url in (str(wav), wav.as_uri()):
+        response = request("POST", "/jobs", {"url": url})
+        assert response.status == 400
+        assert "Only YouTube URLs" in json.loads(response.read())["error"]
+
+
+@pytest.mark.parametrize("url", ["http://169.254.169.254/latest/meta-data", "http://localhost:8000/stats", "https://youtube.com.evil.example/watch?v=abc",
+                                 "ftp://youtube.com/abc"])
+def test_only_youtube_hosts_are_fetched(api, url):
+    request, api_server = api
+    with pytest.raises(ValueError, match="Not a YouTube"):
+        api_server.orchestrator.start_batch(url)
+    api_server.orchestrator.start_job = MagicMock(return_value="job")
+    api_server.orchestrator.start_batch = MagicMock(return_value="batch")
+
+    for kind in ("jobs", "batches"):
+        assert request("POST", f"/{kind}", {"url": url}).status == 400
+    assert request("POST", "/jobs", {"url": "https://m.youtube.com/watch?v=abc"}).status == 202
+    assert not api_server.orchestrator.start_batch.called
+
+
+def test_full_queue_and_unknown_ids(api):
+    request, api_server = api
+    api_server.orchestrator.start_job = MagicMock(side_effect=SchedulerFullError("Server is busy"))
+
+    assert request("POST", "/jobs", {"url": "https://youtu.be/abc"}).status == 503
+    assert request("GET", "/jobs/nope").status == 404
+    assert request("GET", "/jobs/nope/events").status == 404
+    assert request("DELETE", "/jobs/nope").status == 405
+    assert request("GET", "/healthz").status == 200
+    assert request("GET", "/metrics").getheader("Content-Type").startswith("text/plain")
@@ -0,0 +1,207 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.agents import ingestion
+from app.agents.ingestion import IngestionAgent
+from app.core.audio_cache import AudioCache
+
+
+def test_concurrent_fetches_share_one_download(tmp_path):
+    cache = AudioCache(tmp_path / "cache")
+    downloads = []
+
+    def download(job_dir):
+        downloads.append(job_dir)
+        time.sleep(0.1)
+        path = job_dir / "abc.webm"
+        path.write_bytes(b"audio")
+        return path
+
+    results = {}
+    def fetch(job):
+        job_dir = tmp_path / job
+        job_dir.mkdir()
+        results[job] = cache.fetch("abc.native", job_dir, lambda: download(job_dir))
+
+    threads = [threading.Thread(target=fetch, args=(job,)) for job in ("a", "b", "c")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(downloads) == 1
+    assert sorted(results) == ["a", "b", "c"]
+    for job, path in results.items():
+        assert path.parent == tmp_path / job and path.read_bytes() == b"audio"
+    assert cache.stats()["coalesced"] == 2
+
+    # Later jobs, e.g. with another model size, are served from the cache
+    later = tmp_path / "later"
+    later.mkdir()
+    assert cache.fetch("abc.native", later, lambda: pytest.fail("downloaded again")).read_bytes() == b"audio"
+    assert AudioCache(tmp_path / "cache").get("abc.native").name == "abc.native.webm"
+
+
+def test_processes_sharing_the_cache_download_once(tmp_path):
+    # Two caches on one directory stand in for two worker processes: they share no in-flight map
+    caches = [AudioCache(tmp_path / "cache"), AudioCache(tmp_path / "cache")]
+    started, release = threading.Event(), threading.Event()
+    downloads = []
+
+    def download(job_dir):
+        downloads.append(job_dir)
+        started.set()
+        release.wait(5)
+        path = job_dir / "abc.webm"
+        path.write_bytes(b"audio")
+        return path
+
+    results = {}
+    def fetch(job, cache):
+        job_dir = tmp_path / job
+        job_dir.mkdir()
+        results[job] = cache.fetch("abc.native", job_dir, lambda: download(job_dir))
+
+    first = threading.Thread(target=fetch, args=("a", caches[0]))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=fetch, args=("b", caches[1]))
+    second.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in (first, second):
+        thread.join()
+
+    assert downloads == [tmp_path / "a"]
+    assert results["b"].parent == tmp_path / "b" and results["b"].read_bytes() == b"audio"
+    assert caches[1].get("abc.native").name == "abc.native.webm"
+
+
+def test_failed_download_is_not_cached(tmp_path):
+    cache = AudioCache(tmp_path / "cache")
+
+    def download():
+        raise RuntimeError("HTTP Error 403")
+
+    with pytest.raises(RuntimeError):
+        cache.fetch("abc.native", tmp_path, download)
+    assert cache.get("abc.native") is None
+
+
+def test_waiting_jobs_download_themselves_when_the_first_fails(tmp_path):
+    cache = AudioCache(tmp_path / "cache")
+    started, fail = threading.Event(), threading.Event()
+
+    def failing_download():
+        started.set()
+        fail.wait(5)
+        raise RuntimeError("Scratch quota exceeded")
+
+    def download(job_dir):
+        path = job_dir / "abc.webm"
+        path.write_bytes(b"audio")
+        return path
+
+    errors, results = [], {}
+    def fetch(job, download):
+        job_dir = tmp_path / job
+        job_dir.mkdir()
+        try:
+            results[job] = cache.fetch("abc.native", job_dir, lambda: download(job_dir) if job != "first" else download())
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    first = threading.Thread(target=fetch, args=("first", failing_download))
+    first.start()
+    started.wait(5)
+    waiting = [threading.Thread(target=fetch, args=(job, download)) for job in ("a", "b")]
+    for thread in waiting:
+        thread.start()
+    while cache.stats()["coalesced"] < 2:
+        time.sleep(0.01)
+    fail.set()
+    for thread in [first, *waiting]:
+        thread.join()
+
+    # Only the job whose download failed sees the error; one waiter downloads, the other shares it
+    assert errors == ["Scratch quota exceeded"]
+    assert sorted(results) == ["a", "b"] and all(path.read_bytes() == b"audio" for path in results.values())
+    assert cache.get("abc.native") is not None
+
+
+def test_least_recently_used_audio_is_evicted(tmp_path):
+    cache = AudioCache(tmp_path / "cache", max_bytes=10)
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.webm"
+        path.write_bytes(b"x" * 6)
+        cache.put(name, path)
+        time.sleep(0.01)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+class FlakyDownloader:
+    """Fails the first attempt midway, leaving a partial file, then completes it."""
+
+    attempts = []
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def process_ie_result(self, info, download=True):
+        path = Path(self.opts["outtmpl"].replace("%(id)s", info["id"]).replace("%(ext)s", "webm"))
+        part = path.with_name(path.name + ".part")
+        FlakyDownloader.attempts.append(part.read_bytes() if part.exists() else b"")
+        if not part.exists():
+            part.write_bytes(b"first half ")
+            raise RuntimeError("Connection reset")
+        part.write_bytes(part.read_bytes() + b"second half")
+        part.rename(path)
+        return dict(info, requested_downloads=[{"filepath": str(path)}])
+
+    def extract_info(self, url, download=False, process=False):
+        return {"id": "abc", "duration": 60}
+
+
+def test_download_retries_with_backoff_and_resumes(tmp_path, monkeypatch):
+    FlakyDownloader.attempts = []
+    delays = []
+    monkeypatch.setattr(ingestion, "_youtube_dl", FlakyDownloader)
+    monkeypatch.setattr(ingestion.time, "sleep", delays.append)
+
+    path = IngestionAgent(mode="native").download_audio("https://youtu.be/abc", dest_dir=tmp_path)
+
+    assert path.read_bytes() == b"first half second half"
+    assert FlakyDownloader.attempts == [b"", b"first half "]
+    assert delays == [ingestion.RETRY_DELAY]
+
+
+def test_partial_download_is_resumed_by_a_later_job(tmp_path, monkeypatch):
+    FlakyDownloader.attempts = []
+    monkeypatch.setattr(ingestion, "_youtube_dl", FlakyDownloader)
+    monkeypatch.setattr(ingestion, "MAX_RETRIES", 0)
+    partial_dir = AudioCache(tmp_path / "cache").partial_dir
+    agent = IngestionAgent(mode="native")
+
+    with pytest.raises(RuntimeError):
+        agent.download_audio("https://youtu.be/abc", dest_dir=tmp_path / "job1", partial_dir=partial_dir)
+    path = agent.download_audio("https://youtu.be/abc", dest_dir=tmp_path / "job2", partial_dir=partial_dir)
+
+    assert path == tmp_path / "job2" / "abc.webm"
+    assert path.read_bytes() == b"first half second half"
+    assert FlakyDownloader.attempts == [b"", b"first half "]
+    assert not any(partial_dir.rglob("*.*"))
@@ -0,0 +1,113 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import wave
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+from app.agents.ingestion import IngestionAgent
+from app.utils import audio
+from app.utils.audio import ffmpeg_pcm_blocks
+from tests.fixtures import make_wav
+
+# Stand-in for ffmpeg that pipes a 16 kHz mono WAV's samples to stdout like `-f s16le pipe:1`.
+# FAKE_FFMPEG=loop repeats them forever, FAKE_FFMPEG=fail exits with an error afterwards,
+# FAKE_FFMPEG=noisy logs more than a pipe buffer holds first.
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys, wave
+with wave.open(sys.argv[sys.argv.index("-i") + 1]) as f:
+    frames = f.readframes(f.getnframes())
+mode = os.environ.get("FAKE_FFMPEG")
+if mode == "noisy":
+    sys.stderr.write("Discarding corrupt packet\\n" * 50000)
+    sys.stderr.flush()
+while True:
+    sys.stdout.buffer.write(frames)
+    sys.stdout.flush()
+    if mode != "loop":
+        break
+if mode == "fail":
+    sys.stderr.write("Invalid data found when processing input")
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "ffmpeg"
+    script.write_text(FAKE_FFMPEG)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+
+    processes = []
+    popen = subprocess.Popen
+    monkeypatch.setattr(audio.subprocess, "Popen", lambda *args, **kwargs: processes.append(popen(*args, **kwargs)) or processes[-1])
+    return processes
+
+
+def wav_samples(path: Path) -> np.ndarray:
+    with wave.open(str(path)) as f:
+        return np.frombuffer(f.readframes(f.getnframes()), dtype="<i2").astype(np.float32) / 32768.0
+
+
+def test_blocks_carry_the_whole_file(tmp_path, fake_ffmpeg):
+    path = make_wav(tmp_path / "talk.wav", 2.5)
+
+    blocks = list(ffmpeg_pcm_blocks(str(path)))
+
+    assert [len(block) for block in blocks] == [16000, 16000, 8000]
+    np.testing.assert_array_equal(np.concatenate(blocks), wav_samples(path))
+    assert fake_ffmpeg[0].returncode == 0
+
+
+def test_consumer_stopping_early_kills_ffmpeg(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG", "loop")
+    blocks = IngestionAgent().stream_audio(str(make_wav(tmp_path / "talk.wav", 2)))
+
+    assert len(next(blocks)) == 16000
+    blocks.close()
+
+    process, = fake_ffmpeg
+    assert process.returncode is not None and process.returncode != 0
+    assert process.stdout.closed
+
+
+def test_ffmpeg_failure_raises_after_the_decoded_blocks(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG", "fail")
+    blocks = IngestionAgent().stream_audio(str(make_wav(tmp_path / "talk.wav", 2)))
+
+    received = []
+    with pytest.raises(RuntimeError, match="ffmpeg exited with code 1: Invalid data found"):
+        for block in blocks:
+            received.append(block)
+    assert len(received) == 2
+
+
+def test_ffmpeg_logging_heavily_does_not_stall(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG", "noisy")
+    path = make_wav(tmp_path / "talk.wav", 2)
+
+    blocks = []
+    reader = threading.Thread(target=lambda: blocks.extend(ffmpeg_pcm_blocks(str(path))), daemon=True)
+    reader.start()
+    reader.join(10)
+
+    assert not reader.is_alive(), "ffmpeg blocked writing to stderr"
+    assert sum(len(block) for block in blocks) == 32000
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_real_ffmpeg_resamples_to_16k_mono(tmp_path):
+    path = make_wav(tmp_path / "talk.wav", 2, sample_rate=44100)
+
+    samples = np.concatenate(list(ffmpeg_pcm_blocks(str(path))))
+
+    assert abs(len(samples) - 32000) < 100
@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.agents.ingestion import IngestionAgent
+from app.core.scheduler import JobScheduler
+from tests.fixtures import make_wav, offline_orchestrator
+
+CHANNEL = "https://www.youtube.com/@stub"
+
+
+class StubYoutubeDL:
+    """Local stand-in for yt_dlp.YoutubeDL serving flat playlist listings from `pages`."""
+    pages = {}
+    extractions = []
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=True, process=True):
+        StubYoutubeDL.extractions.append(url)
+        return StubYoutubeDL.pages[url]
+
+
+def video(video_id, url=None):
+    return {'_type': 'url', 'ie_key': 'Youtube', 'id': video_id, 'url': url, 'title': f"Video {video_id}"}
+
+
+def tab(name):
+    return {'_type': 'url', 'ie_key': 'YoutubeTab', 'id': name, 'url': f"{CHANNEL}/{name}"}
+
+
+def serve(pages):
+    StubYoutubeDL.pages, StubYoutubeDL.extractions = pages, []
+    return patch("yt_dlp.YoutubeDL", StubYoutubeDL)
+
+
+def test_channel_tabs_are_listed_and_videos_deduplicated():
+    pages = {
+        CHANNEL: {'_type': 'playlist', 'title': "Stub channel", 'entries': [tab("videos"), tab("shorts"), tab("streams")]},
+        f"{CHANNEL}/videos": {'_type': 'playlist', 'entries': [video("a"), video("b"), video("a")]},
+        f"{CHANNEL}/shorts": {'_type': 'playlist', 'entries': [video("b"), None, video("c")]},
+        f"{CHANNEL}/streams": {'_type': 'playlist', 'entries': [video("d")]},
+    }
+    with serve(pages):
+        title, videos = IngestionAgent().expand_playlist(CHANNEL)
+        assert title == "Stub channel"
+        assert [v['id'] for v in videos] == ["a", "b", "c", "d"]
+        assert videos[0]['url'] == "https://www.youtube.com/watch?v=a"
+
+        _, videos = IngestionAgent().expand_playlist(CHANNEL, limit=3)
+        assert [v['id'] for v in videos] == ["a", "b", "c"]
+        # Tabs beyond the limit are not fetched
+        assert StubYoutubeDL.extractions[-3:] == [CHANNEL, f"{CHANNEL}/videos", f"{CHANNEL}/shorts"]
+
+
+def test_batch_admits_items_as_capacity_frees_and_writes_one_transcript(tmp_path):
+    files = [make_wav(tmp_path / f"talk_{i}.wav", 3) for i in range(5)]
+    pages = {CHANNEL: {'_type': 'playlist', 'title': "Stub channel", 'entries': [tab("videos")]},
+             f"{CHANNEL}/videos": {'_type': 'playlist', 'entries': [video(f"v{i % 5}", str(files[i % 5])) for i in range(7)]}}
+    orchestrator = offline_orchestrator(tmp_path)
+    # Room for two jobs at a time: the other items have to wait in _feed_batch rather than be rejected
+    orchestrator.scheduler = JobScheduler(ingestion_workers=1, transcription_workers=1, max_queued_jobs=0)
+
+    with serve(pages):
+        batch_id = orchestrator.start_batch(CHANNEL, include_speakers=False, formats=["txt", "srt"])
+    for batch in orchestrator.watch_batch(batch_id):
+        pass
+    orchestrator.shutdown()
+
+    assert (batch.status, batch.completed, batch.failed, len(batch.job_ids)) == ("completed", 5, 0, 5)
+    # Subtitles can't hold several videos, so only the text transcript is written
+    assert set(batch.artifacts) == {"txt"}
+    text = Path(batch.artifacts["txt"]).read_text(encoding="utf-8")
+    assert text.startswith("Title: Stub channel\n")
+    assert [line for line in text.splitlines() if line.startswith("==")] == [f"== talk_{i} ==" for i in range(5)]
+    assert text.count("Hello world.") == 5
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.schemas import Segment, Word
+from app.core.transcript_columns import TranscriptColumns
+from app.utils.writers import caption_time, segment_cues, wrap_cue
+
+
+def make_segment(word_count, seconds_per_word=1.0):
+    words = [Word(word=f" w{i}", start=i * seconds_per_word, end=(i + 1) * seconds_per_word, confidence=0.9) for i in range(word_count)]
+    return Segment(segment_id=1, start_time=0, end_time=word_count * seconds_per_word, text="".join(w.word for w in words).strip(),
+                   confidence=-0.1, words=words)
+
+
+def test_cues_split_by_duration_and_characters():
+    segment = make_segment(10)
+    assert list(segment_cues(segment, max_seconds=4, max_chars=100)) == [
+        (0.0, 4.0, "w0 w1 w2 w3"), (4.0, 8.0, "w4 w5 w6 w7"), (8.0, 10.0, "w8 w9"),
+    ]
+    # " wN" is 3 characters, so 3 words fill 9 characters
+    assert [text for _, _, text in segment_cues(segment, max_seconds=100, max_chars=9)] == ["w0 w1 w2", "w3 w4 w5", "w6 w7 w8", "w9"]
+
+    # Views read the same words from the columns
+    view = TranscriptColumns.from_segments([segment])[0]
+    assert list(segment_cues(view, max_seconds=4, max_chars=100)) == list(segment_cues(segment, max_seconds=4, max_chars=100))
+
+
+def test_caption_formatting():
+    assert caption_time(3725.0456, ",") == "01:02:05,046"
+    assert caption_time(0.5, ".") == "00:00:00.500"
+    assert wrap_cue("one two three four", line_chars=10) == "one two\nthree four"
+    assert wrap_cue("short", line_chars=10) == "short"
@@ -0,0 +1,159 @@
+import contextlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+from app.agents import transcription
+from app.agents.transcription import TranscriptionAgent, merge_chunk_segments
+from app.core.schemas import JobRequest, JobStatus, Segment, Word
+from app.utils.audio import window_samples
+from tests.fixtures import make_wav, offline_orchestrator
+
+
+def make_segment(words):
+    return Segment(
+        segment_id=1,
+        start_time=words[0][1],
+        end_time=words[-1][1] + 0.4,
+        text="".join(w for w, _ in words).strip(),
+        confidence=-0.2,
+        words=[Word(word=w, start=s, end=s + 0.4, confidence=0.9) for w, s in words],
+    )
+
+
+def test_window_samples_overlap():
+    blocks = [np.ones(7, dtype=np.float32)] * 5  # 35 samples
+    windows = list(window_samples(blocks, window_seconds=10, overlap_seconds=2, sampling_rate=1))
+
+    assert [offset for offset, _ in windows] == [0.0, 10.0, 20.0, 30.0]
+    assert [len(samples) for _, samples in windows] == [12, 12, 12, 5]
+
+
+def test_merge_drops_overlap_duplicates_and_renumbers():
+    # Chunk 0 covers [0, 15), chunk 1 starts at 10 with 5s overlap; both heard "world" and "again"
+    first = [make_segment([(" Hello", 8.0), (" world", 10.5), (" again", 13.0)])]
+    second = [
+        make_segment([(" world", 10.6), (" again", 13.1), (" friends", 14.0)]),
+        make_segment([(" Bye", 20.0)]),
+    ]
+
+    merged = merge_chunk_segments([(0.0, first), (10.0, second)], overlap=5)
+
+    words = [w.word for segment in merged for w in segment.words]
+    assert words == [" Hello", " world", " again", " friends", " Bye"]
+    assert [segment.segment_id for segment in merged] == [1, 2, 3]
+    assert merged[0].text == "Hello world"
+    assert merged[1].text == "again friends"
+    assert merged[1].start_time == 13.1
+
+
+class WindowModel:
+    """Fake Whisper model that hears one word every 2 seconds, named after its time in the stream."""
+
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        self.calls = 0
+
+    def transcribe(self, samples, language=None, **options):
+        offset = self.calls * self.window_seconds
+        self.calls += 1
+        duration = len(samples) / 16000
+        segments = [
+            SimpleNamespace(start=t, end=t + 2, text=f" t{offset + t}", avg_logprob=-0.1,
+                            words=[SimpleNamespace(word=f" t{offset + t}", start=t, end=t + 2, probability=0.9)])
+            for t in range(0, int(duration), 2)
+        ]
+        return iter(segments), SimpleNamespace(language="en", duration=duration, duration_after_vad=duration)
+
+
+def test_streamed_segments_are_published_in_order_with_progress(tmp_path):
+    orchestrator = offline_orchestrator(tmp_path)
+    orchestrator.transcription.pool.acquire = lambda model_size: contextlib.nullcontext(WindowModel(10))
+    job = JobStatus(job_id="j", status="processing", progress_percent=30)
+    orchestrator.store.add(job, JobRequest(url="https://youtu.be/j"))
+    orchestrator.jobs["j"] = job
+
+    progress = []
+    blocks = [np.zeros(16000 * 5, dtype=np.float32)] * 6 # 30 seconds
+    for segment in orchestrator.transcription.transcribe_stream(blocks, window_seconds=10, overlap_seconds=2):
+        orchestrator._publish_segment("j", segment, 30)
+        progress.append(orchestrator.get_job_status("j").progress_percent)
+    orchestrator.shutdown()
+
+    # Windows start at 0, 10 and 20 and overlap by 2s; words heard twice are published once
+    published = orchestrator.jobs["j"].partial_segments
+    assert [segment.text for segment in published] == [f"t{t}" for t in range(0, 30, 2)]
+    assert [segment.segment_id for segment in published] == list(range(1, 16))
+    assert progress == sorted(progress)
+    assert (progress[0], progress[-1]) == (33, 80)
+    assert orchestrator.store.get("j").progress_percent == 80
+
+
+class ChunkModel:
+    """Fake worker model hearing a word every 2 seconds of its chunk. The first call waits for `release`."""
+    calls = 0
+    entered, release = threading.Event(), threading.Event()
+
+    def transcribe(self, audio, language=None, **options):
+        ChunkModel.calls += 1
+        if ChunkModel.calls == 1:
+            ChunkModel.entered.set()
+            ChunkModel.release.wait(5)
+        duration = len(audio) / 16000
+        segments = [
+            SimpleNamespace(start=t, end=t + 2, text=" word", avg_logprob=-0.1,
+                            words=[SimpleNamespace(word=" word", start=t, end=t + 2, probability=0.9)])
+            for t in range(0, int(duration), 2)
+        ]
+        return iter(segments), SimpleNamespace(language="en", duration=duration, duration_after_vad=duration - 1)
+
+
+@pytest.fixture
+def chunk_workers(monkeypatch):
+    ChunkModel.calls = 0
+    ChunkModel.entered.clear()
+    ChunkModel.release.set()
+    monkeypatch.setattr(transcription, "CHUNK_SIZE_SECONDS", 10)
+    monkeypatch.setattr(transcription, "CHUNK_OVERLAP_SECONDS", 2)
+    # Threads stand in for the spawned worker processes, each "loading" a fake model
+    monkeypatch.setattr(transcription, "_worker_model", None)
+    monkeypatch.setattr(transcription, "_init_chunk_worker", lambda model_size, cpu_threads: setattr(transcription, "_worker_model", ChunkModel()))
+    monkeypatch.setattr(transcription, "ProcessPoolExecutor", lambda max_workers, mp_context, initializer, initargs:
+                        ThreadPoolExecutor(max_workers, initializer=initializer, initargs=initargs))
+
+
+def test_chunked_transcription_merges_chunks_in_order(tmp_path, chunk_workers):
+    agent = TranscriptionAgent()
+    published = []
+
+    columns = agent.transcribe(make_wav(tmp_path / "talk.wav", 25), model_size="tiny", chunked=True, on_segment=published.append)
+    agent.shutdown_chunk_pool()
+
+    # Chunks start at 0, 10 and 20 and overlap by 2s; words heard twice are kept once
+    assert [segment.start_time for segment in columns.to_segments()] == list(range(0, 25, 2))
+    assert len(published) == len(columns) == 13
+    assert columns.vad_skipped_seconds == 3.0
+
+
+def test_chunk_pools_of_other_model_sizes_are_not_shut_down_under_a_running_job(tmp_path, chunk_workers):
+    ChunkModel.release.clear()
+    audio = make_wav(tmp_path / "talk.wav", 25)
+    agent = TranscriptionAgent()
+    results = {}
+    first = threading.Thread(target=lambda: results.update(tiny=agent.transcribe_chunked(audio, model_size="tiny", workers=1)))
+    first.start()
+    ChunkModel.entered.wait(5)
+
+    results["base"] = agent.transcribe_chunked(audio, model_size="base", workers=1)
+    ChunkModel.release.set()
+    first.join()
+    agent.shutdown_chunk_pool()
+
+    assert len(results["tiny"]) == len(results["base"]) == 13
@@ -0,0 +1,78 @@
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Add root to path
+base_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(base_dir))
+
+import pytest
+from app.agents.ingestion import IngestionAgent
+from app.cli.main import main
+from tests.fixtures import make_wav, offline_orchestrator
+
+
+def run_cli(argv, orchestrator):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    code = main(argv, orchestrator=orchestrator, stdout=stdout, stderr=stderr)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def test_local_files_are_transcribed_in_the_requested_formats(tmp_path):
+    files = [make_wav(tmp_path / f"talk_{i}.wav", 12) for i in range(3)]
+    orchestrator = offline_orchestrator(tmp_path)
+
+    code, out, err = run_cli([*map(str, files), "--format", "srt,txt", "--no-speakers", "--model", "tiny", "--json"], orchestrator)
+    orchestrator.shutdown()
+
+    assert code == 0
+    results = [json.loads(line) for line in out.splitlines()]
+    assert sorted(result["url"] for result in results) == sorted(map(str, files))
+    for result in results:
+        assert result["status"] == "completed"
+        assert set(result["artifacts"]) == {"srt", "txt"}
+        assert "Hello world." in Path(result["artifacts"]["txt"]).read_text()
+        assert result["audio_seconds"] == pytest.approx(12, abs=0.1)
+    assert "done 100%" in err
+    assert orchestrator.transcription.transcribe.call_args.kwargs["model_size"] == "tiny"
+
+
+def test_failures_are_reported_and_set_the_exit_status(tmp_path):
+    good = make_wav(tmp_path / "good.wav", 5)
+    orchestrator = offline_orchestrator(tmp_path)
+
+    code, out, err = run_cli([str(good), f"file://{tmp_path}/missing.wav", "--format", "txt", "--no-speakers"], orchestrator)
+    orchestrator.shutdown()
+
+    assert code == 1
+    assert out.strip().endswith(".txt") and len(out.splitlines()) == 1
+    assert f"file://{tmp_path}/missing.wav: failed:" in err
+
+
+def test_unknown_formats_are_rejected_before_anything_runs(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["https://youtu.be/abc", "--format", "txt,pdf"], orchestrator=object())
+    assert exit_info.value.code == 2
+    assert "unknown format 'pdf'" in capsys.readouterr().err
+
+
+def test_local_file_metadata(tmp_path):
+    wav = make_wav(tmp_path / "lecture.wav", 7)
+    ingestion = IngestionAgent()
+
+    metadata = ingestion.get_metadata(str(wav))
+
+    assert metadata.title == "lecture"
+    assert metadata.duration == pytest.approx(7, abs=0.01)
+    assert metadata.video_id.startswith("local-")
+    assert ingestion.get_metadata(wav.as_uri()).video_id == metadata.video_id
+    assert ingestion.download_audio(str(wav)) == wav
+
+
+def test_entry_points_do_not_import_streamlit_or_models():
+    code = "import sys; import app.cli.main, app.api.server; print(sorted({'streamlit', 'yt_dlp', 'faster_whisper', 'torch'} & set(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=base_dir, check=True).stdout
+
+    assert out.strip() == "[]"
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+from app.agents.transcription import DECODE_PROFILES, TranscriptionAgent
+from app.core.model_pool import ModelPool
+from app.core.transcript_columns import TranscriptColumns
+
+
+class FakeModel:
+    """Returns one segment per call and reports 2 of every 10 seconds as removed by the VAD."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, language=None, **options):
+        self.calls.append(options)
+        segment = SimpleNamespace(start=0.0, end=1.0, text=" hello", avg_logprob=-0.1, words=None)
+        info = SimpleNamespace(language="en", duration=10.0, duration_after_vad=8.0 if options.get("vad_filter") else 10.0)
+        return iter([segment]), info
+
+
+def make_agent():
+    model = FakeModel()
+    return TranscriptionAgent(ModelPool(loader=lambda *args: model)), model
+
+
+def test_profiles_pass_their_options_and_report_vad_savings(tmp_path):
+    agent, model = make_agent()
+    audio = tmp_path / "audio.wav"
+    audio.touch()
+
+    fast = agent.transcribe(audio, profile="fast")
+    accurate = agent.transcribe(audio, profile="accurate")
+
+    assert model.calls == [DECODE_PROFILES["fast"], DECODE_PROFILES["accurate"]]
+    assert (fast.vad_skipped_seconds, accurate.vad_skipped_seconds) == (2.0, 0.0)
+    assert fast[0].text == "hello"
+
+    with pytest.raises(ValueError):
+        agent.transcribe(audio, profile="turbo")
+
+
+def test_streaming_sums_vad_savings_over_windows():
+    agent, model = make_agent()
+    blocks = [np.zeros(16000 * 25, dtype=np.float32)]
+    columns = TranscriptColumns()
+
+    list(agent.transcribe_stream(blocks, window_seconds=10, overlap_seconds=2, columns=columns, profile="balanced"))
+
+    # 25s in 10s windows overlapping by 2s: windows start at 0, 10 and 20
+    assert len(model.calls) == 3
+    assert columns.vad_skipped_seconds == 6.0
@@ -0,0 +1,109 @@
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+from app.agents.diarization import DiarizationAgent, SpeakerIndex, SpeakerTurn, assign_speakers
+from app.core.schemas import Segment
+from app.core.transcript_columns import TranscriptColumns
+from tests.fixtures import VOICES, conversation_samples, make_wav, offline_orchestrator, voice_samples
+
+
+def blocks(samples, block=16000):
+    return [samples[i:i + block] for i in range(0, len(samples), block)]
+
+
+def make_agent():
+    return DiarizationAgent(workers=1, speech_detector=lambda samples: [(0, len(samples))])
+
+
+def test_two_speakers_are_told_apart():
+    turns = make_agent().diarize(blocks(conversation_samples(10, 6, speakers=2)))
+
+    assert [turn.speaker for turn in turns] == ["SPEAKER_00", "SPEAKER_01"] * 3
+    # Changes are found within one window
+    assert np.allclose([turn.start for turn in turns[1:]], [10, 20, 30, 40, 50], atol=1.5)
+
+
+def test_one_speaker_stays_one():
+    turns = make_agent().diarize(blocks(voice_samples(60, VOICES[1])))
+
+    assert {turn.speaker for turn in turns} == {"SPEAKER_00"}
+
+
+def test_silence_is_not_embedded():
+    agent = DiarizationAgent(workers=1, speech_detector=lambda samples: [] if not samples.any() else [(0, len(samples))])
+
+    assert agent.diarize(blocks(np.zeros(16000 * 40, dtype=np.float32))) == []
+
+
+def test_speaker_index_picks_the_largest_overlap_and_the_nearest_turn_in_pauses():
+    index = SpeakerIndex([SpeakerTurn(0, 10, "SPEAKER_00"), SpeakerTurn(10, 14, "SPEAKER_01"), SpeakerTurn(20, 30, "SPEAKER_00")])
+
+    speakers = index.lookup(np.array([1.0, 8.0, 11.0, 15.0, 18.5, 40.0]), np.array([4.0, 13.0, 12.0, 16.0, 19.5, 41.0]))
+
+    assert speakers == ["SPEAKER_00", "SPEAKER_01", "SPEAKER_01", "SPEAKER_01", "SPEAKER_00", "SPEAKER_00"]
+
+
+def test_assign_speakers_to_columns_and_segments():
+    turns = [SpeakerTurn(0, 5, "SPEAKER_00"), SpeakerTurn(5, 10, "SPEAKER_01")]
+    columns = TranscriptColumns()
+    columns.append(0.5, 4.0, "Hello.", 0.9, [("Hello.", 0.5, 4.0, 0.9)])
+    columns.append(5.5, 9.0, "Hi.", 0.9)
+    segments = [Segment(segment_id=1, start_time=6.0, end_time=7.0, text="Hi.", confidence=0.9)]
+
+    assign_speakers(columns, turns)
+    assign_speakers(segments, turns)
+
+    assert [segment.speaker for segment in columns] == ["SPEAKER_00", "SPEAKER_01"]
+    assert columns.to_segments()[1].speaker == "SPEAKER_01"
+    assert segments[0].speaker == "SPEAKER_01"
+
+
+def test_streamed_blocks_pass_through_while_diarized():
+    samples = conversation_samples(10, 4, speakers=2)
+    agent = make_agent()
+
+    passed, future = agent.diarize_stream(iter(blocks(samples)))
+    consumed = np.concatenate(list(passed))
+
+    assert np.array_equal(consumed, samples)
+    assert [turn.speaker for turn in future.result(timeout=30)] == ["SPEAKER_00", "SPEAKER_01"] * 2
+    agent.shutdown()
+
+
+def test_stream_closed_unread_or_failing_still_resolves():
+    agent = make_agent()
+
+    # The decoder failed before reading a block
+    passed, future = agent.diarize_stream(iter(blocks(conversation_samples(10, 2))))
+    passed.close()
+    assert future.result(timeout=5) == []
+
+    def failing():
+        yield from blocks(conversation_samples(10, 2))
+        raise RuntimeError("HTTP Error 403")
+
+    passed, future = agent.diarize_stream(failing())
+    with pytest.raises(RuntimeError):
+        list(passed)
+    future.result(timeout=30)
+    agent.shutdown()
+
+
+def test_transcripts_without_speakers_are_not_cached_as_diarized(tmp_path):
+    orchestrator = offline_orchestrator(tmp_path)
+    failed = Future()
+    failed.set_exception(RuntimeError("out of memory"))
+    orchestrator.diarization.diarize_file = lambda audio_path: failed
+    wav = make_wav(tmp_path / "talk.wav", 5)
+
+    job = list(orchestrator.watch_job(orchestrator.start_job(str(wav), language="en", model_size="tiny")))[-1]
+    orchestrator.shutdown()
+
+    assert job.status == "completed"
+    assert orchestrator.cache.stats()["size_bytes"] == 0
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+from app.agents.formatting import FormattingAgent
+from app.core.schemas import Segment, Transcript, VideoMetadata
+
+
+def test_single_pass_writes_readable_docx_and_txt(tmp_path):
+    transcript = Transcript(
+        job_id="j",
+        segments=[Segment(segment_id=1, start_time=1.25, end_time=2, text="Fish & <chips>\x07", confidence=-0.1)],
+        metadata=VideoMetadata(title="A/B: test", duration=2, url="http://video"),
+    )
+
+    paths = FormattingAgent(tmp_path).format_transcript(transcript)
+
+    assert (paths["docx"].name, paths["txt"].name) == ("AB test_j_transcript.docx", "AB test_j_transcript.txt")
+    paragraphs = Document(str(paths["docx"])).paragraphs
+    assert [p.style.name for p in paragraphs[:1]] == ["Title"]
+    assert paragraphs[-1].text == "[1.2s] SPEAKER_00: Fish & <chips>"
+    assert [run.bold for run in paragraphs[-1].runs] == [True, None]
+    assert paths["txt"].read_text(encoding="utf-8").endswith("[1.2s] SPEAKER_00: Fish & <chips>\x07\n")
+
+
+def test_jobs_for_videos_with_the_same_title_keep_their_own_files(tmp_path):
+    agent = FormattingAgent(tmp_path)
+    paths = [
+        agent.format_transcript(Transcript(job_id=job_id, segments=[Segment(segment_id=1, start_time=0, end_time=1, text=text, confidence=-0.1)],
+                                           metadata=VideoMetadata(title="Trailer", duration=1, url=f"http://video/{job_id}")), ["txt"])["txt"]
+        for job_id, text in (("job-1", "First"), ("job-2", "Second"))
+    ]
+
+    assert paths[0] != paths[1]
+    assert [path.read_text(encoding="utf-8").splitlines()[-1] for path in paths] == ["[0.0s] SPEAKER_00: First", "[0.0s] SPEAKER_00: Second"]
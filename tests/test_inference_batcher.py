@@ -0,0 +1,89 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from app.agents.transcription import TranscriptionAgent
+from app.core.inference_batcher import InferenceBatcher
+from app.core.model_pool import ModelPool
+from tests.fixtures import make_wav
+
+
+class FakePipeline:
+    """Returns one segment per clip, starting 1.5s into it."""
+
+    calls = []
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, language=None, clip_timestamps=(), batch_size=None, **options):
+        FakePipeline.calls.append({"seconds": len(audio) / 16000, "clips": len(clip_timestamps), "language": language})
+        segments = [
+            SimpleNamespace(start=clip["start"] + 1.5, end=clip["end"], text=f" clip {i}", avg_logprob=-0.1,
+                            words=[SimpleNamespace(word=f" clip{i}", start=clip["start"] + 1.5, end=clip["start"] + 2, probability=0.9)])
+            for i, clip in enumerate(clip_timestamps)
+        ]
+        return iter(segments), None
+
+
+def make_batcher(batch_size=4, max_wait_seconds=5.0, speech_detector=None):
+    FakePipeline.calls = []
+    pool = ModelPool(loader=lambda *args: object())
+    return InferenceBatcher(pool, batch_size=batch_size, max_wait_seconds=max_wait_seconds, pipeline_factory=FakePipeline,
+                            speech_detector=speech_detector or (lambda samples: (0, len(samples))))
+
+
+def test_windows_from_several_jobs_share_one_call():
+    batcher = make_batcher()
+    window = np.ones(16000 * 10, dtype=np.float32)
+    futures = []
+    # Two jobs, two windows each, submitted from separate threads
+    threads = [
+        threading.Thread(target=lambda job: futures.extend((job, offset, batcher.submit(window, offset, "tiny", "en", "accurate")) for offset in (0, 100)), args=(job,))
+        for job in ("a", "b")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {(job, offset): future.result(timeout=5) for job, offset, future in futures}
+    batcher.shutdown()
+
+    assert FakePipeline.calls == [{"seconds": 40.0, "clips": 4, "language": "en"}]
+    for (job, offset), columns in results.items():
+        assert len(columns) == 1
+        assert columns[0].start_time == offset + 1.5
+        assert columns[0].word_starts.tolist() == [offset + 1.5]
+
+
+def test_partial_batches_run_after_max_wait_and_silence_is_skipped():
+    silent = np.zeros(16000 * 10, dtype=np.float32)
+    speech = np.ones(16000 * 10, dtype=np.float32)
+    batcher = make_batcher(max_wait_seconds=0.05, speech_detector=lambda samples: (16000 * 2, 16000 * 8) if samples.any() else None)
+
+    quiet, loud = batcher.submit(silent, 0, "tiny", "en", "balanced"), batcher.submit(speech, 10, "tiny", "en", "balanced")
+    quiet, loud = quiet.result(timeout=5), loud.result(timeout=5)
+    batcher.shutdown()
+
+    # Only the speech of the second window was decoded
+    assert FakePipeline.calls == [{"seconds": 6.0, "clips": 1, "language": "en"}]
+    assert (len(quiet), quiet.vad_skipped_seconds) == (0, 10.0)
+    assert (loud[0].start_time, loud.vad_skipped_seconds) == (13.5, 4.0)
+
+
+def test_agent_transcribes_files_through_the_batcher(tmp_path):
+    batcher = make_batcher(batch_size=8, max_wait_seconds=0.05)
+    agent = TranscriptionAgent(batcher.pool, batcher=batcher)
+
+    columns = agent.transcribe(make_wav(tmp_path / "audio.wav", 70), language="en", profile="accurate")
+    batcher.shutdown()
+
+    # 28s windows sharing 2s: offsets 0, 28 and 56, decoded in one call
+    assert [call["clips"] for call in FakePipeline.calls] == [3]
+    assert [segment.start_time for segment in columns] == [1.5, 29.5, 57.5]
@@ -0,0 +1,64 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.job_events import JobEvents
+
+
+def test_wait_wakes_on_publish_for_its_key_only():
+    events = JobEvents()
+    woken = []
+    waiter = threading.Thread(target=lambda: woken.append(events.wait("a", 0, timeout=5)))
+    waiter.start()
+
+    time.sleep(0.05)
+    events.publish("b")
+    time.sleep(0.05)
+    assert not woken
+
+    events.publish("a")
+    waiter.join(timeout=5)
+    assert woken == [1]
+
+
+def test_missed_events_return_at_once_and_timeouts_return_the_same_version():
+    events = JobEvents()
+    events.publish("a")
+    events.publish("a")
+
+    assert events.wait("a", 0, timeout=5) == 2
+    start = time.monotonic()
+    assert events.wait("a", 2, timeout=0.05) == 2
+    assert time.monotonic() - start >= 0.05
+
+
+def test_close_wakes_waiters_and_drops_the_topic():
+    events = JobEvents()
+    events.publish("a")
+    threading.Timer(0.05, events.close, args=("a",)).start()
+
+    assert events.wait("a", 1, timeout=5) == 2
+    assert events.stats() == {"topics": 0, "waiters": 0, "subscribers": 0}
+    # Watchers that saw a version of the dropped topic do not block
+    assert events.wait("a", 2, timeout=5) == 0
+
+
+def test_subscribers_are_called_until_they_unsubscribe():
+    events = JobEvents()
+    calls = []
+    unsubscribe = events.subscribe("a", lambda: calls.append(events.version("a")))
+
+    events.publish("a")
+    events.publish("b")
+    events.close("a")
+    assert calls == [1, 2]
+    assert events.stats()["subscribers"] == 1
+
+    unsubscribe()
+    assert events.stats() == {"topics": 1, "waiters": 0, "subscribers": 0}  # Closed "a" left with its last subscriber
+    events.publish("a")
+    assert calls == [1, 2]
@@ -0,0 +1,130 @@
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.core.job_store import InMemoryJobStore, JobStore, SQLiteJobStore
+from app.core.schemas import JobRequest, JobStatus
+from tests.fixtures import make_wav, offline_orchestrator
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobStore
+    return lambda: SQLiteJobStore(tmp_path / "jobs.db")
+
+
+def add_job(store, job_id, worker_id=None):
+    store.add(JobStatus(job_id=job_id, status="queued", current_step="queued"), JobRequest(url=f"http://video/{job_id}"), worker_id=worker_id)
+
+
+def test_claims_oldest_queued_job_once(make_store):
+    store = make_store()
+    add_job(store, "a")
+    add_job(store, "b")
+    add_job(store, "reserved", worker_id="other")
+    assert store.count_queued() == 2
+
+    job, request = store.claim_next("w1")
+    assert (job.job_id, job.status, request.url) == ("a", "processing", "http://video/a")
+    assert store.claim_next("w2")[0].job_id == "b"
+    assert store.claim_next("w2") is None
+    assert store.get("a").status == "processing"
+
+
+def test_stale_jobs_are_requeued_and_finished_jobs_purged(make_store):
+    store = make_store()
+    add_job(store, "running")
+    add_job(store, "done")
+    store.claim_next("dead-worker")
+    job, _ = store.claim_next("live-worker")
+    job.status = "completed"
+    store.update(job)
+
+    time.sleep(0.05)
+    store.heartbeat("live-worker")
+    assert store.requeue_stale(0.01) == 1
+    assert store.get("running").status == "queued"
+    assert store.claim_next("w")[0].job_id == "running"
+
+    assert store.purge(0.01) == 1
+    assert store.get("done") is None
+    assert store.get("running") is not None
+
+
+def test_polling_the_memory_store_parses_no_jobs(monkeypatch):
+    store = InMemoryJobStore()
+    for i in range(3):
+        add_job(store, f"job-{i}", worker_id="other" if i == 2 else None)
+    store.claim_next("w1")
+
+    parsed = []
+    validate = JobStatus.model_validate_json
+    monkeypatch.setattr(JobStatus, "model_validate_json", lambda data: parsed.append(data) or validate(data))
+    assert store.count_queued() == 1
+    store.heartbeat("w1")
+    assert store.requeue_stale(60) == 0
+    assert store.purge(60) == 0
+    assert parsed == []
+
+    # Only the job handed out is parsed
+    assert store.claim_next("w2")[0].job_id == "job-1"
+    assert len(parsed) == 1
+
+
+def test_sqlite_store_survives_reopen(tmp_path):
+    add_job(SQLiteJobStore(tmp_path / "jobs.db"), "a")
+    store = SQLiteJobStore(tmp_path / "jobs.db")
+    assert store.get("a").status == "queued"
+    assert [job.job_id for job in store.list_jobs(status="queued")] == ["a"]
+
+
+def test_stores_implement_the_whole_interface():
+    class Partial(JobStore):
+        def add(self, job, request, worker_id=None):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_uploaded_cookies_reach_the_worker_that_claims_the_job(tmp_path):
+    audio = make_wav(tmp_path / "talk.wav", 3)
+    submitter = offline_orchestrator(tmp_path / "submitter", store=SQLiteJobStore(tmp_path / "jobs.db"))
+    submitter.shutdown() # Stops its poller, so only the other worker claims jobs
+    worker = offline_orchestrator(tmp_path / "worker", store=SQLiteJobStore(tmp_path / "jobs.db"))
+    seen = []
+    get_metadata = worker.ingestion.get_metadata
+    worker.ingestion.get_metadata = lambda url, cookie_file=None: seen.append((cookie_file, cookie_file.read_bytes())) or get_metadata(url)
+
+    job_id = submitter.start_job(str(audio), include_speakers=False, formats=["txt"], cookies=b"# Netscape HTTP Cookie File\n")
+    deadline = time.monotonic() + 10
+    while worker.get_job_status(job_id).status not in ("completed", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    worker.shutdown()
+
+    assert worker.get_job_status(job_id).status == "completed"
+    (cookie_file, cookies), = seen
+    assert cookies == b"# Netscape HTTP Cookie File\n"
+    assert not cookie_file.exists()
+
+
+@pytest.mark.parametrize("exists", [True, False])
+def test_no_cookies_are_left_in_the_store_once_a_job_ends(tmp_path, exists):
+    audio = make_wav(tmp_path / "talk.wav", 3) if exists else tmp_path / "missing.wav"
+    orchestrator = offline_orchestrator(tmp_path, store=SQLiteJobStore(tmp_path / "jobs.db"))
+
+    job_id = orchestrator.start_job(str(audio), include_speakers=False, formats=["txt"], cookies=b"SID\tsecret-session\n")
+    for status in orchestrator.watch_job(job_id):
+        pass
+    orchestrator.shutdown()
+
+    assert status.status == ("completed" if exists else "failed")
+    with sqlite3.connect(tmp_path / "jobs.db") as conn:
+        rows = conn.execute("SELECT request, job FROM jobs").fetchall()
+    assert rows and not any("secret-session" in column for row in rows for column in row)
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from app.agents.transcription import TranscriptionAgent
+from app.core.model_pool import ModelPool
+from app.utils.audio import split_head
+
+
+class FakeModel:
+    def __init__(self, size):
+        self.size = size
+        self.probes = []
+
+    def detect_language(self, audio, vad_filter=False):
+        self.probes.append(len(audio))
+        if not audio.any():
+            # What faster-whisper raises when the VAD finds no speech
+            raise ValueError("need at least one array to concatenate")
+        return "de", 0.9, [("de", 0.9)]
+
+
+def test_split_head_peeks_without_losing_audio():
+    blocks = [np.full(16000, i, dtype=np.float32) for i in range(5)]
+
+    head, stream = split_head(iter(blocks), seconds=2.5)
+
+    assert len(head) == 40000
+    assert np.array_equal(np.concatenate(list(stream)), np.concatenate(blocks))
+
+
+def test_detects_with_smallest_loaded_model():
+    loaded = []
+    pool = ModelPool(loader=lambda size, *args: loaded.append(FakeModel(size)) or loaded[-1])
+    agent = TranscriptionAgent(pool)
+    for size in ["medium", "base"]:
+        with pool.acquire(size):
+            pass
+
+    assert pool.smallest_loaded() == "base"
+    assert agent.detect_language(np.ones(16000, dtype=np.float32)) == "de"
+    assert [model.size for model in loaded if model.probes] == ["base"]
+
+    # No speech: the decoding model is left to detect the language itself
+    assert agent.detect_language(np.zeros(16000, dtype=np.float32)) is None
@@ -0,0 +1,101 @@
+import io
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.metrics import PipelineMetrics, StageTimer
+from app.utils.logger import JobContextFilter, JsonFormatter, job_context
+
+
+def test_render_histograms_and_counters():
+    metrics = PipelineMetrics()
+    metrics.observe_stage("download", 3.0, 0.5)
+    metrics.observe_stage("download", 40.0, 1.0)
+    metrics.observe_realtime_factor(0.25)
+    metrics.increment("jobs_total", status="completed")
+    metrics.increment("jobs_total", status="completed")
+    metrics.increment("downloaded_bytes_total", 2048)
+
+    text = metrics.render()
+
+    assert '# TYPE transcriber_stage_wall_seconds histogram' in text
+    assert 'transcriber_stage_wall_seconds_bucket{stage="download",le="5"} 1' in text
+    assert 'transcriber_stage_wall_seconds_bucket{stage="download",le="+Inf"} 2' in text
+    assert 'transcriber_stage_wall_seconds_sum{stage="download"} 43.000000' in text
+    assert 'transcriber_realtime_factor_bucket{le="0.3"} 1' in text
+    assert 'transcriber_jobs_total{status="completed"} 2' in text
+    assert 'transcriber_downloaded_bytes_total 2048' in text
+
+
+def test_stage_timer_records_on_success_only():
+    metrics = PipelineMetrics()
+    with metrics.stage("decode") as timer:
+        pass
+    try:
+        with metrics.stage("formatting"):
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert timer.wall_seconds > 0
+    assert 'stage="decode"' in metrics.render()
+    assert 'stage="formatting"' not in metrics.render()
+
+
+def _spin(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_stage_cpu_is_the_timing_threads_own():
+    # Another job burning CPU meanwhile doesn't count towards a stage that only waits
+    busy = threading.Thread(target=_spin, args=(0.5,))
+    with StageTimer() as waiting:
+        busy.start()
+        time.sleep(0.3)
+    busy.join()
+    with StageTimer() as working:
+        _spin(0.2)
+
+    assert waiting.wall_seconds >= 0.3
+    assert waiting.cpu_seconds < 0.1
+    assert working.cpu_seconds > 0.1
+
+
+def test_children_cpu_only_counted_when_asked():
+    burn = [sys.executable, "-c", "import time\nt = time.process_time()\nwhile time.process_time() - t < 0.3: pass"]
+    with StageTimer(children=True) as transcode:
+        subprocess.run(burn, check=True)
+    with StageTimer() as download:
+        subprocess.run(burn, check=True)
+
+    assert transcode.children_seconds >= 0.25
+    assert transcode.cpu_seconds >= transcode.children_seconds
+    assert download.children_seconds == 0
+    assert download.cpu_seconds < 0.1
+
+
+def test_json_logs_carry_the_job_id():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(JobContextFilter())
+    logger = logging.getLogger("test_metrics.json")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    with job_context("job-1"):
+        logger.info("Decoding", extra={"stage": "decode"})
+    logger.info("Idle")
+
+    first, second = (json.loads(line) for line in stream.getvalue().splitlines())
+    assert (first["job_id"], first["message"], first["stage"]) == ("job-1", "Decoding", "decode")
+    assert second["job_id"] is None
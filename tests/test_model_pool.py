@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.model_pool import ModelPool
+
+
+def fake_loader(model_size, compute_type, device):
+    return object()
+
+
+def test_pool_reuses_models_and_evicts_lru():
+    pool = ModelPool(memory_budget_mb=1000, instances_per_key=1, loader=fake_loader)
+
+    with pool.acquire("small", device="cpu") as first:
+        pass
+    with pool.acquire("small", device="cpu") as second:
+        assert second is first
+    with pool.acquire("base", device="cpu"):
+        pass
+    # tiny (150) + base (250) + small (700) exceeds the budget, so small (least recently used) goes
+    with pool.acquire("tiny", device="cpu"):
+        pass
+
+    stats = pool.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+    assert sorted(m["model"] for m in stats["loaded"]) == ["base/int8/cpu", "tiny/int8/cpu"]
+
+
+def test_pool_never_evicts_models_in_use():
+    pool = ModelPool(memory_budget_mb=800, instances_per_key=1, loader=fake_loader)
+
+    with pool.acquire("small", device="cpu"):
+        with pool.acquire("base", device="cpu"):
+            assert pool.stats()["evictions"] == 0
+            assert pool.stats()["memory_used_mb"] == 950
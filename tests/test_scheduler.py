@@ -0,0 +1,36 @@
+import sys
+import threading
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.core.scheduler import JobScheduler, SchedulerFullError
+
+
+def test_scheduler_runs_stages_and_rejects_beyond_capacity():
+    release = threading.Event()
+    done = []
+    scheduler = JobScheduler(ingestion_workers=1, transcription_workers=1, max_queued_jobs=1)
+
+    for i in range(scheduler.capacity):
+        scheduler.submit(ingest=lambda i=i: (release.wait(5), i)[1], transcribe=done.append)
+
+    with pytest.raises(SchedulerFullError):
+        scheduler.submit(ingest=lambda: None, transcribe=done.append)
+
+    release.set()
+    scheduler.shutdown(wait=True)
+    assert sorted(done) == list(range(scheduler.capacity))
+    assert scheduler.active_jobs == 0
+
+
+def test_scheduler_reports_stage_errors():
+    errors = []
+    scheduler = JobScheduler(ingestion_workers=1, transcription_workers=1, max_queued_jobs=0)
+
+    scheduler.submit(ingest=lambda: 1 / 0, transcribe=lambda result: None, on_error=errors.append)
+    scheduler.shutdown(wait=True)
+
+    assert isinstance(errors[0], ZeroDivisionError)
@@ -0,0 +1,61 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.core.scratch import ScratchFullError, ScratchManager
+
+MB = 1024 * 1024
+
+
+def test_quota_gates_reservations_and_release_cleans_up(tmp_path):
+    scratch = ScratchManager("owner", root=tmp_path, quota_mb=10, wait_seconds=0.05)
+
+    first = scratch.reserve("a", 6 * MB)
+    (first / "audio.webm").write_bytes(b"x")
+    with pytest.raises(ScratchFullError):
+        scratch.reserve("b", 6 * MB)
+    with pytest.raises(ScratchFullError):
+        scratch.reserve("c", 11 * MB) # Could never fit
+
+    # A waiting reservation goes through once space is released
+    scratch.wait_seconds = 5
+    threading.Timer(0.1, scratch.release, args=("a",)).start()
+    second = scratch.reserve("b", 6 * MB)
+
+    assert not first.exists()
+    assert second == tmp_path / "owner" / "b"
+    assert scratch.usage()["reserved_mb"] == 6
+
+
+def test_cookies_are_per_job_and_small_jobs_go_to_tmpfs(tmp_path):
+    scratch = ScratchManager("owner", root=tmp_path / "disk", quota_mb=100, tmpfs_root=tmp_path / "ram", tmpfs_mb=5)
+
+    cookies_a = scratch.write_file("a", "cookies.txt", b"a")
+    cookies_b = scratch.write_file("b", "cookies.txt", b"b")
+    small = scratch.reserve("a", 1 * MB)
+    large = scratch.reserve("b", 50 * MB)
+
+    assert (cookies_a.read_bytes(), cookies_b.read_bytes()) == (b"a", b"b")
+    assert small == tmp_path / "ram" / "owner" / "a"
+    assert large == tmp_path / "disk" / "owner" / "b"
+    scratch.release("a")
+    assert not cookies_a.exists() and not small.exists()
+
+
+def test_startup_removes_only_dead_owners(tmp_path):
+    live = ScratchManager("live", root=tmp_path)
+    live.write_file("job", "audio.webm", b"x")
+    dead = tmp_path / "dead" / "job"
+    dead.mkdir(parents=True)
+    (dead / "audio.webm.part").write_bytes(b"x")
+
+    time.sleep(0.01)
+    ScratchManager("new", root=tmp_path)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["live", "new"]
+    assert (tmp_path / "live" / "job" / "audio.webm").exists()
@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.schemas import Segment, Transcript, VideoMetadata
+from app.core.transcript_cache import TranscriptCache
+from tests.fixtures import make_wav, offline_orchestrator
+
+
+def make_transcript(job_id, text):
+    return Transcript(
+        job_id=job_id,
+        segments=[Segment(segment_id=1, start_time=0.0, end_time=1.0, text=text, confidence=-0.1)],
+        metadata=VideoMetadata(video_id="abc", title="Video", duration=1, url="http://mock.url"),
+    )
+
+
+def test_cache_roundtrip_and_hit_rate(tmp_path):
+    cache = TranscriptCache(cache_dir=tmp_path, max_bytes=1024 * 1024)
+    key = TranscriptCache.make_key("abc", "small", None, {"beam_size": 5})
+
+    assert cache.get(key) is None
+    cache.put(key, make_transcript("job-1", "Hello"))
+    assert cache.get(key).segments[0].text == "Hello"
+
+    assert key != TranscriptCache.make_key("abc", "medium", None, {"beam_size": 5})
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    entry_size = len(make_transcript("job", "x" * 100).model_dump_json())
+    cache = TranscriptCache(cache_dir=tmp_path, max_bytes=entry_size * 2 + 10)
+
+    for i in range(3):
+        cache.put(f"key{i}", make_transcript("job", "x" * 100))
+
+    assert cache.get("key0") is None
+    assert cache.get("key2") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] <= cache.max_bytes
+
+
+def run_job(orchestrator, url, **options):
+    for status in orchestrator.watch_job(orchestrator.start_job(url, include_speakers=False, formats=["txt"], **options)):
+        pass
+    return status
+
+
+def test_repeated_request_skips_download_and_decode(tmp_path):
+    audio = str(make_wav(tmp_path / "talk.wav", 3))
+    orchestrator = offline_orchestrator(tmp_path)
+    orchestrator.ingestion.download_audio = MagicMock(wraps=orchestrator.ingestion.download_audio)
+
+    first = run_job(orchestrator, audio, language="en")
+    orchestrator.ingestion.download_audio.assert_called_once()
+    orchestrator.transcription.transcribe.assert_called_once()
+    orchestrator.ingestion.download_audio.reset_mock()
+    orchestrator.transcription.transcribe.reset_mock()
+    second = run_job(orchestrator, audio, language="en")
+    orchestrator.shutdown()
+
+    assert (first.status, second.status) == ("completed", "completed")
+    orchestrator.ingestion.download_audio.assert_not_called()
+    orchestrator.transcription.transcribe.assert_not_called()
+    assert second.job_id != first.job_id
+    assert orchestrator.cache.stats()["hits"] == 1
+
+
+def test_auto_language_transcripts_are_found_by_a_fresh_process(tmp_path):
+    audio = str(make_wav(tmp_path / "talk.wav", 3))
+    first = offline_orchestrator(tmp_path)
+    assert run_job(first, audio).status == "completed"
+    first.shutdown()
+
+    # Shares the transcript cache, but has detected no languages yet
+    second = offline_orchestrator(tmp_path)
+    status = run_job(second, audio)
+    second.shutdown()
+
+    assert status.status == "completed"
+    second.transcription.detect_language.assert_not_called()
+    second.transcription.transcribe.assert_not_called()
@@ -0,0 +1,48 @@
+import pickle
+import sys
+from pathlib import Path
+
+# Add root to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from app.core.schemas import Segment, Transcript, VideoMetadata, Word
+from app.core.transcript_columns import TranscriptColumns
+
+
+def make_segments(count):
+    return [
+        Segment(
+            segment_id=i + 1,
+            start_time=float(i),
+            end_time=i + 0.9,
+            text=f"word{i} other{i}",
+            confidence=-0.1 * i,
+            speaker="SPEAKER_01" if i % 2 else "SPEAKER_00",
+            words=[Word(word=f" word{i}", start=i, end=i + 0.4, confidence=0.9), Word(word=f" other{i}", start=i + 0.5, end=i + 0.9, confidence=0.8)],
+        )
+        for i in range(count)
+    ]
+
+
+def test_columns_round_trip_and_views_share_memory():
+    segments = make_segments(600)  # Enough to grow the columns past their initial capacity
+    columns = TranscriptColumns.from_segments(segments)
+
+    assert len(columns) == 600 and columns.word_count == 1200
+    assert columns.to_segments() == segments
+
+    view = columns[-1]
+    assert (view.segment_id, view.text, view.speaker) == (600, "word599 other599", "SPEAKER_01")
+    assert view.word_texts == [" word599", " other599"]
+    assert np.shares_memory(view.word_starts, columns._word_starts.view())
+
+
+def test_columns_pickle_and_serialize_like_segments():
+    segments = make_segments(3)
+    columns = pickle.loads(pickle.dumps(TranscriptColumns.from_segments(segments)))
+    assert columns.to_segments() == segments
+
+    metadata = VideoMetadata(title="t", duration=3, url="u")
+    from_columns = Transcript(job_id="j", segments=columns, metadata=metadata)
+    assert from_columns.model_dump_json() == Transcript(job_id="j", segments=segments, metadata=metadata).model_dump_json()
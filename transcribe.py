@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+# Headless entry point: transcribe URL... [--model SIZE] [--format srt,txt] [--workers N]
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from app.cli.main import main
+
+if __name__ == "__main__":
+    sys.exit(main())